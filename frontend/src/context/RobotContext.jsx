@@ -6,6 +6,29 @@ const RobotContext = createContext(null);
 
 export const useRobot = () => useContext(RobotContext);
 
+// Стрим идет дельтами (docs/API_REFERENCE.md, "Дельта-кодирование стрима"):
+// delta=false — полный кадр (keyframe), delta=true — отличия ОТ KEYFRAME kf.
+// Сливаем всегда с keyframe, поэтому потерянные delta ничего не ломают.
+const applyDelta = (base, packet) => {
+    const results = { ...base.results };
+    Object.entries(packet.results || {}).forEach(([ns, keys]) => {
+        results[ns] = { ...results[ns], ...keys };
+    });
+    (packet.removed || []).forEach(([ns, key]) => {
+        if (!results[ns]) return;
+        results[ns] = { ...results[ns] };
+        delete results[ns][key];
+    });
+    // widgets / notifications — события этого пакета, из keyframe их не наследуем
+    return {
+        ...base,
+        ...packet,
+        results,
+        widgets: packet.widgets || [],
+        notifications: packet.notifications || []
+    };
+};
+
 export const RobotProvider = ({ children }) => {
     const [status, setStatus] = useState('disconnected');
     const [widgetsData, setWidgetsData] = useState({});
@@ -17,6 +40,9 @@ export const RobotProvider = ({ children }) => {
     const [lastOverlayData, setLastOverlayData] = useState({ geometry: {} });
 
     const framesBuffer = useRef({ cam_0: {}, cam_1: {} });
+    const keyframes = useRef({});
+    const lastResync = useRef(0);
+    const lastEcho = useRef({});
     const wsRef = useRef(null);
     const processedNotifications = useRef(new Set());
 
@@ -28,7 +54,10 @@ export const RobotProvider = ({ children }) => {
             const ws = new WebSocket(WS_URL);
             wsRef.current = ws;
 
-            ws.onopen = () => setStatus('connected');
+            ws.onopen = () => {
+                keyframes.current = {};
+                setStatus('connected');
+            };
             ws.onclose = () => {
                 setStatus('disconnected');
                 setTimeout(connect, 3000);
@@ -60,10 +89,38 @@ export const RobotProvider = ({ children }) => {
             }
 
             // 2. STREAM DATA (Воркер -> Фронт)
+            if (packet.frame_id !== undefined && packet.kf !== undefined) {
+                const camKey = `cam_${packet.camera_id}`;
+                if (!packet.delta) {
+                    keyframes.current[camKey] = packet;
+                } else {
+                    const base = keyframes.current[camKey];
+                    if (!base || base.kf !== packet.kf) {
+                        // Keyframe потерян (или еще не пришел): просим новый, не чаще раза в секунду
+                        const now = Date.now();
+                        if (now - lastResync.current > 1000 && wsRef.current?.readyState === WebSocket.OPEN) {
+                            lastResync.current = now;
+                            wsRef.current.send(JSON.stringify({ type: 'resync' }));
+                        }
+                        return;
+                    }
+                    packet = applyDelta(base, packet);
+                }
+            }
+
             if (packet.frame_id !== undefined) {
                 const camKey = `cam_${packet.camera_id}`;
                 if (!framesBuffer.current[camKey]) framesBuffer.current[camKey] = {};
 
+                // TRACE_ECHO: возвращаем t_send после отрисовки (2 rAF), не чаще 4 раз в секунду на камеру
+                if (packet.t_send !== undefined && Date.now() - (lastEcho.current[camKey] || 0) > 250) {
+                    lastEcho.current[camKey] = Date.now();
+                    const echo = { type: 'trace_echo', camera_id: packet.camera_id, t_send: packet.t_send };
+                    requestAnimationFrame(() => requestAnimationFrame(() => {
+                        if (wsRef.current?.readyState === WebSocket.OPEN) wsRef.current.send(JSON.stringify(echo));
+                    }));
+                }
+
                 // Видео буфер (для плеера)
                 framesBuffer.current[camKey][packet.frame_id] = packet;
                 const keys = Object.keys(framesBuffer.current[camKey]);
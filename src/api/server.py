@@ -1,8 +1,7 @@
 # src/api/server.py
 from collections import deque
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Set, Union
 import asyncio
-import orjson
 import logging
 import cv2
 import numpy as np
@@ -11,18 +10,23 @@ import struct
 import json
 import os
 import gc
+import threading
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi import Body, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-# Оставляем jsonable_encoder для совместимости
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, ValidationError
 
 # === V3.0 IMPORTS ===
-from src.core.event_bus import EventBus
-from src.data.shared_memory import SharedMemoryManager, VideoFrameLayout, RingBufferLayout
-from src.data.models import SharedMemoryConfig
+from src.core import serialization
+from src.core.config import PROFILES_DIR, settings
+from src.core.delta import read_trace
+from src.core.telemetry import stage_metrics, trace_metrics
+from src.core.event_bus import EventBus, TOPIC_STREAM, TOPIC_BROADCAST, TOPIC_CRITICAL, \
+    POLICY_DROP_OLDEST, POLICY_COALESCE
+from src.data.shared_memory import SharedMemoryManager, VideoFrameLayout, ShmRegistry
+from src.data.models import SharedMemoryConfig, PixelFormat
+from src.data.pixels import to_bgr
 from src.data.schemas import PluginCommand, CameraConfig
 from src.core.loader import scan_api_routers
 
@@ -30,6 +34,88 @@ logger = logging.getLogger("BikeFit.API")
 
 # --- GLOBAL STATE ---
 video_managers: Dict[int, SharedMemoryManager] = {}
+# generation записи реестра, к которой подключен video_managers[cam_id]
+video_generations: Dict[int, int] = {}
+_registry: Optional[ShmRegistry] = None
+_swap_lock = threading.Lock()
+
+
+def get_registry() -> Optional[ShmRegistry]:
+    """Ленивое подключение к реестру SHM (оркестратор мог стартовать позже API)"""
+    global _registry
+    if _registry is None:
+        _registry = ShmRegistry.attach()
+    return _registry
+
+
+def _swap_manager(cam_id: int, config: Optional[SharedMemoryConfig], generation: int):
+    """Закрывает старое кольцо камеры и подключается к новому (config=None -> просто отключиться)"""
+    old_mgr = video_managers.pop(cam_id, None)
+    if old_mgr:
+        try:
+            old_mgr.close()
+        except Exception:
+            pass
+    video_generations[cam_id] = generation
+    if config is None:
+        return
+
+    mgr = SharedMemoryManager(config, create=False)
+    if mgr.shm:
+        video_managers[cam_id] = mgr
+        logger.info(f"✅ Hot-Swap Success: Cam {cam_id} connected to {config.name}")
+    else:
+        logger.error(f"❌ Hot-Swap Failed: Could not attach to {config.name}")
+
+
+def sync_from_registry(cam_id: int) -> bool:
+    """
+    Сверяет generation камеры в реестре с текущим подключением и делает hot-swap.
+    Дешево (один struct.unpack), можно звать на каждом кадре.
+    False — реестра нет (старый воркер / оркестратор не запущен).
+    """
+    registry = get_registry()
+    if registry is None:
+        return False
+
+    generation = registry.generation(cam_id)
+    if generation == video_generations.get(cam_id, 0):
+        return True
+
+    with _swap_lock:
+        if generation == video_generations.get(cam_id, 0):
+            return True  # Другой поток уже переключился
+        entry = registry.lookup(cam_id)
+        if entry is None:
+            return True  # Запись в процессе обновления, подхватим на следующем вызове
+
+        if not entry.active:
+            logger.info(f"📴 Registry: Cam {cam_id} withdrawn (gen {entry.generation})")
+            _swap_manager(cam_id, None, entry.generation)
+        elif entry.layout_version != VideoFrameLayout.LAYOUT_VERSION:
+            logger.error(f"❌ Cam {cam_id}: SHM layout v{entry.layout_version} "
+                         f"!= v{VideoFrameLayout.LAYOUT_VERSION}. Skipped.")
+            video_generations[cam_id] = entry.generation
+        else:
+            logger.info(f"♻️ Registry: Cam {cam_id} -> {entry.name} (gen {entry.generation})")
+            try:
+                _swap_manager(cam_id, entry.to_config(), entry.generation)
+            except FileNotFoundError:
+                # Воркер уже умер, а оркестратор еще не снял запись
+                video_generations.pop(cam_id, None)
+            except ValueError as e:
+                # [FIX] Кольцо не совпало с записью реестра (SharedMemoryManager._check_layout)
+                logger.error(f"❌ Cam {cam_id}: {e}. Skipped.")
+                video_generations[cam_id] = entry.generation
+    return True
+
+
+def with_send_time(packet: Union[dict, bytes]) -> Union[dict, bytes]:
+    """TRACE_ECHO: t_send в пакет — фронтенд вернет его после отрисовки (trace_echo)"""
+    t_send = time.perf_counter()
+    if isinstance(packet, dict):
+        return {**packet, "t_send": t_send}
+    return packet[:-1] + b',"t_send":%.6f}' % t_send
 
 # Заглушка для Storage, если модуля нет (для совместимости)
 try:
@@ -81,13 +167,18 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
     def handle_update_shm(args: dict):
         """
         Обрабатывает сигнал shm_handshake от воркера.
-        Использует логику проверки имен, чтобы избежать лишних реконнектов.
+        Источник истины — реестр SHM; параметры из handshake используются,
+        только если реестра нет (воркер запущен без оркестратора).
         """
         try:
             cam_id = int(args.get("camera_id", 0))
+            if sync_from_registry(cam_id):
+                return
+
             new_shm_name = args.get("shm_name")
             shape = tuple(args.get("shape", (1200, 1920, 3)))
             dtype = args.get("dtype", "uint8")
+            pixel_format = PixelFormat(args.get("pixel_format", PixelFormat.BGR.value))
 
             # [FIX] Idempotency Check
             # Если имя памяти не изменилось, значит это просто повторный хендшейк.
@@ -96,27 +187,11 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                 return
 
             logger.info(f"♻️ Hot-Swap Signal: Cam {cam_id} switching to -> {new_shm_name}")
-
-            # 1. Безопасно отключаемся от старой памяти
-            if cam_id in video_managers:
-                old_mgr = video_managers[cam_id]
-                try:
-                    old_mgr.close()
-                except Exception:
-                    pass
-                video_managers.pop(cam_id, None)
-
-            # 2. Подключаемся к новой (только чтение)
             new_config = SharedMemoryConfig(
-                name=new_shm_name, size=0, shape=shape, dtype=dtype
+                name=new_shm_name, size=0, shape=shape, dtype=dtype, pixel_format=pixel_format
             )
-            mgr = SharedMemoryManager(new_config, create=False)
-
-            if mgr.shm:
-                video_managers[cam_id] = mgr
-                logger.info(f"✅ Hot-Swap Success: Connected to {new_shm_name}")
-            else:
-                logger.error(f"❌ Hot-Swap Failed: Could not attach to {new_shm_name}")
+            with _swap_lock:
+                _swap_manager(cam_id, new_config, video_generations.get(cam_id, 0))
 
         except Exception as e:
             logger.error(f"SHM Update Error: {e}")
@@ -137,50 +212,27 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
             ph_header = struct.pack('<QI', 0, len(ph_data))
 
             # Переменные состояния
-            last_frame_id = -1
+            cursor = None
             active_manager_name = None
 
-            fallback_shm_name = default_shm.name if default_shm else f"shm_cam_{cam_id}"
             retry_delay = 0.1
             last_error_time = 0
 
-            # Дефолтные параметры
-            current_shape = (1200, 1920, 3)
-            current_dtype = "uint8"
-            if default_shm:
-                current_shape = default_shm.shape
-                current_dtype = default_shm.dtype
-
             while True:
-                slot_view = None
-                frame = None
-
                 try:
+                    # Реестр SHM: подключение / hot-swap по generation (без угадывания имен)
+                    sync_from_registry(cam_id)
                     mgr = video_managers.get(cam_id)
 
                     # [FIX] Stream Reset Logic
                     if mgr and mgr.name != active_manager_name:
                         active_manager_name = mgr.name
-                        last_frame_id = -1
+                        # Preview читает только свежие кадры (latest-only), свой курсор на каждый поток
+                        cursor = mgr.cursor()
                         logger.warning(f"🔄 Stream Reset: New SHM source detected ({mgr.name})")
 
-                    # Если менеджера нет или память отвалилась
+                    # Если менеджера нет или память отвалилась -> ждем публикации в реестре
                     if not mgr or not mgr.shm:
-                        if not active_manager_name:
-                            try:
-                                # Ленивая попытка авто-коннекта
-                                cfg = SharedMemoryConfig(
-                                    name=fallback_shm_name, size=0, shape=current_shape, dtype="uint8"
-                                )
-                                test_mgr = SharedMemoryManager(cfg, create=False)
-                                if test_mgr.shm:
-                                    video_managers[cam_id] = test_mgr
-                                    logger.info(f"✅ Auto-Connect: Found {fallback_shm_name}")
-                                    continue
-                            except Exception:
-                                # [FIX] Молчим при авто-коннекте, так как ждем Handshake
-                                pass
-
                         yield ph_header + ph_data
                         time.sleep(retry_delay)
                         retry_delay = min(retry_delay * 1.5, 1.0)
@@ -190,45 +242,45 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                     frame_data = None
                     current_fid = 0
 
-                    # --- CRITICAL SECTION: Чтение из Shared Memory ---
+                    # --- CRITICAL SECTION: Чтение из Shared Memory (seqlock, без копии) ---
+                    # Блокируемся на notifier кольца до нового кадра (без 4 мс поллинга)
+                    view = cursor.read_latest(timeout=0.1)
                     try:
-                        head_idx = RingBufferLayout.get_write_index(mgr.shm.buf)
-                        slot_view = RingBufferLayout.get_slot_view(mgr.shm.buf, head_idx, mgr.slot_size)
-
-                        use_shape = getattr(mgr, 'shm_config', None) and mgr.shm_config.shape or current_shape
-                        use_dtype = getattr(mgr, 'shm_config', None) and mgr.shm_config.dtype or current_dtype
-
-                        fid, ts, salt, flags, frame = VideoFrameLayout.parse_from_buf(
-                            slot_view, use_shape, use_dtype
-                        )
-
-                        if fid > last_frame_id:
+                        # Аренда слота на время encode: писатель его обойдет, кадр не порвется
+                        if view is not None and view.pin():
                             # [NOTE] Тут было сжатие.
                             # Если хотим ресайз - надо делать его аккуратно.
                             # Пока оставляем оригинал, чтобы вернуть картинку.
-                            ret, jpg = cv2.imencode('.jpg', frame, encode_param)
-                            if ret:
+                            # GRAY8 кодируется как есть (1 канал), YUYV -> BGR
+                            t_read = time.perf_counter()
+                            img = view.image if mgr.pixel_format is not PixelFormat.YUYV \
+                                else to_bgr(view.image, mgr.pixel_format)
+                            ret, jpg = cv2.imencode('.jpg', img, encode_param)
+                            del img
+                            t_encoded = time.perf_counter()
+                            trace_metrics.record(cam_id, "jpeg_wait", (t_read - view.timestamp) * 1000)
+                            trace_metrics.record(cam_id, "jpeg_encode", (t_encoded - t_read) * 1000)
+                            trace_metrics.record(cam_id, "jpeg_total", (t_encoded - view.timestamp) * 1000)
+
+                            # Воркер мог перезаписать слот во время encode -> рваный кадр, выбрасываем
+                            if ret and view.is_valid():
                                 frame_data = jpg.tobytes()
-                                current_fid = fid
-                                last_frame_id = fid
+                                current_fid = view.frame_id
 
-                        elif last_frame_id > fid + 5000:
-                            last_frame_id = -1  # Auto-recovery
+                        elif view is None and cursor.last_frame_id > 0:
+                            head = mgr.read_frame()
+                            if head and cursor.last_frame_id > head[0] + 5000:
+                                cursor = mgr.cursor()  # Auto-recovery (frame_id пошли заново)
 
                     finally:
-                        if slot_view is not None:
-                            del slot_view
-                            slot_view = None
-                        if frame is not None:
-                            del frame
-                            frame = None
+                        if view is not None:
+                            view.release()
+                            view = None
                     # --- END CRITICAL SECTION ---
 
                     if frame_data:
                         header = struct.pack('<QI', current_fid, len(frame_data))
                         yield header + frame_data
-                    else:
-                        time.sleep(0.004)
 
                 except Exception as e:
                     if time.time() - last_error_time > 2.0:
@@ -237,6 +289,8 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                     if isinstance(e, (BufferError, ValueError, FileNotFoundError)):
                         if cam_id in video_managers:
                             video_managers.pop(cam_id, None)
+                            # Переподключимся по текущей записи реестра
+                            video_generations.pop(cam_id, None)
                     time.sleep(0.1)
                     continue
 
@@ -247,19 +301,105 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
             media_type="application/octet-stream"
         )
 
+    @app.get("/shm/registry")
+    async def shm_registry():
+        """Опубликованные кольца камер (содержимое реестра SHM)"""
+        registry = get_registry()
+        return {"cameras": [e.model_dump() for e in registry.entries()] if registry else []}
+
+    @app.get("/bus/stats")
+    async def bus_stats():
+        """Телеметрия EventBus: глубина, enqueued/dequeued/dropped и задержка put по каналам"""
+        return event_bus.telemetry_report()
+
+    @app.get("/metrics")
+    async def metrics():
+        """OpenMetrics: задержки стадий, полного кадра и участков сквозной трассы (histogram + скользящие перцентили)"""
+        lines = stage_metrics.metric_lines() + trace_metrics.metric_lines() + ["# EOF"]
+        return Response(
+            content="\n".join(lines) + "\n",
+            media_type="application/openmetrics-text; version=1.0.0; charset=utf-8"
+        )
+
+    @app.get("/metrics/latency")
+    async def latency_report():
+        """То же в JSON: {camera_id | "all": {stage: {window: {p50, p95, p99, max}}}}"""
+        return stage_metrics.report()
+
+    @app.get("/metrics/trace")
+    async def trace_report():
+        """Сквозная задержка по участкам (capture -> shm -> ... -> send, видео, display) в JSON"""
+        return trace_metrics.report()
+
+    @app.post("/command")
+    async def send_command(command: PluginCommand):
+        """Команда воркеру напрямую; ответ — ack с примененным результатом и задержкой"""
+        future = event_bus.request(command.target, command.cmd, command.args, request_id=command.request_id)
+        return await asyncio.wrap_future(future)
+
+    @app.post("/plugins/reload")
+    async def reload_plugins(modules: Optional[List[str]] = Body(None, embed=True)):
+        """Hot-reload плагинов во всех воркерах; в results — отчет камеры (swapped/added/removed, ms)"""
+        future = event_bus.request("plugins", "RELOAD_PLUGINS", {"modules": modules})
+        return await asyncio.wrap_future(future)
+
+    @app.post("/profiles/start")
+    async def profile_start(camera: str = Body("all", embed=True), frames: Optional[int] = Body(None, embed=True),
+                            seconds: Optional[float] = Body(None, embed=True)):
+        """Запуск профайлера в воркере ("camera_0") или во всех ("all"); автостоп по frames / seconds"""
+        future = event_bus.request(camera, "PROFILE_START", {"frames": frames, "seconds": seconds})
+        return await asyncio.wrap_future(future)
+
+    @app.post("/profiles/stop")
+    async def profile_stop(camera: str = Body("all", embed=True)):
+        """Остановка; в results — отчет камеры (session, samples, топ функций по стадиям)"""
+        future = event_bus.request(camera, "PROFILE_STOP")
+        return await asyncio.wrap_future(future)
+
+    @app.get("/profiles")
+    async def list_profiles():
+        """Сессии профайлера в data/profiles (новые первыми) с файлами по стадиям"""
+        if not PROFILES_DIR.exists():
+            return []
+        sessions = sorted((p for p in PROFILES_DIR.iterdir() if p.is_dir()), key=lambda p: p.name, reverse=True)
+        return [{"session": p.name, "files": sorted(f.name for f in p.iterdir() if f.is_file())} for p in sessions]
+
+    @app.get("/profiles/{session}/{file_name}")
+    async def download_profile(session: str, file_name: str):
+        """Скачать .folded (flamegraph.pl / speedscope) или summary.json"""
+        path = (PROFILES_DIR / session / file_name).resolve()
+        if path.parent.parent != PROFILES_DIR.resolve() or not path.is_file():
+            raise HTTPException(status_code=404, detail="profile not found")
+        return FileResponse(path, filename=f"{session}_{file_name}")
+
+    @app.get("/results/{cam_id}")
+    async def latest_results(cam_id: int):
+        """Последние точки камеры прямо из SHM результатов (без EventBus)"""
+        mgr = video_managers.get(cam_id)
+        res = mgr.results.read_latest() if mgr and mgr.results else None
+        if res is None:
+            return {"camera_id": cam_id, "frame_id": None, "points": []}
+
+        fid, ts, frame_ms, points = res
+        return {
+            "camera_id": cam_id,
+            "frame_id": fid,
+            "timestamp": ts,
+            "frame_ms": frame_ms,
+            # NaN (нет калибровки) -> None, иначе JSON не соберется
+            "points": [
+                {name: (None if isinstance(v, float) and v != v else v)
+                 for name, v in zip(points.dtype.names, row.tolist())}
+                for row in points
+            ]
+        }
+
     # --- WEBSOCKET ENDPOINT ---
     @app.websocket("/ws/stream")
     async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
-
-        def universal_encoder(obj: Any):
-            if isinstance(obj, np.ndarray): return obj.tolist()
-            if isinstance(obj, BaseModel): return obj.dict()
-            if hasattr(obj, "model_dump"): return obj.model_dump()
-            try:
-                return jsonable_encoder(obj)
-            except:
-                return str(obj)
+        # [FIX] Сильные ссылки на задачи ack: event loop хранит задачи только по weakref
+        ack_tasks: Set[asyncio.Task] = set()
 
         async def listen_to_frontend():
             try:
@@ -269,44 +409,78 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                         msg = json.loads(raw_msg)
                         if isinstance(msg, dict) and msg.get("type") == "ping":
                             continue
+                        if isinstance(msg, dict) and msg.get("type") == "resync":
+                            # Клиент получил delta не от своего keyframe
+                            request_keyframes()
+                            continue
+                        if isinstance(msg, dict) and msg.get("type") == "trace_echo":
+                            # TRACE_ECHO: фронтенд отрисовал кадр и вернул t_send -> отправка + отрисовка + обратный путь
+                            trace_metrics.record(int(msg.get("camera_id", 0)), "display",
+                                                 (time.perf_counter() - float(msg["t_send"])) * 1000)
+                            continue
 
                         if "payload" in msg and "target" in msg:
                             cmd_data = {
                                 "target": msg["target"],
                                 "cmd": msg["payload"].get("cmd", "UNKNOWN"),
-                                "args": msg["payload"].get("args", {})
+                                "args": msg["payload"].get("args", {}),
+                                "request_id": msg.get("request_id")
                             }
                         else:
                             cmd_data = msg
 
                         command = PluginCommand(**cmd_data)
-                        event_bus.publish_event("command", command.dict())
+                        if command.target == "system":
+                            # Системные команды по-прежнему решает оркестратор
+                            event_bus.publish_event("command", command.dict())
+                            continue
+
+                        # Камерам и плагинам — напрямую в очередь воркера, минуя оркестратор
+                        future = event_bus.request(command.target, command.cmd, command.args,
+                                                   request_id=command.request_id)
+                        if command.request_id:
+                            task = asyncio.create_task(send_ack(future))
+                            ack_tasks.add(task)
+                            task.add_done_callback(ack_tasks.discard)
 
                     except Exception:
                         pass
             except WebSocketDisconnect:
                 pass
 
-        async def send_packet(packet: dict):
-            """Helper для отправки JSON"""
+        def request_keyframes():
+            """Стрим идет дельтами от keyframe: новому клиенту нужен полный кадр от каждой камеры"""
+            event_bus.request("stream", "REQUEST_KEYFRAME")
+
+        async def send_packet(packet: Union[dict, bytes]):
+            """Helper для отправки JSON (bytes от воркера уже сериализованы — отдаем как есть)"""
             try:
-                json_bytes = orjson.dumps(
-                    packet,
-                    default=universal_encoder,
-                    # [FIX] Добавляем OPT_NON_STR_KEYS, чтобы числа-ключи не ломали отправку
-                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
-                )
+                json_bytes = packet if isinstance(packet, (bytes, bytearray)) else serialization.dumps(packet)
                 await websocket.send_text(json_bytes.decode('utf-8'))
             except Exception as e:
                 logger.error(f"Serialize Error: {e}")
 
+        async def send_ack(future):
+            """Ответ на команду с request_id: что применил воркер и за сколько"""
+            ack = await asyncio.wrap_future(future)
+            await send_packet({"type": "command_ack", "payload": ack})
+
         async def send_to_frontend():
+            # Свои очереди у каждого соединения: вкладки не делят кадры между собой
+            critical_sub = event_bus.subscribe(TOPIC_CRITICAL, maxsize=100, policy=POLICY_DROP_OLDEST)
+            # system_monitor — состояние, а не события: в очереди держим только последний
+            broadcast_sub = event_bus.subscribe(
+                TOPIC_BROADCAST, maxsize=100, policy=POLICY_COALESCE,
+                key=lambda m: m.get("type") if m.get("type") == "system_monitor" else None
+            )
+            stream_sub = event_bus.subscribe(TOPIC_STREAM, maxsize=10, policy=POLICY_DROP_OLDEST)
+            request_keyframes()
             try:
                 while True:
                     data_sent = False
 
                     # 1. [CRITICAL] СНАЧАЛА читаем гарантированный канал (Handshake)
-                    critical = event_bus.get_critical_data()
+                    critical = critical_sub.get()
                     if critical:
                         if critical.get("type") == "shm_handshake":
                             handle_update_shm(critical["payload"])
@@ -315,8 +489,7 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                         data_sent = True
 
                     # 2. [BROADCAST] Сообщения от Оркестратора (SystemMonitor, Logs)
-                    # === FIX: Используем get_broadcast_data ===
-                    broadcast = event_bus.get_broadcast_data()
+                    broadcast = broadcast_sub.get()
                     if broadcast:
                         m_type = broadcast.get("type")
                         payload = broadcast.get("payload")
@@ -351,10 +524,16 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
 
                     # 3. Если критических данных нет, читаем стрим (точки)
                     if not data_sent:
-                        for _ in range(10):  # Пачками, чтобы быстрее разгребать
-                            stream_data = event_bus.get_stream_data()
-                            if not stream_data: break
+                        # Все накопившееся одним вызовом (без блокировки event loop)
+                        batch = stream_sub.get_batch(max_items=10)
+                        t_received = time.perf_counter()
+                        for stream_data in batch:
+                            trace = read_trace(stream_data)
+                            if trace and settings.TRACE_ECHO:
+                                stream_data = with_send_time(stream_data)
                             await send_packet(stream_data)
+                            if trace:
+                                trace_metrics.record_trace(trace, t_received, time.perf_counter())
                             data_sent = True
 
                     if not data_sent:
@@ -366,8 +545,18 @@ def create_app(event_bus: EventBus, storage: CalibrationStorage, default_shm: Sh
                 pass
             except Exception as e:
                 logger.error(f"WS Send Error: {e}")
+            finally:
+                if stream_sub.dropped:
+                    logger.info(f"WS closed: {stream_sub.dropped} stream packets dropped (slow client)")
+                for sub in (critical_sub, broadcast_sub, stream_sub):
+                    sub.close()
 
-        await asyncio.gather(listen_to_frontend(), send_to_frontend())
+        try:
+            await asyncio.gather(listen_to_frontend(), send_to_frontend())
+        finally:
+            # Клиент ушел: ack-и ему больше не нужны
+            for task in list(ack_tasks):
+                task.cancel()
 
     return app
 
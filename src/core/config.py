@@ -2,15 +2,18 @@
 import sys
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Literal
+from typing import Dict, List, Optional, Literal, Tuple
 from loguru import logger
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, BaseModel
 
+from src.data.models import PixelFormat
+
 # === 1. ГЛОБАЛЬНЫЕ ПУТИ ===
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 LOG_DIR = ROOT_DIR / "logs"
 DATA_DIR = ROOT_DIR / "data"
+PROFILES_DIR = DATA_DIR / "profiles"  # Сессии профайлера воркеров (collapsed stacks)
 CONFIG_FILE = ROOT_DIR / "bikefit_db.json"  # <-- JSON Профиль
 
 LOG_DIR.mkdir(exist_ok=True)
@@ -32,6 +35,7 @@ class CameraProfile(BaseModel):
     resolution: List[int] = [1920, 1200]
     calibration_file: str  # "calibration_side.json"
     enabled: bool = True
+    pixel_format: Optional[PixelFormat] = None  # None -> settings.SHM_PIXEL_FORMAT
 
 
 class SystemProfile(BaseModel):
@@ -63,8 +67,44 @@ class SystemSettings(BaseSettings):
 
     # --- Shared Memory ---
     SHM_BUFFER_COUNT: int = 10
+    SHM_PIXEL_FORMAT: PixelFormat = PixelFormat.GRAY8  # Формат слотов по умолчанию
+    SHM_RESULTS_COUNT: int = 64  # Слотов в кольце результатов (точки + метрики кадра)
+    SHM_RESULTS_MAX_POINTS: int = 64  # Максимум точек в одном кадре (max_blobs = 50)
+    SHM_PREFAULT: bool = True  # Трогаем все страницы кольца при создании (без page fault на первых кадрах)
+    SHM_MLOCK: bool = False  # mlock кольца (нужен ulimit -l / CAP_IPC_LOCK)
+    SHM_HUGEPAGES: bool = True  # madvise(MADV_HUGEPAGE) для сегментов SHM
+    SHM_LEASE_TIMEOUT: float = 0.5  # Максимальная аренда слота читателем (сек), дальше писатель ее снимает
+    SHM_REGISTRY_NAME: str = "bikefit_shm_registry"  # Известное имя реестра колец (см. ShmRegistry)
+    SHM_REGISTRY_SLOTS: int = 16  # Максимум камер в реестре
     SHARED_MEMORY_SIZE: int = 500_000_000
 
+    # --- Pipeline ---
+    PIPELINE_WORKERS: int = 0  # Потоков для стадий (0 = все стадии последовательно на потоке захвата; >0 — конвейер DAG)
+    PIPELINE_DEPTH: int = 2  # Кадров в работе одновременно (захват следующего идет, пока стадии считают текущий)
+    PLUGIN_HOT_RELOAD: bool = False  # Следить за файлами src/plugins и перезагружать измененные без рестарта воркера
+    PLUGIN_WATCH_INTERVAL_S: float = 1.0  # Как часто проверять mtime файлов плагинов
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0  # Период сэмплов профайлера (PROFILE_START); меньше — точнее, но дороже (GIL)
+    PROFILE_MAX_S: float = 60.0  # Сессия без автостопа по кадрам закончится сама через столько секунд
+
+    # --- QoS (бюджет кадра) ---
+    QOS_ENABLED: bool = True  # Деградация не-core плагинов, когда кадр не укладывается в бюджет
+    QOS_BUDGET_MS: Optional[float] = None  # None = 1000 / CAMERA_FPS (x PIPELINE_DEPTH в конвейере)
+    QOS_WINDOW_S: float = 2.0  # Окно, по которому считается p95 времени кадра
+    QOS_INTERVAL_S: float = 0.5  # Как часто governor принимает решение (одно изменение за раз)
+    QOS_RESTORE_RATIO: float = 0.7  # Запас: p95 < бюджет * 0.7 -> можно вернуть плагин
+    QOS_RESTORE_HOLD: int = 4  # Сколько оценок подряд держится запас перед восстановлением
+
+    # --- Metrics ---
+    METRICS_WINDOWS: Tuple[int, ...] = (10, 60)  # Окна скользящих перцентилей задержки стадий (сек)
+    TRACE_ECHO: bool = False  # t_send в пакеты стрима: фронтенд возвращает его после отрисовки (участок display)
+    METRICS_SLICE_S: float = 1.0  # Шаг скользящего окна (сек)
+
+    # --- Event Bus ---
+    # "manager" (Manager proxy) | "native" (multiprocessing.Queue, свои каналы у каждого воркера — быстрее, см. EventBus)
+    EVENT_BUS_TRANSPORT: str = "manager"
+    COMMAND_ACK_TIMEOUT: float = 1.0  # Сколько ждать подтверждения команды от воркера (сек)
+    STREAM_KEYFRAME_INTERVAL: int = 90  # Полный кадр раз в N кадров, между ними — отличия (0 = всегда полный)
+
     # --- Network ---
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
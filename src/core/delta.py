@@ -0,0 +1,126 @@
+# src/core/delta.py
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.core import serialization
+
+# Состояние кадра: клиент держит последнее значение (в delta — только если изменилось)
+STATE_FIELDS = ("fps", "errors", "active_plugins", "camera_config")
+# События кадра: приходят как есть и не сливаются (пустые не отправляются)
+EVENT_FIELDS = ("notifications",)
+# trace всегда первый ключ пакета: API читает его без разбора JSON (read_trace)
+_TRACE_PREFIX = b'{"trace":['
+
+
+class DeltaEncoder:
+    """
+    Сериализация пакета стрима с дельта-кодированием (работает внутри Processor).
+
+    Раз в interval кадров (и по request_keyframe) уходит полный кадр — keyframe.
+    Между ними — delta ОТНОСИТЕЛЬНО KEYFRAME (не предыдущего кадра): поля состояния
+    и ключи results ("namespace" -> "key"), которые отличаются от keyframe.
+    Виджеты клиент и так копит по widget_id: keyframe несет все известные, delta — только
+    изменившиеся с прошлой отправки (потерянное обновление долечит следующий keyframe).
+    Поэтому потерянные delta (drop-oldest в шине и у медленного WS) ничего не ломают:
+    клиенту нужен только его keyframe. Контракт слияния — docs/API_REFERENCE.md.
+
+    Каждое значение сериализуется отдельно (orjson), сравнение — по bytes,
+    пакет собирается из готовых кусков без второго прохода.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = max(0, interval)
+        self._kf_id: Optional[int] = None
+        self._since_kf = 0
+        self._force = True
+        self._kf_fields: Dict[str, bytes] = {}
+        self._kf_results: Dict[Tuple[str, str], bytes] = {}
+        self._widgets: Dict[str, bytes] = {}  # Последнее значение каждого виджета (за все кадры)
+        # camera_config меняется только заменой объекта (SET_CONFIG) — не сериализуем его каждый кадр
+        self._config: Tuple[Any, bytes] = (None, b"{}")
+
+    def request_keyframe(self):
+        """Новый клиент / клиент потерял keyframe: следующий пакет будет полным"""
+        self._force = True
+
+    def encode(self, frame_id: int, camera_id: int, fields: Dict[str, Any],
+               results: Dict[str, Dict[str, Any]], trace: Optional[List[float]] = None) -> bytes:
+        """
+        fields: STATE_FIELDS + EVENT_FIELDS + "widgets" (обновления кадра), results: ctx.data_snapshot.
+        trace: отметки perf_counter по пути кадра (см. HopMetrics), уходят первым ключом как есть
+        """
+        state = {name: self._dump_field(name, fields.get(name)) for name in STATE_FIELDS}
+        updated = []
+        for widget in fields.get("widgets") or ():
+            widget_id = str(getattr(widget, "widget_id", None) or widget.get("widget_id"))
+            raw = _dumps(widget)
+            if self._widgets.get(widget_id) != raw:
+                self._widgets[widget_id] = raw
+                updated.append(raw)
+        values = {(str(ns), str(key)): _dumps(value)
+                  for ns, keys in results.items() for key, value in keys.items()}
+
+        self._since_kf += 1
+        keyframe = self._force or self._kf_id is None or not self.interval or self._since_kf >= self.interval
+        if keyframe:
+            self._force = False
+            self._since_kf = 0
+            self._kf_id = frame_id
+            self._kf_fields = state
+            self._kf_results = values
+            changed_state = state
+            changed = values
+            widgets = list(self._widgets.values())
+            removed: List[Tuple[str, str]] = []
+        else:
+            changed_state = {k: v for k, v in state.items() if self._kf_fields.get(k) != v}
+            changed = {k: v for k, v in values.items() if self._kf_results.get(k) != v}
+            widgets = updated
+            removed = [k for k in self._kf_results if k not in values]
+
+        head = []
+        if trace:
+            head.append(("trace", b"[%d," % camera_id + b",".join(b"%.6f" % t for t in trace) + b"]"))
+        head += [("frame_id", _dumps(frame_id)), ("camera_id", _dumps(camera_id)),
+                 ("kf", _dumps(self._kf_id)), ("delta", b"false" if keyframe else b"true")]
+        head += changed_state.items()
+        for name in EVENT_FIELDS:
+            if fields.get(name):
+                head.append((name, _dumps(fields[name])))
+        if widgets:
+            head.append(("widgets", b"[" + b",".join(widgets) + b"]"))
+
+        if changed or keyframe:
+            grouped: Dict[str, List[Tuple[str, bytes]]] = {}
+            for (ns, key), raw in changed.items():
+                grouped.setdefault(ns, []).append((key, raw))
+            head.append(("results", _object((ns, _object(items)) for ns, items in grouped.items())))
+        if removed:
+            head.append(("removed", _dumps(removed)))
+
+        return _object(head)
+
+    def _dump_field(self, name: str, value: Any) -> bytes:
+        if name == "camera_config":
+            if value is not self._config[0]:
+                self._config = (value, _dumps(value if value is not None else {}))
+            return self._config[1]
+        return _dumps(value)
+
+
+def read_trace(packet: Union[Dict[str, Any], bytes]) -> Optional[List[float]]:
+    """trace пакета стрима ([camera_id, capture, shm, begin, stages, publish]) без разбора всего JSON"""
+    if isinstance(packet, dict):
+        return packet.get("trace")
+    if not packet.startswith(_TRACE_PREFIX):
+        return None
+    end = packet.find(b"]", len(_TRACE_PREFIX))
+    return [float(x) for x in packet[len(_TRACE_PREFIX):end].split(b",")]
+
+
+def _dumps(value: Any) -> bytes:
+    return serialization.dumps(value)
+
+
+def _object(items: Iterable[Tuple[str, bytes]]) -> bytes:
+    """JSON-объект из уже сериализованных значений"""
+    return b"{" + b",".join(_dumps(key) + b":" + raw for key, raw in items) + b"}"
@@ -1,94 +1,663 @@
 # src/core/event_bus.py
 import queue
-from typing import Any, Dict, Optional, Union
+import time
+import uuid
+import threading
+import multiprocessing
+from multiprocessing import connection as mp_connection
+from concurrent.futures import Future
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Union
 from loguru import logger
 
+from src.core.config import settings
+from src.core.telemetry import LatencyHistogram
+
+TRANSPORT_MANAGER = "manager"
+TRANSPORT_NATIVE = "native"
+
+# Топики pub/sub (= межпроцессные каналы шины)
+TOPIC_STREAM = "stream"
+TOPIC_BROADCAST = "broadcast"
+TOPIC_CRITICAL = "critical"
+
+# Каналы телеметрии: топики + служебные очереди
+CHANNEL_UPSTREAM = "upstream"
+CHANNEL_COMMAND = "command"
+CHANNEL_ACK = "ack"
+CHANNELS = (CHANNEL_UPSTREAM, TOPIC_BROADCAST, TOPIC_STREAM, TOPIC_CRITICAL, CHANNEL_COMMAND, CHANNEL_ACK)
+
+# Этапы задержки команды (perf_counter — CLOCK_MONOTONIC, общий для процессов на Linux):
+# delivery: API -> воркер достал из очереди, apply: применение в воркере, rtt: до ack в API
+COMMAND_STAGES = ("delivery", "apply", "rtt")
+
+# Политики переполнения очереди подписчика
+POLICY_DROP_OLDEST = "drop_oldest"  # Ограниченная FIFO, при переполнении теряем самое старое
+POLICY_LATEST = "latest"  # Только последнее сообщение
+POLICY_COALESCE = "coalesce"  # Новое сообщение с тем же ключом заменяет старое (key=...)
+
+
+def resolve_camera_id(target: Union[str, int, None]) -> Optional[int]:
+    """
+    Единый формат адресата команды (API request, оркестратор):
+    "camera_N" / "cam_N" / N -> id камеры, все остальное (id плагина, "system") -> None.
+    """
+    if isinstance(target, int):
+        return target
+    if not isinstance(target, str):
+        return None
+    if target.startswith("cam_") or target.startswith("camera_"):
+        target = target.split("_", 1)[1]
+    try:
+        return int(target)
+    except ValueError:
+        return None
+
+
+class BusTelemetry:
+    """
+    Счетчики шины в ОДНОМ процессе: enqueued / dequeued / dropped и
+    гистограмма задержки put по каждому каналу.
+    Воркеры шлют snapshot() в heartbeat, оркестратор складывает их в
+    EventBus.record_remote_telemetry(), API отдает сводку telemetry_report().
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, int]] = {
+            ch: {"enqueued": 0, "dequeued": 0, "dropped": 0} for ch in CHANNELS
+        }
+        self.put_latency: Dict[str, LatencyHistogram] = {ch: LatencyHistogram() for ch in CHANNELS}
+        # Команды с подтверждением (EventBus.request)
+        self.commands: Dict[str, int] = {"sent": 0, "acked": 0, "failed": 0, "timeout": 0, "coalesced": 0}
+        self.command_latency: Dict[str, LatencyHistogram] = {st: LatencyHistogram() for st in COMMAND_STAGES}
+
+    def on_put(self, channel: str, t0: float, ok: bool):
+        self.put_latency[channel].record((time.perf_counter() - t0) * 1000)
+        self.counters[channel]["enqueued" if ok else "dropped"] += 1
+
+    def on_drop(self, channel: str, n: int = 1):
+        self.counters[channel]["dropped"] += n
+
+    def on_get(self, channel: str, n: int):
+        if n:
+            self.counters[channel]["dequeued"] += n
+
+    def on_command(self, event: str, n: int = 1):
+        if n:
+            self.commands[event] += n
+
+    def on_ack(self, t_sent: float, t_received: Optional[float], t_applied: Optional[float]):
+        now = time.perf_counter()
+        self.command_latency["rtt"].record((now - t_sent) * 1000)
+        if t_received:
+            self.command_latency["delivery"].record(max(t_received - t_sent, 0.0) * 1000)
+            if t_applied:
+                self.command_latency["apply"].record(max(t_applied - t_received, 0.0) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        snap = {
+            ch: dict(self.counters[ch], put_latency=self.put_latency[ch].to_dict())
+            for ch in CHANNELS
+        }
+        snap["commands"] = dict(
+            self.commands, latency={st: h.to_dict() for st, h in self.command_latency.items()}
+        )
+        return snap
+
+
+class Subscription:
+    """
+    Независимая очередь подписчика на топик (у каждого WebSocket / Recorder своя).
+    Потокобезопасна: наполняется потоком TopicHub, читается потребителем.
+    """
+
+    def __init__(self, hub: 'TopicHub', topic: str, maxsize: int, policy: str,
+                 key: Optional[Callable[[Any], Any]] = None):
+        if policy not in (POLICY_DROP_OLDEST, POLICY_LATEST, POLICY_COALESCE):
+            raise ValueError(f"Unknown overflow policy '{policy}'")
+        if policy == POLICY_COALESCE and key is None:
+            raise ValueError("Coalesce policy requires a key function")
+
+        self.topic = topic
+        self.policy = policy
+        self.maxsize = 1 if policy == POLICY_LATEST else max(1, maxsize)
+        self.dropped = 0  # Выброшено из-за переполнения / заменено более свежим
+        self._hub = hub
+        self._key = key
+        self._items = OrderedDict() if policy == POLICY_COALESCE else deque()
+        self._cond = threading.Condition()
+        self._seq = 0  # Уникальные ключи для сообщений без ключа (coalesce)
+
+    def _push(self, msg: Any):
+        with self._cond:
+            if self.policy == POLICY_COALESCE:
+                try:
+                    k = self._key(msg)
+                except Exception:
+                    k = None
+                if k is None:
+                    self._seq += 1
+                    k = ("__seq", self._seq)
+                if k in self._items:
+                    del self._items[k]
+                    self.dropped += 1
+                self._items[k] = msg
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+                    self.dropped += 1
+            else:
+                self._items.append(msg)
+                while len(self._items) > self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._cond.notify()
+
+    def _pop(self) -> Any:
+        if self.policy == POLICY_COALESCE:
+            return self._items.popitem(last=False)[1]
+        return self._items.popleft()
+
+    def get(self, timeout: float = 0.0) -> Optional[Any]:
+        """Следующее сообщение или None (timeout > 0 — подождать)"""
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def get_batch(self, max_items: int = 64, timeout: float = 0.0) -> List[Any]:
+        """Все накопившееся (не больше max_items); timeout > 0 — ждать первое сообщение"""
+        with self._cond:
+            if not self._items and timeout > 0:
+                self._cond.wait(timeout)
+            items = []
+            while self._items and len(items) < max_items:
+                items.append(self._pop())
+            return items
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TopicHub:
+    """
+    Fan-out межпроцессных каналов шины по локальным подписчикам.
+    Живет только в процессе-потребителе (API): поток-насос забирает сообщения
+    из очередей EventBus пачками и раскладывает копии ссылок во все подписки топика.
+    Насос работает, пока есть хотя бы один подписчик, иначе очереди шины
+    остаются нетронутыми для старых get_*_data().
+    """
+
+    def __init__(self, bus: 'EventBus'):
+        self._bus = bus
+        self._subs: Dict[str, List[Subscription]] = {TOPIC_STREAM: [], TOPIC_BROADCAST: [], TOPIC_CRITICAL: []}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, topic: str, maxsize: int, policy: str,
+                  key: Optional[Callable[[Any], Any]] = None) -> Subscription:
+        if topic not in self._subs:
+            raise ValueError(f"Unknown topic '{topic}'")
+        sub = Subscription(self, topic, maxsize, policy, key)
+        with self._lock:
+            # Копия списка: насос итерирует по снимку без блокировки
+            self._subs[topic] = self._subs[topic] + [sub]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._pump, daemon=True, name="EventBusHub")
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs[sub.topic] = [s for s in self._subs[sub.topic] if s is not sub]
+
+    def _has_subscribers(self) -> bool:
+        return any(self._subs.values())
+
+    def _dispatch(self, topic: str, messages: List[Any]):
+        subs = self._subs[topic]
+        for msg in messages:
+            for sub in subs:
+                sub._push(msg)
+
+    def _pump(self):
+        bus = self._bus
+        while True:
+            with self._lock:
+                if not self._has_subscribers():
+                    self._thread = None
+                    return
+            try:
+                # Критические и broadcast — редкие, без ожидания; на стриме спим до 10 мс
+                self._dispatch(TOPIC_CRITICAL, bus._take(TOPIC_CRITICAL, bus._critical_queue, 64, 0.0))
+                self._dispatch(TOPIC_BROADCAST, bus._take(TOPIC_BROADCAST, bus._broadcast_queue, 256, 0.0))
+                self._dispatch(TOPIC_STREAM, bus._take(TOPIC_STREAM, bus._stream_queue, 64, 0.01))
+            except (EOFError, OSError, BrokenPipeError):
+                return  # Шина закрыта (shutdown)
+            except Exception as e:
+                logger.error(f"EventBus hub error: {e}")
+
+
+class _PendingCommand:
+    """Команда, ждущая ack от воркеров (fan-out: по одному ack от каждой камеры)"""
+    __slots__ = ("request_id", "cmd", "future", "expected", "results", "t_sent")
+
+    def __init__(self, request_id: str, cmd: str, expected: List[int], t_sent: float):
+        self.request_id = request_id
+        self.cmd = cmd
+        self.future: Future = Future()
+        self.expected = set(expected)
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.t_sent = t_sent
+
+    def add(self, camera_id: int, result: Dict[str, Any]):
+        self.expected.discard(camera_id)
+        self.results[str(camera_id)] = result
+
+    def resolve(self):
+        if self.future.done():
+            return
+        self.future.set_result({
+            "request_id": self.request_id,
+            "cmd": self.cmd,
+            "ok": bool(self.results) and all(r.get("ok") for r in self.results.values()),
+            "results": self.results,
+            "latency_ms": (time.perf_counter() - self.t_sent) * 1000,
+        })
+
+
+class _WorkerChannels:
+    """
+    [NEW] Каналы одного воркера для транспорта "native" (по очереди на направление).
+    Пишет в них только этот воркер, читает только главный процесс (SPSC), поэтому
+    воркер, убитый посреди put, ломает лишь свои каналы. register_worker создает их
+    заново при каждом (ре)старте.
+    """
+    # Канал -> атрибут общей очереди шины, который канал заменяет в копии воркера
+    UPSTREAM = {
+        CHANNEL_UPSTREAM: ("_upstream_queue", 1000),
+        TOPIC_STREAM: ("_stream_queue", 10),
+        TOPIC_CRITICAL: ("_critical_queue", 0),
+        CHANNEL_ACK: ("_ack_queue", 1000),
+    }
+
+    def __init__(self):
+        ctx = multiprocessing.get_context()
+        self.queues: Dict[str, Any] = {ch: ctx.Queue(maxsize=size) for ch, (_, size) in self.UPSTREAM.items()}
+        # Оркестратор / API -> Воркер
+        self.command = ctx.Queue(maxsize=100)
+
+    def detach_writers(self):
+        """
+        Главный процесс закрывает свои концы записи (после старта воркера). Тогда смерть
+        воркера читатель видит как EOF, а не виснет на недописанном сообщении.
+        """
+        for q in self.queues.values():
+            q._writer.close()
+
 
 class EventBus:
-    def __init__(self, manager):
+    """
+    Шина событий между процессами (Воркеры <-> Оркестратор <-> API).
+
+    Транспорт (settings.EVENT_BUS_TRANSPORT):
+      - "manager": прокси multiprocessing.Manager (socket round-trip до
+                   сервер-процесса на каждый put/get). По умолчанию: очередь живет
+                   в сервер-процессе, поэтому убитый воркер ее не портит.
+      - "native":  multiprocessing.Queue (pipe + feeder thread). Сообщение идет
+                   напрямую процесс -> процесс, без сервера Manager.
+                   [FIX] У каждого воркера свои каналы (_WorkerChannels): воркер получает
+                   при spawn копию for_worker(camera_id) только со своими очередями.
+                   Воркер, убитый посреди put (SIGKILL в ProcessorOrchestrator._kill_process),
+                   ломает лишь свой канал: читатель получает EOF и отбрасывает его,
+                   рестарт (register_worker) создает каналы заново.
+                   Порядок: register_worker -> Process(args=(..., bus.for_worker(id))).start()
+                   -> detach_worker(id).
+    API шины одинаковый для обоих транспортов. Замеры: tools/bench_event_bus.py.
+    """
+
+    def __init__(self, manager=None, transport: Optional[str] = None):
         # Мы используем manager только при инициализации, но НЕ СОХРАНЯЕМ его в self
+        self.transport = transport or settings.EVENT_BUS_TRANSPORT
+        if self.transport == TRANSPORT_MANAGER:
+            if manager is None:
+                raise ValueError("EventBus: 'manager' transport requires a multiprocessing.Manager")
+            make_queue = manager.Queue
+        elif self.transport == TRANSPORT_NATIVE:
+            make_queue = multiprocessing.get_context().Queue
+        else:
+            raise ValueError(f"EventBus: unknown transport '{self.transport}'")
 
         # 1. Воркер -> Оркестратор
-        self._upstream_queue = manager.Queue(maxsize=1000)
+        self._upstream_queue = make_queue(maxsize=1000)
 
         # 2. Оркестратор -> API
-        self._broadcast_queue = manager.Queue(maxsize=1000)
+        self._broadcast_queue = make_queue(maxsize=1000)
 
         # 3. Видеопоток
-        self._stream_queue = manager.Queue(maxsize=10)
+        self._stream_queue = make_queue(maxsize=10)
 
         # 4. Критические
-        self._critical_queue = manager.Queue()
+        self._critical_queue = make_queue()
+
+        # 5. Команды (native: обычный dict, воркер получает свою очередь при spawn)
+        self._command_queues = manager.dict() if self.transport == TRANSPORT_MANAGER else {}
+        # Очереди, уже взятые этим процессом (manager.dict().get — round-trip к менеджеру на каждый кадр)
+        self._own_command_queues: Dict[int, Any] = {}
 
-        # 5. Команды
-        self._command_queues = manager.dict()
+        # 6. Подтверждения команд: Воркер -> API (см. request)
+        self._ack_queue = make_queue(maxsize=1000)
+
+        # 7. [NEW] native: свои каналы у каждого воркера {camera_id: _WorkerChannels}.
+        # Общие очереди выше остаются для продюсеров главного процесса
+        self._worker_channels: Dict[int, _WorkerChannels] = {}
+        self._rr = 0  # С какого источника начинать разбор (чтобы один воркер не занимал всю пачку)
 
         # [FIX] УДАЛЕНО: self._manager = manager
         # Нельзя хранить ссылку на менеджер, иначе объект не сериализуется!
 
-    def register_worker(self, camera_id: int, manager) -> Any:
-        # [FIX] Принимаем manager снаружи
-        q = manager.Queue(maxsize=100)
+        # Локальный fan-out по подписчикам (создается лениво, в другие процессы не уходит)
+        self._hub: Optional[TopicHub] = None
+        self._hub_lock = threading.Lock()
+
+        # Телеметрия этого процесса + последние снимки других процессов ({source: snapshot})
+        self.telemetry = BusTelemetry()
+        self._remote_telemetry: Dict[str, Dict[str, Any]] = {}
+
+        # Ожидающие подтверждения команды {request_id: _PendingCommand} (только в процессе API)
+        self._pending: Dict[str, _PendingCommand] = {}
+        self._pending_lock = threading.Lock()
+        self._ack_thread: Optional[threading.Thread] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_hub"] = None
+        state["_hub_lock"] = None
+        state["_pending"] = {}
+        state["_pending_lock"] = None
+        state["_ack_thread"] = None
+        state["_own_command_queues"] = {}
+        # Чужие каналы воркеру не нужны (свои он получает через for_worker)
+        state["_worker_channels"] = {}
+        return state
+
+    def __setstate__(self, state):
+        # Распаковка в процессе воркера
+        self.__dict__.update(state)
+        self._hub_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        # Счетчики у каждого процесса свои
+        self.telemetry = BusTelemetry()
+        self._remote_telemetry = {}
+        if self.transport == TRANSPORT_NATIVE:
+            # Воркер не должен зависать на выходе, дописывая буфер feeder-потока
+            # в очередь, которую никто не читает (API отключен, оркестратор стоит).
+            # Критическую очередь (handshake) не трогаем: ее сообщения терять нельзя.
+            for q in (self._upstream_queue, self._stream_queue, self._ack_queue):
+                q.cancel_join_thread()
+
+    def register_worker(self, camera_id: int, manager=None) -> Any:
+        # [FIX] Принимаем manager снаружи (нужен только транспорту "manager")
+        if self.transport == TRANSPORT_MANAGER:
+            q = manager.Queue(maxsize=100)
+        else:
+            # [FIX] При рестарте старые каналы (возможно, сломанные убитым воркером) просто бросаем
+            channels = _WorkerChannels()
+            self._worker_channels[camera_id] = channels
+            q = channels.command
         self._command_queues[camera_id] = q
-        logger.info(f"🔌 EventBus: Registered SHARED queue for Camera {camera_id}")
+        self._own_command_queues[camera_id] = q
+        logger.info(f"🔌 EventBus: Registered {self.transport} command queue for Camera {camera_id}")
         return q
 
+    def for_worker(self, camera_id: int) -> "EventBus":
+        """
+        [NEW] Шина для процесса воркера (передается в args Process).
+        native: копия, в которой общие очереди заменены каналами этого воркера, а команды
+        доступны только для своей камеры. manager: сама шина (очереди живут в сервере Manager).
+        """
+        channels = self._worker_channels.get(camera_id)
+        if channels is None:
+            return self
+        bus = EventBus.__new__(EventBus)
+        bus.__dict__.update(self.__getstate__())
+        for ch, (attr, _) in _WorkerChannels.UPSTREAM.items():
+            setattr(bus, attr, channels.queues[ch])
+        bus._broadcast_queue = None  # Воркер не пишет в API напрямую (только через оркестратор)
+        bus._command_queues = {camera_id: channels.command}
+        return bus
+
+    def detach_worker(self, camera_id: int):
+        """[NEW] native: звать после Process.start() — см. _WorkerChannels.detach_writers"""
+        channels = self._worker_channels.get(camera_id)
+        if channels is not None:
+            channels.detach_writers()
+
+    def _sources(self, channel: str, shared) -> List[Any]:
+        """Очереди канала: [(camera_id | None, queue)] — общая + каналы воркеров"""
+        sources = [(None, shared)]
+        if channel in _WorkerChannels.UPSTREAM:
+            for cid, channels in list(self._worker_channels.items()):
+                sources.append((cid, channels.queues[channel]))
+        return sources
+
+    def _drop_worker_channel(self, camera_id: int, q, error: Exception):
+        # Воркер умер (EOF) или оставил в pipe мусор: канал больше не читаем до рестарта
+        channels = self._worker_channels.get(camera_id)
+        if channels is not None and any(c is q for c in channels.queues.values()):
+            del self._worker_channels[camera_id]
+            logger.warning(f"⚠️ EventBus: dropped channels of Camera {camera_id} ({type(error).__name__})")
+
     # --- Methods for Workers ---
-    def publish_stream(self, data: Dict[str, Any]):
+    def publish_stream(self, data: Union[Dict[str, Any], bytes]):
+        """
+        Поток состояния кадра. data — dict или уже сериализованный JSON (bytes):
+        bytes шина не разбирает и отдает потребителю как есть.
+        """
+        t0 = time.perf_counter()
         try:
             self._stream_queue.put_nowait(data)
+            self.telemetry.on_put(TOPIC_STREAM, t0, True)
         except queue.Full:
-            try:
-                self._stream_queue.get_nowait()
-            except:
-                pass
-            try:
-                self._stream_queue.put_nowait(data)
-            except:
-                pass
+            # [FIX] Потребитель не успевает: выбрасываем НОВЫЙ пакет. Производитель не читает
+            # из общей очереди (get из воркера гоняется с другими воркерами и с API).
+            # Вытеснение старых — на стороне потребителя (подписки TopicHub, drop-oldest)
+            self.telemetry.on_put(TOPIC_STREAM, t0, False)
 
     def publish_critical(self, data: Dict[str, Any]):
+        t0 = time.perf_counter()
         self._critical_queue.put(data)
+        self.telemetry.on_put(TOPIC_CRITICAL, t0, True)
 
     def publish_event(self, event_type: str, payload: Dict[str, Any]):
         msg = {"type": event_type, "payload": payload}
         if event_type in ["heartbeat", "error", "worker_status"]:
+            t0 = time.perf_counter()
             try:
                 self._upstream_queue.put(msg, timeout=0.1)
+                self.telemetry.on_put(CHANNEL_UPSTREAM, t0, True)
             except queue.Full:
-                pass
+                self.telemetry.on_put(CHANNEL_UPSTREAM, t0, False)
 
     def publish_to_api(self, event_type: str, payload: Dict[str, Any]):
         msg = {"type": event_type, "payload": payload}
+        t0 = time.perf_counter()
         try:
             self._broadcast_queue.put(msg, timeout=0.1)
+            self.telemetry.on_put(TOPIC_BROADCAST, t0, True)
         except queue.Full:
-            pass
+            self.telemetry.on_put(TOPIC_BROADCAST, t0, False)
 
     # --- Methods for Orchestrator/Server ---
+    def _get_one(self, channel: str, q) -> Optional[Any]:
+        items = self._take(channel, q, 1, 0.0)
+        return items[0] if items else None
+
     def get_updates(self) -> Optional[Dict]:
-        try:
-            return self._upstream_queue.get_nowait()
-        except queue.Empty:
-            return None
+        return self._get_one(CHANNEL_UPSTREAM, self._upstream_queue)
 
     def get_broadcast_data(self) -> Optional[Dict]:
-        try:
-            return self._broadcast_queue.get_nowait()
-        except queue.Empty:
-            return None
+        return self._get_one(TOPIC_BROADCAST, self._broadcast_queue)
 
-    def get_stream_data(self) -> Optional[Dict]:
-        try:
-            return self._stream_queue.get_nowait()
-        except queue.Empty:
-            return None
+    def get_stream_data(self) -> Optional[Union[Dict, bytes]]:
+        return self._get_one(TOPIC_STREAM, self._stream_queue)
 
     def get_critical_data(self) -> Optional[Dict]:
+        return self._get_one(TOPIC_CRITICAL, self._critical_queue)
+
+    # --- Pub/Sub (несколько независимых потребителей одного потока) ---
+
+    def subscribe(self, topic: str, maxsize: int = 10, policy: str = POLICY_DROP_OLDEST,
+                  key: Optional[Callable[[Any], Any]] = None) -> Subscription:
+        """
+        Своя ограниченная очередь на топик (TOPIC_STREAM / TOPIC_BROADCAST / TOPIC_CRITICAL).
+        Каждый подписчик получает ВСЕ сообщения топика (с учетом своей политики
+        переполнения), а не делит их с другими, как при get_stream_data().
+
+        Пока есть подписчики, сообщения из очередей шины забирает TopicHub —
+        get_*_data() в этом процессе смешивать с подписками нельзя.
+        """
+        with self._hub_lock:
+            if self._hub is None:
+                self._hub = TopicHub(self)
+        return self._hub.subscribe(topic, maxsize, policy, key)
+
+    # --- Batch drain ---
+
+    @staticmethod
+    def _drain(q, max_items: int, timeout: float) -> List[Any]:
+        """
+        Забирает из очереди все доступное (не больше max_items) за один вызов.
+        timeout > 0: блокируется до первого сообщения (не дольше timeout секунд).
+        """
+        items = []
         try:
-            return self._critical_queue.get_nowait()
+            items.append(q.get(timeout=timeout) if timeout > 0 else q.get_nowait())
+            while len(items) < max_items:
+                items.append(q.get_nowait())
         except queue.Empty:
-            return None
+            pass
+        return items
+
+    def _take(self, channel: str, q, max_items: int, timeout: float) -> List[Any]:
+        sources = self._sources(channel, q)
+        if len(sources) == 1:
+            items = self._drain(q, max_items, timeout)
+        else:
+            items = self._drain_sources(sources, max_items)
+            if not items and timeout > 0:
+                # Ждем первое сообщение сразу на всех pipe канала
+                mp_connection.wait([src._reader for _, src in sources], timeout)
+                items = self._drain_sources(sources, max_items)
+        self.telemetry.on_get(channel, len(items))
+        return items
+
+    def _drain_sources(self, sources: List[Any], max_items: int) -> List[Any]:
+        """Без ожидания разбирает общую очередь и каналы воркеров (начало сдвигается по кругу)"""
+        items = []
+        self._rr = (self._rr + 1) % len(sources)
+        for cid, src in sources[self._rr:] + sources[:self._rr]:
+            try:
+                while len(items) < max_items:
+                    items.append(src.get_nowait())
+            except queue.Empty:
+                pass
+            except Exception as e:
+                if cid is None:
+                    raise  # Общая очередь: шина закрыта
+                # EOF или обрывок сообщения от убитого воркера — ломается только его канал
+                self._drop_worker_channel(cid, src, e)
+        return items
+
+    def take_commands(self, camera_id: int, max_items: int = 64) -> List[Any]:
+        """Сторона воркера: накопившиеся команды камеры в порядке поступления (без ожидания)"""
+        q = self._own_command_queues.get(camera_id)
+        if q is None:
+            q = self._command_queues.get(camera_id)
+            if q is None:
+                return []
+            self._own_command_queues[camera_id] = q
+        return self._take(CHANNEL_COMMAND, q, max_items, 0.0)
+
+    def get_stream_batch(self, max_items: int = 64, timeout: float = 0.0) -> List[Union[Dict, bytes]]:
+        """Пачка пакетов видеопотока (догоняем после паузы одним вызовом)"""
+        return self._take(TOPIC_STREAM, self._stream_queue, max_items, timeout)
+
+    def get_updates_batch(self, max_items: int = 256, timeout: float = 0.0) -> List[Dict]:
+        """Пачка сообщений Воркер -> Оркестратор"""
+        return self._take(CHANNEL_UPSTREAM, self._upstream_queue, max_items, timeout)
+
+    # --- Telemetry ---
+
+    def record_remote_telemetry(self, source: str, snapshot: Dict[str, Any]):
+        """Снимок BusTelemetry другого процесса (воркер присылает его в heartbeat)"""
+        self._remote_telemetry[source] = snapshot
+
+    def _depth(self, q) -> Optional[int]:
+        try:
+            return q.qsize()
+        except (NotImplementedError, OSError, EOFError):
+            return None  # macOS: sem_getvalue не реализован
+
+    def _depth_all(self, channel: str, shared) -> Optional[int]:
+        depths = [self._depth(q) for _, q in self._sources(channel, shared)]
+        return None if depths[0] is None else sum(d or 0 for d in depths)
+
+    def telemetry_report(self) -> Dict[str, Any]:
+        """
+        Сводка по всем каналам (этот процесс + последние снимки воркеров):
+        глубина очереди, enqueued / dequeued / dropped, задержка put (p50/p95/p99/max, мс)
+        и подписчики pub/sub с их потерями.
+        """
+        snapshots = [self.telemetry.snapshot()] + list(self._remote_telemetry.values())
+        depths = {
+            CHANNEL_UPSTREAM: self._depth_all(CHANNEL_UPSTREAM, self._upstream_queue),
+            TOPIC_BROADCAST: self._depth(self._broadcast_queue),
+            TOPIC_STREAM: self._depth_all(TOPIC_STREAM, self._stream_queue),
+            TOPIC_CRITICAL: self._depth_all(TOPIC_CRITICAL, self._critical_queue),
+            CHANNEL_COMMAND: sum(self._depth(q) or 0 for q in list(self._command_queues.values())),
+            CHANNEL_ACK: self._depth_all(CHANNEL_ACK, self._ack_queue),
+        }
+
+        channels = {}
+        for ch in CHANNELS:
+            hist = LatencyHistogram()
+            totals = {"enqueued": 0, "dequeued": 0, "dropped": 0}
+            for snap in snapshots:
+                data = snap.get(ch, {})
+                for k in totals:
+                    totals[k] += data.get(k, 0)
+                hist.merge(LatencyHistogram.from_dict(data.get("put_latency")))
+            channels[ch] = dict(totals, depth=depths[ch], put_latency_ms=hist.summary())
+
+        commands = {k: 0 for k in self.telemetry.commands}
+        latency = {st: LatencyHistogram() for st in COMMAND_STAGES}
+        for snap in snapshots:
+            data = snap.get("commands", {})
+            for k in commands:
+                commands[k] += data.get(k, 0)
+            for st in COMMAND_STAGES:
+                latency[st].merge(LatencyHistogram.from_dict(data.get("latency", {}).get(st)))
+        commands["pending"] = len(self._pending)
+        commands["latency_ms"] = {st: h.summary() for st, h in latency.items()}
+
+        subscribers = {}
+        if self._hub is not None:
+            for topic, subs in self._hub._subs.items():
+                subscribers[topic] = [
+                    {"policy": sub.policy, "depth": len(sub._items), "dropped": sub.dropped} for sub in subs
+                ]
+
+        return {
+            "transport": self.transport,
+            "sources": ["local"] + list(self._remote_telemetry.keys()),
+            "channels": channels,
+            "commands": commands,
+            "subscribers": subscribers,
+        }
 
     def send_command(self, target_or_id: Union[str, int], cmd_or_payload: Union[str, Dict],
                      args: Optional[Dict] = None):
@@ -98,7 +667,7 @@ class EventBus:
 
         target_str = str(target_or_id)
         worker_payload = {"cmd": str(cmd_or_payload), "args": args or {}}
-        target_id = self._resolve_camera_id(target_str)
+        target_id = resolve_camera_id(target_str)
 
         if target_id is not None:
             self._send_to_queue(target_id, worker_payload)
@@ -107,21 +676,116 @@ class EventBus:
             for cid in keys:
                 self._send_to_queue(cid, worker_payload)
 
-    def _resolve_camera_id(self, target: str) -> Optional[int]:
-        if target.startswith("cam_") or target.startswith("camera_"):
-            try:
-                return int(target.split("_")[1])
-            except:
-                pass
-        try:
-            return int(target)
-        except:
-            return None
-
-    def _send_to_queue(self, cam_id: int, payload: Dict):
+    def _send_to_queue(self, cam_id: int, payload: Dict) -> bool:
         if cam_id in self._command_queues:
             q = self._command_queues[cam_id]
+            t0 = time.perf_counter()
             try:
                 q.put(payload, timeout=0.1)
+                self.telemetry.on_put(CHANNEL_COMMAND, t0, True)
+                return True
             except queue.Full:
-                logger.warning(f"⚠️ Queue full for Cam-{cam_id}")
\ No newline at end of file
+                self.telemetry.on_put(CHANNEL_COMMAND, t0, False)
+                logger.warning(f"⚠️ Queue full for Cam-{cam_id}")
+        return False
+
+    # --- Command RPC (API -> Воркер напрямую, с подтверждением) ---
+
+    def request(self, target: Union[str, int], cmd: str, args: Optional[Dict] = None,
+                request_id: Optional[str] = None) -> Future:
+        """
+        Кладет команду прямо в очередь воркера (без оркестратора) и возвращает Future,
+        который резолвится ack-ом: {"request_id", "cmd", "ok", "results": {camera_id: ...}, "latency_ms"}.
+        target "camera_N" / "cam_N" / N -> одна камера (resolve_camera_id), иначе (id плагина) -> все камеры.
+        Future резолвится всегда: без ответа за COMMAND_ACK_TIMEOUT камера получает ok=False.
+        """
+        request_id = request_id or uuid.uuid4().hex
+        target_id = resolve_camera_id(target)
+        cameras = [target_id] if target_id is not None else list(self._command_queues.keys())
+
+        t_sent = time.perf_counter()
+        pending = _PendingCommand(request_id, cmd, cameras, t_sent)
+        payload = {
+            # Как и оркестратор: команда камере идет от имени "system", плагину — с его id
+            "target": "system" if target_id is not None else str(target),
+            "cmd": cmd,
+            "args": args or {},
+            "request_id": request_id,
+            "t_sent": t_sent,
+        }
+
+        with self._pending_lock:
+            self._pending[request_id] = pending
+            if self._ack_thread is None:
+                self._ack_thread = threading.Thread(target=self._ack_loop, daemon=True, name="EventBusAcks")
+                self._ack_thread.start()
+
+        for cid in cameras:
+            self.telemetry.on_command("sent")
+            if not self._send_to_queue(cid, payload):
+                self.telemetry.on_command("failed")
+                pending.add(cid, {"ok": False, "error": "not delivered"})
+
+        if not cameras:
+            pending.results["-1"] = {"ok": False, "error": f"no worker for target '{target}'"}
+        if not pending.expected:
+            self._finish(pending)
+        return pending.future
+
+    def publish_ack(self, ack: Dict[str, Any]):
+        """Воркер: подтверждение команды с request_id (см. request)"""
+        t0 = time.perf_counter()
+        try:
+            self._ack_queue.put_nowait(ack)
+            self.telemetry.on_put(CHANNEL_ACK, t0, True)
+        except queue.Full:
+            self.telemetry.on_put(CHANNEL_ACK, t0, False)
+
+    def _ack_loop(self):
+        """Разбирает ack-и воркеров и закрывает просроченные команды. Живет, пока есть ожидающие."""
+        while True:
+            for ack in self._take(CHANNEL_ACK, self._ack_queue, 256, 0.05):
+                self._handle_ack(ack)
+
+            deadline = time.perf_counter() - settings.COMMAND_ACK_TIMEOUT
+            with self._pending_lock:
+                expired = [p for p in self._pending.values() if p.t_sent < deadline]
+                for p in expired:
+                    del self._pending[p.request_id]
+                idle = not self._pending
+                if idle:
+                    self._ack_thread = None
+
+            for p in expired:
+                for cid in list(p.expected):
+                    self.telemetry.on_command("timeout")
+                    p.add(cid, {"ok": False, "error": "timeout"})
+                p.resolve()
+
+            if idle:
+                return
+
+    def _handle_ack(self, ack: Dict[str, Any]):
+        with self._pending_lock:
+            pending = self._pending.get(ack.get("request_id"))
+        if pending is None:
+            return  # Просрочен или чужой
+
+        self.telemetry.on_command("acked" if ack.get("ok") else "failed")
+        self.telemetry.on_ack(pending.t_sent, ack.get("t_received"), ack.get("t_applied"))
+        pending.add(ack.get("camera_id"), {
+            "ok": ack.get("ok", False),
+            "result": ack.get("result"),
+            "error": ack.get("error"),
+            "coalesced": ack.get("coalesced", 1),
+        })
+
+        if not pending.expected:
+            self._finish(pending)
+
+    def _finish(self, pending: _PendingCommand):
+        # Резолвит тот, кто первым снял команду из _pending (ack-поток или request)
+        with self._pending_lock:
+            owned = self._pending.pop(pending.request_id, None) is pending
+        if owned:
+            pending.resolve()
@@ -2,7 +2,8 @@
 import importlib
 import inspect
 import os
-from typing import List
+import sys
+from typing import Dict, List
 
 from fastapi import APIRouter
 from loguru import logger
@@ -29,13 +30,12 @@ def load_stage_by_path(path: str) -> PipelineStage:
         return None
 
 
-def scan_plugins(package_path: str = "src.plugins") -> List[PipelineStage]:
+def plugin_modules(package_path: str = "src.plugins") -> Dict[str, str]:
     """
-    Рекурсивно сканирует папку src/plugins (и подпапки) и загружает все найденные классы,
-    наследуемые от PipelineStage.
-    Игнорирует папки, начинающиеся с точки (например, .disabled).
+    {module_path: file_path} всех .py в папке плагинов (рекурсивно).
+    Игнорирует __init__.py и папки, начинающиеся с точки (например, .disabled).
     """
-    plugins = []
+    modules = {}
 
     # 1. Получаем реальный путь к корню плагинов
     base_dir = os.path.dirname(os.path.abspath(__file__))  # src/core
@@ -44,15 +44,15 @@ def scan_plugins(package_path: str = "src.plugins") -> List[PipelineStage]:
 
     if not os.path.exists(plugins_dir):
         logger.warning(f"Plugins directory not found: {plugins_dir}")
-        return []
+        return {}
 
     # 2. Рекурсивный обход (os.walk)
     for root, dirs, files in os.walk(plugins_dir):
         # [FILTER] Исключаем папки, начинающиеся с точки (.git, .disabled, etc.)
         # Изменяем список dirs "на лету" (in-place), чтобы os.walk туда не заходил
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
 
-        for file_name in files:
+        for file_name in sorted(files):
             # Грузим только .py файлы, игнорируем __init__.py (обычно там только экспорты)
             if file_name.endswith(".py") and not file_name.startswith("__"):
 
@@ -60,31 +60,67 @@ def scan_plugins(package_path: str = "src.plugins") -> List[PipelineStage]:
                 # Пример: root=.../src/plugins/calibration, file=manager.py
                 # rel_path = "calibration"
                 rel_path = os.path.relpath(root, plugins_dir)
+                module_name = file_name[:-3]
 
                 if rel_path == ".":
                     # Файл лежит прямо в src/plugins
-                    module_name = file_name[:-3]
                     full_module_path = f"{package_path}.{module_name}"
                 else:
                     # Файл во вложенной папке -> превращаем слеши в точки
                     # calibration/manager -> calibration.manager
                     sub_package = rel_path.replace(os.path.sep, ".")
-                    module_name = file_name[:-3]
                     full_module_path = f"{package_path}.{sub_package}.{module_name}"
 
-                try:
-                    module = importlib.import_module(full_module_path)
+                modules[full_module_path] = os.path.join(root, file_name)
 
-                    # Ищем классы внутри модуля
-                    for name, obj in inspect.getmembers(module, inspect.isclass):
-                        # Проверяем, что это PipelineStage, но не сам базовый класс
-                        if issubclass(obj, PipelineStage) and obj is not PipelineStage:
-                            # [FIX] Защита от дублей: загружаем только если класс определен В ЭТОМ модуле
-                            if obj.__module__ == module.__name__:
-                                logger.info(f"🔌 Discovered Plugin: {name} [{full_module_path}]")
-                                plugins.append(obj())  # Создаем экземпляр
-                except Exception as e:
-                    logger.error(f"⚠️ Error loading plugin from {full_module_path}: {e}")
+    return modules
+
+
+def stages_from_module(module) -> List[PipelineStage]:
+    """Экземпляры всех PipelineStage, определенных В ЭТОМ модуле (импортированные не считаются)"""
+    stages = []
+    for name, obj in inspect.getmembers(module, inspect.isclass):
+        # Проверяем, что это PipelineStage, но не сам базовый класс
+        if issubclass(obj, PipelineStage) and obj is not PipelineStage:
+            # [FIX] Защита от дублей: загружаем только если класс определен В ЭТОМ модуле
+            if obj.__module__ == module.__name__:
+                stages.append(obj())  # Создаем экземпляр
+    return stages
+
+
+def reload_module(module_path: str):
+    """
+    Повторный импорт модуля плагина (hot-reload). Новый файл — обычный импорт.
+    [FIX] Импорт в чистый модуль, а не importlib.reload: reload исполняет код поверх старого
+    __dict__, и удаленные из файла классы стадий оставались бы в модуле.
+    Если импорт упал, в sys.modules возвращается старый модуль.
+    """
+    importlib.invalidate_caches()
+    old = sys.modules.pop(module_path, None)
+    try:
+        return importlib.import_module(module_path)
+    except Exception:
+        if old is not None:
+            sys.modules[module_path] = old
+        raise
+
+
+def scan_plugins(package_path: str = "src.plugins") -> List[PipelineStage]:
+    """
+    Рекурсивно сканирует папку src/plugins (и подпапки) и загружает все найденные классы,
+    наследуемые от PipelineStage.
+    Игнорирует папки, начинающиеся с точки (например, .disabled).
+    """
+    plugins = []
+
+    for full_module_path in plugin_modules(package_path):
+        try:
+            module = importlib.import_module(full_module_path)
+            for stage in stages_from_module(module):
+                logger.info(f"🔌 Discovered Plugin: {stage.__class__.__name__} [{full_module_path}]")
+                plugins.append(stage)
+        except Exception as e:
+            logger.error(f"⚠️ Error loading plugin from {full_module_path}: {e}")
 
     return plugins
 
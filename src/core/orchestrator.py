@@ -6,8 +6,10 @@ from typing import Dict, List, Callable, Set, Optional
 from loguru import logger
 
 from src.core.config import settings
-from src.core.event_bus import EventBus
+from src.core.event_bus import EventBus, resolve_camera_id
+from src.core.telemetry import stage_metrics
 from src.data.models import SharedMemoryConfig
+from src.data.shared_memory import ShmRegistry
 from src.core.device_manager import device_manager
 from src.hardware.camera_worker import run_camera_worker
 
@@ -66,11 +68,17 @@ class ProcessorOrchestrator:
         # Реестр занятых ресурсов: { phys_index: logical_role_id }
         self._allocated_devices: Dict[int, int] = {}
 
+        # Реестр колец SHM (воркеры публикуют, API и остальные читают)
+        self.registry: Optional[ShmRegistry] = None
+
     def start(self):
         """Запуск системы с умным распределением ресурсов"""
         logger.info("🧠 Orchestrator starting...")
         self._running = True
 
+        # 0. Реестр SHM должен существовать до первого воркера
+        self.registry = ShmRegistry(create=True)
+
         # 1. Сканируем железо
         device_manager.scan_devices()
         logger.info(f"🔎 Available Devices: {device_manager._devices_map}")
@@ -126,6 +134,10 @@ class ProcessorOrchestrator:
 
         self._workers.clear()
 
+        if self.registry:
+            self.registry.close()
+            self.registry = None
+
     # --- Resource Management ---
     def _allocate_resources(self):
         """
@@ -179,8 +191,9 @@ class ProcessorOrchestrator:
         shm_config = SharedMemoryConfig(
             name=shm_name,
             size=0,
-            shape=(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3),
-            dtype="uint8"
+            shape=settings.SHM_PIXEL_FORMAT.frame_shape(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH),
+            dtype="uint8",
+            pixel_format=settings.SHM_PIXEL_FORMAT
         )
 
         # [FIX 3] Передаю self.manager в метод регистрации
@@ -189,11 +202,13 @@ class ProcessorOrchestrator:
         # [NEW] Передаем device_index в аргументы процесса
         proc = multiprocessing.Process(
             target=run_camera_worker,
-            args=(camera_id, shm_config, self.bus, device_index),  # <-- [CHANGED] Добавил device_index
+            # [FIX] Воркер получает только свои каналы шины (native), см. EventBus.for_worker
+            args=(camera_id, shm_config, self.bus.for_worker(camera_id), device_index),  # <-- [CHANGED] Добавил device_index
             name=f"Worker-{camera_id}",
             daemon=True
         )
         proc.start()
+        self.bus.detach_worker(camera_id)
 
         self._workers[camera_id] = {
             "proc": proc,
@@ -205,6 +220,9 @@ class ProcessorOrchestrator:
         logger.info(f"👶 Spawned Worker-{camera_id} (PID: {proc.pid}) on Device {device_index}")
 
     def _kill_process(self, proc):
+        # terminate() = SIGTERM: воркер сам выходит из цикла. SIGKILL — только если завис.
+        # С транспортом "native" SIGKILL посреди put ломает только каналы этого воркера,
+        # _restart_worker -> register_worker создает их заново (см. EventBus)
         if proc.is_alive():
             proc.terminate()
             proc.join(timeout=1.0)
@@ -220,15 +238,20 @@ class ProcessorOrchestrator:
         if old_info:
             self._kill_process(old_info['proc'])
 
-            # SHM Cleanup
-            shm_name = f"shm_cam_{camera_id}"
-            try:
+            # SHM Cleanup: убитый воркер не успел удалить свое кольцо (имя берем из реестра)
+            entry = self.registry.lookup(camera_id) if self.registry else None
+            if entry and entry.active:
                 from multiprocessing.shared_memory import SharedMemory
-                existing_shm = SharedMemory(name=shm_name)
-                existing_shm.close()
-                existing_shm.unlink()
-            except:
-                pass
+                for shm_name in (entry.name, entry.results_name):
+                    if not shm_name:
+                        continue
+                    try:
+                        existing_shm = SharedMemory(name=shm_name)
+                        existing_shm.close()
+                        existing_shm.unlink()
+                    except:
+                        pass
+                self.registry.withdraw(camera_id)
 
         # [SMART RECOVERY] Перед перезапуском проверим, не уехала ли камера
         # Если это рестарт из-за зависания, возможно USB порт сменился
@@ -264,10 +287,9 @@ class ProcessorOrchestrator:
     def _monitor_loop(self):
         last_broadcast = 0.0
         while self._running:
-            # 1. Читаем сообщения от воркеров (Heartbeats, Errors)
-            while True:
-                msg = self.bus.get_updates()
-                if not msg: break
+            # 1. Читаем сообщения от воркеров (Heartbeats, Errors) пачкой.
+            # Блокируемся до 10 мс на первом сообщении — это и есть темп цикла.
+            for msg in self.bus.get_updates_batch(timeout=0.01):
                 self._handle_message(msg)
 
             # 2. Проверяем здоровье (Restart dead workers)
@@ -291,15 +313,15 @@ class ProcessorOrchestrator:
                     payload = {
                         "cameras": active_cameras,
                         "global_fps": 0,
-                        "security": "ok"
+                        "security": "ok",
+                        # Backpressure шины: глубины очередей, потери, задержка put
+                        "bus": self.bus.telemetry_report()
                     }
 
                 # !!! FIX: Шлем в API через отдельный канал !!!
                 self.bus.publish_to_api("system_monitor", payload)
                 last_broadcast = time.time()
 
-            time.sleep(0.01)
-
     def _handle_message(self, msg: Dict):
         m_type = msg.get("type")
         payload = msg.get("payload", {})
@@ -309,6 +331,14 @@ class ProcessorOrchestrator:
             if cid is not None and cid in self._workers:
                 self._workers[cid]["last_beat"] = time.time()
 
+                # Снимок телеметрии шины воркера — в общую сводку, а не в карточку камеры
+                bus_snapshot = payload.pop("bus", None)
+                if bus_snapshot:
+                    self.bus.record_remote_telemetry(f"camera_{cid}", bus_snapshot)
+                perf = payload.pop("perf", None)
+                if perf:
+                    stage_metrics.ingest(cid, perf)
+
                 # [FIX] Сохраняем payload (где лежат role, config, fps) в system_state
                 with self._lock:
                     self._system_state["cameras"][cid] = payload
@@ -323,15 +353,13 @@ class ProcessorOrchestrator:
             target = payload.get("target")
             cmd = payload.get("cmd")
             args = payload.get("args")
+            # [FIX] Тот же формат адресата, что и у EventBus.request: camera_N / cam_N / N
+            cam_id = resolve_camera_id(target)
 
             if target == "system":
                 pass
-            elif isinstance(target, str) and target.startswith("camera_"):
-                try:
-                    cam_id = int(target.split("_")[1])
-                    self.send_command_to_camera(cam_id, cmd, args)
-                except:
-                    logger.error(f"Invalid target: {target}")
+            elif cam_id is not None:
+                self.send_command_to_camera(cam_id, cmd, args)
             else:
                 self.send_command_to_camera(-1, cmd, args, target=target)
 
@@ -1,14 +1,20 @@
 # src/core/pipeline.py
 
-from typing import Any, Dict, List, Union, Optional
+from typing import Any, Dict, List, Union, Optional, Sequence
 from abc import ABC, abstractmethod
 import time
+import threading
+
+import cv2
+import numpy as np
 from loguru import logger
 
 from src.data.schemas import (
     ModuleError, CameraConfig,
     UINotification, UIWidgetUpdate, NotificationType, WidgetType
 )
+from src.data.models import PixelFormat
+from src.data.pixels import ImageBuffers, to_gray
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -57,8 +63,11 @@ class UIContext:
 
 class FrameContext:
     def __init__(self, frame_ref: Any, frame_id: int, config: CameraConfig, bus: Optional['EventBus'] = None,
-                 camera_id: int = -1):
+                 camera_id: int = -1, pixel_format: PixelFormat = PixelFormat.BGR,
+                 buffers: Optional[ImageBuffers] = None):
         self.frame = frame_ref
+        # Нативный формат frame (GRAY8 / YUYV / BGR). Стадии не конвертируют, если формат уже подходит.
+        self.pixel_format = pixel_format
         self.bus = bus
         self.frame_id = frame_id
         self.camera_id = camera_id  # [NEW]
@@ -70,10 +79,15 @@ class FrameContext:
         # Передаем ID в UI контекст
         self.ui = UIContext(camera_id=camera_id)
 
+        # [NEW] Производные изображения кадра (gray, binary, pyramid...): считаются один раз
+        # по первому запросу, в буферах из пула Processor. Только для чтения.
+        self._buffers = buffers or ImageBuffers()
+        self._derived: Dict[Any, Any] = {}
+        self._derived_lock = threading.Lock()  # Параллельные стадии не считают одно и то же дважды
+
     def set_data(self, namespace: str, key: str, value: Any):
-        if namespace not in self._store:
-            self._store[namespace] = {}
-        self._store[namespace][key] = value
+        # setdefault атомарен: параллельные стадии (Processor в пуле) не теряют namespace друг друга
+        self._store.setdefault(namespace, {})[key] = value
 
     def get_data(self, namespace: str, key: str, default: Any = None) -> Any:
         return self._store.get(namespace, {}).get(key, default)
@@ -90,6 +104,99 @@ class FrameContext:
     def data_snapshot(self) -> Dict[str, Any]:
         return self._store
 
+    # --- Производные изображения (memo на кадр) ---
+
+    def _memo(self, key: Any, compute):
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = compute()
+                    if isinstance(value, np.ndarray) and value.flags.writeable:
+                        # Общий результат для всех стадий — защищаем от записи
+                        value = value.view()
+                        value.flags.writeable = False
+                    self._derived[key] = value
+        return value
+
+    @property
+    def gray(self) -> Optional[np.ndarray]:
+        """Яркость (uint8, h x w). GRAY8 — сам кадр, YUYV — Y plane (непрерывная копия), BGR — cvtColor"""
+        if self.frame is None:
+            return None
+        return self._memo("gray", self._compute_gray)
+
+    def _compute_gray(self) -> np.ndarray:
+        frame = self.frame
+        if self.pixel_format is PixelFormat.YUYV and frame.ndim == 3:
+            # Y plane — view с шагом 2: OpenCV копирует его на каждом вызове, копируем один раз
+            out = self._buffers.get("gray", frame.shape[:2])
+            np.copyto(out, frame[:, :, 0])
+            return out
+        if self.pixel_format is PixelFormat.GRAY8 or frame.ndim == 2:
+            return frame
+        return to_gray(frame, self.pixel_format, out=self._buffers.get("gray", frame.shape[:2]))
+
+    def binary(self, threshold: int) -> Optional[np.ndarray]:
+        """Маска gray > threshold (0 / 255)"""
+        gray = self.gray
+        if gray is None:
+            return None
+
+        def compute():
+            # Буфер на каждый порог, запрошенный в этом кадре (обычно один)
+            slot = sum(1 for k in self._derived if isinstance(k, tuple) and k[0] == "binary")
+            out = self._buffers.get(("binary", slot), gray.shape)
+            cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY, dst=out)
+            return out
+
+        return self._memo(("binary", int(threshold)), compute)
+
+    def pyramid(self, level: int) -> Optional[np.ndarray]:
+        """Gray, уменьшенный в 2^level раз (pyrDown). level 0 — сам gray"""
+        if level <= 0:
+            return self.gray
+        prev = self.pyramid(level - 1)
+        if prev is None:
+            return None
+
+        def compute():
+            out = self._buffers.get(("pyramid", level), ((prev.shape[0] + 1) // 2, (prev.shape[1] + 1) // 2))
+            cv2.pyrDown(prev, dst=out)
+            return out
+
+        return self._memo(("pyramid", level), compute)
+
+    def histogram(self) -> Optional[np.ndarray]:
+        """Гистограмма яркости: 256 бинов (float32)"""
+        gray = self.gray
+        if gray is None:
+            return None
+
+        def compute():
+            out = self._buffers.get("histogram", (256, 1), np.float32)
+            cv2.calcHist([gray], [0], None, [256], [0, 256], hist=out)
+            return out.ravel()
+
+        return self._memo("histogram", compute)
+
+    @property
+    def mean_brightness(self) -> Optional[float]:
+        """Средняя яркость кадра (0..255)"""
+        gray = self.gray
+        if gray is None:
+            return None
+
+        def compute():
+            hist = self._derived.get("histogram")
+            if hist is not None:
+                # Гистограмма уже есть — среднее по ней почти бесплатно
+                return float(np.dot(hist, np.arange(256)) / max(hist.sum(), 1.0))
+            return float(cv2.mean(gray)[0])
+
+        return self._memo("mean_brightness", compute)
+
 
 class PipelineStage(ABC):
     """
@@ -97,11 +204,25 @@ class PipelineStage(ABC):
     Сделан устойчивым к разным вариантам инициализации (с именем или без).
     """
 
-    def __init__(self, name: Optional[str] = None, **kwargs):
+    def __init__(self, name: Optional[str] = None, rate_hz: Optional[float] = None,
+                 phase: Optional[int] = None, priority: int = 0,
+                 reads: Optional[Sequence[str]] = None, writes: Optional[Sequence[str]] = None, **kwargs):
         # Если имя передали — берем его, иначе берем имя класса
         self.name = name or self.__class__.__name__
         self.camera_id = -1  # [NEW] Будет обновляться при первом вызове process
 
+        # [NEW] Расписание (см. StageScheduler): None = каждый кадр.
+        # Вместо своих frame_id % N / таймеров стадия объявляет частоту, Processor раскладывает фазы.
+        self.rate_hz = rate_hz
+        self.phase = phase  # Кадр внутри периода; None = выберет планировщик
+        self.priority = priority  # Больше = раньше выбирает свободную фазу и позже деградирует по QoS
+
+        # [NEW] Какие данные FrameContext стадия читает / пишет: "vision.keypoints" или целиком "vision".
+        # По ним Processor строит DAG и запускает независимые стадии параллельно.
+        # None = неизвестно: стадия выполняется строго на своем месте в порядке пайплайна.
+        self.reads = tuple(reads) if reads is not None else None
+        self.writes = tuple(writes) if writes is not None else None
+
     def process(self, ctx: FrameContext):
         pass
 
@@ -111,5 +232,17 @@ class PipelineStage(ABC):
         self.camera_id = ctx.camera_id
         self.process(ctx)
 
+    def on_skipped(self, ctx: FrameContext):
+        """Кадр не по расписанию (rate_hz): здесь только дешевая работа (кэш в ctx, оверлей)"""
+        pass
+
     def handle_command(self, cmd: str, args: Dict[str, Any]):
+        pass
+
+    def get_state(self) -> Any:
+        """[NEW] Hot-reload: состояние, которое переживет перезагрузку модуля (None = начать с нуля)"""
+        return None
+
+    def set_state(self, state: Any):
+        """[NEW] Hot-reload: новый экземпляр получает результат get_state() старого"""
         pass
\ No newline at end of file
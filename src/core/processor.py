@@ -1,28 +1,40 @@
 # src/core/processor.py
+import importlib
+import os
 import time
-from typing import List, Dict, Optional, Any
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Any
 
 import numpy as np
 from loguru import logger
 
+from src.core.delta import DeltaEncoder
 from src.core.event_bus import EventBus
 from src.core.pipeline import PipelineStage, FrameContext
+from src.core.telemetry import RollingHistogram, FRAME_STAGE
+from src.core.scheduler import StageScheduler, FrameBudgetGovernor
 # Не забудь импорты
 from src.data.schemas import SystemState, PluginStatus, CameraConfig, PluginCommand
-from src.core.config import CORE_PIPELINE
-from src.core.loader import load_stage_by_path, scan_plugins
+from src.data.models import PixelFormat
+from src.data.pixels import ImageBuffers
+from src.core.config import CORE_PIPELINE, settings
+from src.core.loader import load_stage_by_path, plugin_modules, reload_module, stages_from_module
 
 
 class Processor:
     """
     Движок обработки кадров (работает внутри CameraWorker).
     Запускает стадии последовательно, защищает от сбоев, собирает метрики.
-    Оптимизирован для снижения нагрузки на CPU (Manual Dict Assembly).
+    Оптимизирован для снижения нагрузки на CPU (Manual Dict Assembly, одна сериализация на кадр).
     """
 
-    def __init__(self, bus: EventBus, camera_id: int = 0):
+    def __init__(self, bus: EventBus, camera_id: int = 0, pixel_format: PixelFormat = PixelFormat.BGR):
         self.bus = bus
         self.camera_id = camera_id
+        # Нативный формат кадров из SHM (стадии по нему решают, нужна ли конвертация)
+        self.pixel_format = pixel_format
 
         # Списки стадий
         self.stages: List[PipelineStage] = []
@@ -32,6 +44,44 @@ class Processor:
         # { "stage_name": {"errors": 0, "active": True, "perf_ms": 0.0} }
         self._health_map: Dict[str, Dict] = {}
 
+        # Скользящие гистограммы задержки: по стадиям + полное время кадра.
+        # perf_ms показывает последний кадр, а пики видны только здесь (p95/p99/max)
+        self._latency: Dict[str, RollingHistogram] = {FRAME_STAGE: RollingHistogram()}
+
+        # Стадии с rate_hz запускаются по расписанию (фазы разнесены по кадрам)
+        self.scheduler = StageScheduler(settings.CAMERA_FPS)
+
+        # Конвейер: независимые стадии (по reads/writes) идут в пуле потоков,
+        # до PIPELINE_DEPTH кадров одновременно. PIPELINE_WORKERS = 0 -> все на потоке захвата.
+        self.depth = max(1, settings.PIPELINE_DEPTH)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if settings.PIPELINE_WORKERS > 0:
+            self._pool = ThreadPoolExecutor(max_workers=settings.PIPELINE_WORKERS,
+                                            thread_name_prefix=f"Stages-{camera_id}")
+        self._deps: Optional[Dict[str, List[str]]] = None
+
+        # QoS: кадр не влезает в бюджет -> не-core плагины замедляются/паузятся, при запасе возвращаются.
+        # В конвейере кадр может идти до depth интервалов, не роняя FPS
+        self.governor: Optional[FrameBudgetGovernor] = None
+        if settings.QOS_ENABLED:
+            budget_ms = settings.QOS_BUDGET_MS or \
+                1000.0 / settings.CAMERA_FPS * (self.depth if self._pool else 1)
+            self.governor = FrameBudgetGovernor(self.scheduler, budget_ms)
+        # Буферы производных изображений (ctx.gray / binary / pyramid...): по набору на кадр в работе,
+        # после публикации кадра набор возвращается в пул (deque: append/pop атомарны между потоками)
+        self._image_buffers: deque = deque()
+
+        # Стрим: keyframe раз в STREAM_KEYFRAME_INTERVAL кадров, между ними — только отличия
+        self._encoder = DeltaEncoder(settings.STREAM_KEYFRAME_INTERVAL)
+        self._jobs: deque = deque()
+        self._cond = threading.Condition()
+        self._finalizing = False
+
+        # Hot-reload: {module_path: mtime} файлов плагинов и {module_path: [stage_name]} их стадий
+        self._plugin_mtimes: Dict[str, float] = {}
+        self._plugin_stages: Dict[str, List[str]] = {}
+        self._last_watch = time.time()
+
         self._load_pipeline()
 
     def _load_pipeline(self):
@@ -43,12 +93,19 @@ class Processor:
                 self._register_stage(stage, is_core=True)
 
         # 2. Загружаем Плагины (из папки plugins)
-        plugins = scan_plugins()
-        for stage in plugins:
-            # Некоторые плагины могут требовать доступ к шине
-            if hasattr(stage, "bus"):
-                stage.bus = self.bus
-            self._register_stage(stage, is_core=False)
+        for module_path, file_path in plugin_modules().items():
+            self._plugin_mtimes[module_path] = _mtime(file_path)
+            try:
+                module = importlib.import_module(module_path)
+                stages = stages_from_module(module)
+            except Exception as e:
+                logger.error(f"⚠️ Error loading plugin from {module_path}: {e}")
+                continue
+            for stage in stages:
+                logger.info(f"🔌 Discovered Plugin: {stage.__class__.__name__} [{module_path}]")
+                self._attach(stage)
+                self._register_stage(stage, is_core=False)
+            self._plugin_stages[module_path] = [stage.name for stage in stages]
 
         logger.info(f"🧩 Processor initialized with {len(self.stages)} stages.")
 
@@ -62,6 +119,154 @@ class Processor:
             "is_core": is_core,
             "perf_ms": 0.0
         }
+        self._latency[stage.name] = RollingHistogram()
+        self.scheduler.invalidate()
+        self._deps = None
+
+    def _attach(self, stage: PipelineStage):
+        # Некоторые плагины могут требовать доступ к шине
+        if hasattr(stage, "bus"):
+            stage.bus = self.bus
+
+    def _unregister_stage(self, name: str):
+        stage = self._stage_map.pop(name, None)
+        if stage is None:
+            return
+        self.stages.remove(stage)
+        self._health_map.pop(name, None)
+        self._latency.pop(name, None)
+        if self.governor:
+            self.governor.forget(name)
+        self.scheduler.invalidate()
+        self._deps = None
+
+    # === HOT RELOAD ===
+
+    def changed_plugin_modules(self) -> List[str]:
+        """Модули плагинов, чьи файлы изменились (или появились/пропали) с последней загрузки"""
+        current = {module_path: _mtime(file_path) for module_path, file_path in plugin_modules().items()}
+        changed = [m for m, mtime in current.items() if self._plugin_mtimes.get(m) != mtime]
+        changed += [m for m in self._plugin_mtimes if m not in current]
+        return changed
+
+    def watch_plugins(self, now: float) -> Optional[Dict[str, Any]]:
+        """Вызывается из цикла воркера: раз в PLUGIN_WATCH_INTERVAL_S перезагружает измененные плагины"""
+        if not settings.PLUGIN_HOT_RELOAD or now - self._last_watch < settings.PLUGIN_WATCH_INTERVAL_S:
+            return None
+        self._last_watch = now
+        changed = self.changed_plugin_modules()
+        return self.reload_plugins(changed) if changed else None
+
+    def reload_plugins(self, modules: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Перезагрузка модулей плагинов без рестарта воркера.
+        modules = None -> все плагины. Стадии меняются между кадрами (после drain),
+        состояние переносится через get_state()/set_state(). Модуль, который не импортировался,
+        оставляет старые экземпляры в работе.
+        """
+        t0 = time.perf_counter()
+        self.drain()
+
+        files = plugin_modules()
+        targets = set(files) | set(self._plugin_mtimes) if modules is None else set(modules)
+
+        # Хелпер без стадий (calibration/lens.py) импортируют соседи: перезагружаем и их, после хелпера
+        for module_path in list(targets):
+            if self._plugin_stages.get(module_path) == []:
+                package = module_path.rpartition(".")[0]
+                targets.update(m for m, names in self._plugin_stages.items()
+                               if names and m.rpartition(".")[0] == package)
+        ordered = sorted(targets, key=lambda m: (bool(self._plugin_stages.get(m)), m))
+
+        report = {"reloaded": [], "added": [], "removed": [], "failed": {}}
+        for module_path in ordered:
+            file_path = files.get(module_path)
+            if file_path is None:
+                # Файл удален: выгружаем стадии модуля
+                for name in self._plugin_stages.pop(module_path, []):
+                    self._unregister_stage(name)
+                    report["removed"].append(name)
+                self._plugin_mtimes.pop(module_path, None)
+                continue
+
+            self._plugin_mtimes[module_path] = _mtime(file_path)
+            try:
+                stages = stages_from_module(reload_module(module_path))
+            except Exception as e:
+                logger.error(f"⚠️ Reload of {module_path} failed, keeping old stages: {e}")
+                report["failed"][module_path] = str(e)
+                continue
+
+            old_names = self._plugin_stages.get(module_path, [])
+            for stage in stages:
+                self._attach(stage)
+                old = self._stage_map.get(stage.name)
+                if old is None:
+                    self._register_stage(stage, is_core=False)
+                    report["added"].append(stage.name)
+                    continue
+                self._swap_stage(old, stage)
+                report["reloaded"].append(stage.name)
+
+            new_names = [stage.name for stage in stages]
+            for name in old_names:
+                if name not in new_names:
+                    self._unregister_stage(name)
+                    report["removed"].append(name)
+            self._plugin_stages[module_path] = new_names
+
+        self.scheduler.invalidate()
+        self._deps = None
+        report["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        logger.info(f"♻️ Plugins reloaded in {report['ms']} ms: {len(report['reloaded'])} swapped, "
+                    f"{len(report['added'])} added, {len(report['removed'])} removed, "
+                    f"{len(report['failed'])} failed")
+        return report
+
+    def _swap_stage(self, old: PipelineStage, new: PipelineStage):
+        """Новый экземпляр встает на место старого (тот же индекс в пайплайне), с его состоянием"""
+        try:
+            state = old.get_state()
+            if state is not None:
+                new.set_state(state)
+        except Exception as e:
+            logger.warning(f"⚠️ State transfer for '{new.name}' failed, starting clean: {e}")
+        new.camera_id = old.camera_id
+
+        self.stages[self.stages.index(old)] = new
+        self._stage_map[new.name] = new
+        # Новый код — новый шанс: сбрасываем счетчик ошибок и включаем стадию обратно
+        meta = self._health_map[new.name]
+        meta["errors"] = 0
+        meta["active"] = True
+
+    def request_keyframe(self):
+        """Следующий пакет стрима уйдет полным (новый WS клиент / клиент потерял keyframe)"""
+        self._encoder.request_keyframe()
+
+    # === METRICS ===
+
+    def latency_summary(self) -> Dict[str, Dict]:
+        """Перцентили по окнам settings.METRICS_WINDOWS: {stage | FRAME_STAGE: {"10s": {...}}}"""
+        return {name: hist.summary() for name, hist in self._latency.items()}
+
+    def _stage_costs(self) -> Dict[str, float]:
+        """Средняя задержка стадий (мс) — вес при раскладке фаз"""
+        costs = {}
+        for name, hist in list(self._latency.items()):
+            mean = hist.mean_ms()
+            if mean is not None:
+                costs[name] = mean
+        return costs
+
+    def take_latency_delta(self) -> Dict[str, Dict]:
+        """Гистограммы с прошлого вызова (для heartbeat -> StageMetrics оркестратора)"""
+        deltas = {}
+        for name, hist in list(self._latency.items()):
+            delta = hist.take_delta()
+            if delta.count:
+                deltas[name] = delta.to_dict()
+        return deltas
 
     # === COMMAND ROUTING ===
 
@@ -72,6 +277,9 @@ class Processor:
         target = cmd.target
         command_name = cmd.cmd
 
+        # Стадии в пуле не потокобезопасны к командам: применяем между кадрами
+        self.drain()
+
         # [FIX] Удалил дублирующийся блок кода, который вызывал двойное срабатывание
 
         # 1. Broadcast (всем)
@@ -110,10 +318,38 @@ class Processor:
 
     # === PROCESSING LOOP ===
 
-    def process_frame(self, frame: np.ndarray, frame_id: int, current_config: CameraConfig):
+    def process_frame(self, frame: np.ndarray, frame_id: int, current_config: CameraConfig,
+                      trace: Optional[List[float]] = None) -> FrameContext:
         """
-        Запуск пайплайна для одного кадра.
+        Запуск пайплайна для одного кадра (синхронно).
+        Возвращает FrameContext с результатами стадий.
+        trace: [capture, shm] (perf_counter) от воркера — начало сквозной трассы кадра.
         """
+        if self._pool is not None:
+            job = self.submit_frame(frame, frame_id, current_config, trace=trace)
+            job.done.wait()
+            return job.ctx
+
+        job = self._begin_frame(frame, frame_id, current_config, trace)
+
+        # Прогон по стадиям на потоке захвата
+        for stage in job.stages:
+            job.entries[stage.name] = self._execute_stage(stage, job)
+        job.trace.append(time.perf_counter())
+
+        self._finish_frame(job)
+        return job.ctx
+
+    def _begin_frame(self, frame: np.ndarray, frame_id: int, current_config: CameraConfig,
+                     trace: Optional[List[float]] = None) -> '_FrameJob':
+        t_frame = time.perf_counter()
+        now = time.monotonic()
+        if self.governor:
+            with self._cond:
+                health = {name: dict(meta) for name, meta in self._health_map.items()}
+            self.governor.evaluate(now, self.stages, health, self._latency)
+        self.scheduler.begin_frame(now, self.stages, self._stage_costs)
+
         # 1. Создаем контекст
         # [FIX] Передаем bus и camera_id СРАЗУ в конструктор.
         # Это критически важно, чтобы UIContext внутри сразу получил ID.
@@ -122,53 +358,80 @@ class Processor:
             frame_id=frame_id,
             config=current_config,
             bus=self.bus,  # <-- Передаем
-            camera_id=self.camera_id  # <-- Передаем
+            camera_id=self.camera_id,  # <-- Передаем
+            pixel_format=self.pixel_format,
+            buffers=self._image_buffers.pop() if self._image_buffers else ImageBuffers()
         )
 
-        # Собираем активные плагины (сразу в dict, чтобы не создавать лишние объекты)
-        active_plugins_data = []
-
-        # 2. Прогон по стадиям
-        for stage in self.stages:
-            meta = self._health_map[stage.name]
-
-            # Пропускаем отключенные
-            if not meta["active"]:
-                active_plugins_data.append({
-                    "id": stage.name,
-                    "is_active": False,
-                    "performance_ms": 0
-                })
-                continue
-
-            t0 = time.perf_counter()
+        # Расписание решается на потоке захвата, в порядке кадров
+        due = {stage.name: self.scheduler.is_due(stage) for stage in self.stages}
+        job = _FrameJob(ctx, current_config, list(self.stages), due, t_frame, now)
+        # Трасса: capture, shm, begin (+ stages, publish дальше). Без отметок воркера — от начала кадра
+        job.trace = list(trace or (t_frame, t_frame)) + [t_frame]
+        for stage in job.stages:
+            state = self.scheduler.qos_state(stage)
+            if state:
+                job.qos[stage.name] = state
+        return job
+
+    def _execute_stage(self, stage: PipelineStage, job: '_FrameJob') -> Dict[str, Any]:
+        """Одна стадия на одном кадре. Возвращает запись для active_plugins."""
+        ctx = job.ctx
+        meta = self._health_map[stage.name]
+
+        # Пропускаем отключенные
+        if not meta["active"]:
+            return {"id": stage.name, "is_active": False, "performance_ms": 0}
+
+        # Не его кадр по расписанию: только дешевая часть (кэш, оверлей)
+        if not job.due.get(stage.name, True):
             try:
-                # Запуск обработки
-                # PipelineStage теперь сам обновит свой internal camera_id, если нужно
-                stage.run(ctx)
-
-                if meta["errors"] > 0: meta["errors"] = 0
-
+                stage.on_skipped(ctx)
             except Exception as e:
+                logger.error(f"Stage '{stage.name}' on_skipped failed: {e}")
+            return {"id": stage.name, "is_active": True, "performance_ms": 0, "scheduled": False}
+
+        t0 = time.perf_counter()
+        error = None
+        try:
+            # Запуск обработки
+            # PipelineStage теперь сам обновит свой internal camera_id, если нужно
+            stage.run(ctx)
+        except Exception as e:
+            error = e
+            if hasattr(ctx, "add_error"):
+                ctx.add_error(stage.name, str(e))
+            logger.error(f"Stage '{stage.name}' failed: {e}")
+        dt = (time.perf_counter() - t0) * 1000
+
+        # [FIX] Здоровье пишут потоки пула, а governor / heartbeat читают с потока захвата:
+        # обновляем под той же блокировкой, что и статусы кадров
+        with self._cond:
+            if error is None:
+                if meta["errors"] > 0: meta["errors"] = 0
+            else:
                 meta["errors"] += 1
-                if hasattr(ctx, "add_error"):
-                    ctx.add_error(stage.name, str(e))
-
-                logger.error(f"Stage '{stage.name}' failed: {e}")
-
                 if meta["errors"] >= 20:  # Порог 20 ошибок
                     meta["active"] = False
                     logger.critical(f"🔌 Stage '{stage.name}' DISABLED.")
-
-            dt = (time.perf_counter() - t0) * 1000
             meta["perf_ms"] = dt
+            active = meta["active"]
+        self._latency[stage.name].record(dt, job.now)
 
-            # Добавляем в список
-            active_plugins_data.append({
-                "id": stage.name,
-                "is_active": meta["active"],
-                "performance_ms": dt
-            })
+        # В стрим — с точностью до мкс: длинные float раздувают каждый пакет
+        return {"id": stage.name, "is_active": active, "performance_ms": round(dt, 3)}
+
+    def _finish_frame(self, job: '_FrameJob') -> float:
+        """Сборка и публикация результатов кадра. Возвращает полное время кадра (мс)."""
+        ctx = job.ctx
+        frame_id = ctx.frame_id
+        current_config = job.config
+
+        # Собираем активные плагины (сразу в dict, чтобы не создавать лишние объекты), в порядке пайплайна
+        active_plugins_data = [job.entries[stage.name] for stage in job.stages]
+        # Решения QoS видны в UI: уровень, фактическая частота, пауза
+        for name, state in job.qos.items():
+            job.entries[name]["qos"] = state
 
         # 3. Сборка результатов (ОПТИМИЗИРОВАННАЯ ЧАСТЬ)
 
@@ -176,59 +439,213 @@ class Processor:
         if hasattr(ctx, "ui") and hasattr(ctx.ui, "get_updates"):
             ui_updates = ctx.ui.get_updates()
 
-        # Получаем сырые данные из контекста
+        # Сырые данные из контекста (Point2D, numpy...) сериализует DeltaEncoder
         raw_results = ctx.data_snapshot if hasattr(ctx, "data_snapshot") else {}
 
-        clean_results = {}
-        # Аккуратная конвертация данных для JSON
-        for k, v in raw_results.items():
-            if isinstance(v, list):
-                clean_list = []
-                for item in v:
-                    if hasattr(item, "model_dump"):
-                        clean_list.append(item.model_dump())
-                    elif hasattr(item, "dict"):
-                        clean_list.append(item.dict())
-                    elif hasattr(item, "__dict__"):
-                        clean_list.append(item.__dict__)
-                    else:
-                        clean_list.append(item)
-                clean_results[k] = clean_list
-
-            elif isinstance(v, (np.integer, np.floating)):
-                clean_results[k] = float(v) if isinstance(v, np.floating) else int(v)
-            elif isinstance(v, np.ndarray):
-                clean_results[k] = v.tolist()
-            else:
-                clean_results[k] = v
-
-        # [PERFORMANCE] Троттлинг конфига: шлем полный конфиг только раз в 60 кадров
-        config_payload = {}
-        if frame_id % 60 == 0:
-            config_payload = current_config.dict() if hasattr(current_config, "dict") else current_config.model_dump()
-
-        # Конвертация ошибок
-        errors_list = []
-        for e in getattr(ctx, "errors", []):
-            if hasattr(e, "dict"):
-                errors_list.append(e.dict())
-            elif hasattr(e, "model_dump"):
-                errors_list.append(e.model_dump())
-            else:
-                errors_list.append(str(e))
-
-        # Собираем payload вручную как DICT
-        state_payload = {
-            "frame_id": frame_id,
+        # Собираем поля вручную как DICT
+        # [PERFORMANCE] Конфиг больше не троттлим по кадрам: он уходит в keyframe и в delta, когда меняется
+        fields = {
             "fps": 0.0,
-            "errors": errors_list,
+            "errors": getattr(ctx, "errors", []),
             "active_plugins": active_plugins_data,
-            "camera_config": config_payload,
+            "camera_config": current_config,
             "notifications": ui_updates["notifications"],
             "widgets": ui_updates["widgets"],  # Здесь уже будут виджеты с camera_id
-            "results": clean_results,
-            "camera_id": self.camera_id
         }
 
-        # 4. Отправка в шину
-        self.bus.publish_stream(state_payload)
\ No newline at end of file
+        # 4. Отправка в шину: сериализуем ОДИН раз здесь, дальше bytes идут насквозь
+        # (pickle bytes в шине — memcpy, API отдает их в WebSocket без orjson)
+        try:
+            t_publish = time.perf_counter()
+            if len(job.trace) < 4:
+                job.trace.append(t_publish)  # Кадр без стадий
+            job.trace.append(t_publish)
+            self.bus.publish_stream(self._encoder.encode(frame_id, self.camera_id, fields, raw_results,
+                                                         trace=job.trace))
+        except Exception as e:
+            logger.error(f"Stream serialize error: {e}")
+
+        # Кадр опубликован: его gray / binary больше никто не читает
+        self._image_buffers.append(ctx._buffers)
+
+        frame_ms = (time.perf_counter() - job.t_frame) * 1000
+        self._latency[FRAME_STAGE].record(frame_ms, job.now)
+        if self.governor:
+            self.governor.observe(frame_ms, job.now)
+        return frame_ms
+
+    # === PIPELINE (DAG + пул потоков) ===
+
+    @property
+    def pipelined(self) -> bool:
+        return self._pool is not None
+
+    def _build_graph(self) -> Dict[str, List[str]]:
+        """
+        Для каждой стадии — стадии, которые должны закончить ЭТОТ кадр раньше нее.
+        Ребро i -> j (i раньше в пайплайне), если j читает то, что пишет i, оба пишут
+        одно и то же, или j пишет то, что читает i. Стадия без reads/writes — барьер.
+        """
+        deps = {}
+        for j, later in enumerate(self.stages):
+            deps[later.name] = [earlier.name for earlier in self.stages[:j] if _conflicts(earlier, later)]
+
+        parallel = [s.name for s in self.stages if not deps[s.name]]
+        logger.info(f"🕸️ Stage DAG: {len(self.stages)} stages, roots: {', '.join(parallel)}")
+        return deps
+
+    def submit_frame(self, frame: np.ndarray, frame_id: int, current_config: CameraConfig,
+                     on_done: Optional[Callable[[FrameContext, float], None]] = None,
+                     trace: Optional[List[float]] = None) -> '_FrameJob':
+        """
+        Кадр в конвейер, возврат сразу — захват следующего кадра идет параллельно.
+        Блокируется, пока в работе PIPELINE_DEPTH кадров (ограниченная передача).
+        on_done(ctx, frame_ms) вызывается строго в порядке кадров, после публикации в шину.
+        """
+        with self._cond:
+            while len(self._jobs) >= self.depth:
+                self._cond.wait()
+            if self._deps is None:
+                self._deps = self._build_graph()
+            deps = self._deps
+
+        job = self._begin_frame(frame, frame_id, current_config, trace)
+        job.deps = deps
+        job.on_done = on_done
+
+        with self._cond:
+            job.prev = self._jobs[-1] if self._jobs else None
+            self._jobs.append(job)
+            self._dispatch()
+        return job
+
+    def _dispatch(self):
+        """(под self._cond) Запускает все стадии, готовые к выполнению, во всех кадрах в работе"""
+        for job in self._jobs:
+            for stage in job.stages:
+                name = stage.name
+                if job.status[name] != _PENDING:
+                    continue
+                # Внутри кадра: зависимости по DAG уже отработали
+                if any(job.status[d] != _DONE for d in job.deps.get(name, ())):
+                    continue
+                # Между кадрами: стадия (у нее состояние) закончила предыдущий кадр
+                prev = job.prev
+                if prev is not None and prev.status.get(name, _DONE) != _DONE:
+                    continue
+                job.status[name] = _RUNNING
+                self._pool.submit(self._run_task, job, stage)
+
+    def _run_task(self, job: '_FrameJob', stage: PipelineStage):
+        try:
+            entry = self._execute_stage(stage, job)
+        except Exception as e:
+            logger.error(f"Stage task '{stage.name}' crashed: {e}")
+            entry = {"id": stage.name, "is_active": False, "performance_ms": 0}
+
+        with self._cond:
+            job.entries[stage.name] = entry
+            job.status[stage.name] = _DONE
+            job.remaining -= 1
+            if not job.remaining:
+                job.trace.append(time.perf_counter())  # Все стадии кадра готовы
+            self._dispatch()
+            # Публикует кадры кто-то один, строго по порядку
+            if self._finalizing:
+                return
+            self._finalizing = True
+
+        while True:
+            with self._cond:
+                head = self._jobs[0] if self._jobs else None
+                if head is None or head.remaining:
+                    self._finalizing = False
+                    return
+
+            try:
+                frame_ms = self._finish_frame(head)
+                if head.on_done:
+                    head.on_done(head.ctx, frame_ms)
+            except Exception as e:
+                logger.error(f"Frame finalize error: {e}")
+            finally:
+                if head.on_done:
+                    head.ctx.frame = None  # Отпускаем view слота SHM
+                head.prev = None
+                head.done.set()
+                with self._cond:
+                    self._jobs.popleft()
+                    if self._jobs:
+                        self._jobs[0].prev = None
+                    self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться, пока все кадры в работе опубликованы"""
+        if self._pool is None:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs, timeout=timeout)
+
+    def close(self):
+        """Довести кадры в работе до конца и остановить пул (до закрытия SHM: кадры — view слотов)"""
+        if self._pool is None:
+            return
+        self.drain(timeout=2.0)
+        self._pool.shutdown(wait=True)
+        self._pool = None
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+# Статусы стадии внутри кадра
+_PENDING, _RUNNING, _DONE = 0, 1, 2
+
+
+class _FrameJob:
+    """Кадр в работе: контекст + статусы стадий (для конвейера)"""
+    __slots__ = ("ctx", "config", "stages", "due", "qos", "trace", "t_frame", "now", "entries",
+                 "status", "remaining", "deps", "prev", "on_done", "done")
+
+    def __init__(self, ctx: FrameContext, config: CameraConfig, stages: List[PipelineStage],
+                 due: Dict[str, bool], t_frame: float, now: float):
+        self.ctx = ctx
+        self.config = config
+        self.stages = stages
+        self.due = due
+        self.qos: Dict[str, Dict[str, Any]] = {}
+        self.trace: List[float] = []  # perf_counter: capture, shm, begin, stages, publish
+        self.t_frame = t_frame
+        self.now = now
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.status: Dict[str, int] = {stage.name: _PENDING for stage in stages}
+        self.remaining = len(stages)
+        self.deps: Dict[str, List[str]] = {}
+        self.prev: Optional[_FrameJob] = None
+        self.on_done: Optional[Callable[[FrameContext, float], None]] = None
+        self.done = threading.Event()
+
+
+def _access(stage: PipelineStage):
+    reads = getattr(stage, "reads", None)
+    writes = getattr(stage, "writes", None)
+    # Не объявил — считаем, что трогает все (стадия остается на своем месте в порядке)
+    return (("*",) if reads is None else reads), (("*",) if writes is None else writes)
+
+
+def _overlap(a, b) -> bool:
+    for x in a:
+        for y in b:
+            if x == "*" or y == "*" or x == y or x.startswith(y + ".") or y.startswith(x + "."):
+                return True
+    return False
+
+
+def _conflicts(earlier: PipelineStage, later: PipelineStage) -> bool:
+    r1, w1 = _access(earlier)
+    r2, w2 = _access(later)
+    return _overlap(w1, r2) or _overlap(w1, w2) or _overlap(r1, w2)
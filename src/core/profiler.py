@@ -0,0 +1,171 @@
+# src/core/profiler.py
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from src.core.config import PROFILES_DIR, settings
+
+_PROCESSOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processor.py")
+_STAGE_FRAME = "_execute_stage"
+FRAME_FILE = "_frame"  # Время кадра вне стадий (сборка, публикация, сериализация)
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профайлер пайплайна для живого воркера (PROFILE_START / PROFILE_STOP).
+
+    Отдельный поток раз в PROFILE_SAMPLE_INTERVAL_MS снимает стеки всех потоков
+    (sys._current_frames) — стадии не инструментируются, накладные расходы только на сэмпл.
+    Учитываются только стеки внутри Processor: ожидание камеры и простой пула не в счет.
+    Сэмпл относится к стадии, которая сейчас выполняется (кадр _execute_stage в стеке).
+
+    Результат — collapsed stacks ("f1;f2;f3 N", формат flamegraph.pl / speedscope)
+    по файлу на стадию в data/profiles/cam{N}_{время}/ + summary.json.
+    """
+
+    def __init__(self, camera_id: int, out_dir: Path = PROFILES_DIR):
+        self.camera_id = camera_id
+        self.out_dir = Path(out_dir)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Dict[str, Counter] = defaultdict(Counter)
+        self._samples = 0
+        self._frames = 0
+        self._max_frames: Optional[int] = None
+        self._deadline: Optional[float] = None
+        self._started_at = 0.0
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, frames: Optional[int] = None, seconds: Optional[float] = None,
+              interval_ms: Optional[float] = None) -> Dict[str, Any]:
+        """Начать сессию. frames / seconds — автостоп (без них — до PROFILE_STOP, но не дольше PROFILE_MAX_S)"""
+        if self.running:
+            return {"running": True, "frames": self._frames, "samples": self._samples}
+
+        self._stacks = defaultdict(Counter)
+        self._samples = 0
+        self._frames = 0
+        self._max_frames = int(frames) if frames else None
+        self._started_at = time.monotonic()
+        self._deadline = self._started_at + float(seconds or settings.PROFILE_MAX_S)
+        interval = float(interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS) / 1000.0
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                        name=f"Profiler-{self.camera_id}")
+        self._thread.start()
+        logger.info(f"🔬 Profiler started (cam {self.camera_id}, every {interval * 1000:.1f} ms"
+                    f"{f', {self._max_frames} frames' if self._max_frames else ''})")
+        return {"running": True, "interval_ms": interval * 1000, "frames": self._max_frames}
+
+    def on_frame(self) -> Optional[Dict[str, Any]]:
+        """Вызывается из цикла воркера на каждый кадр. Возвращает отчет, если сработал автостоп"""
+        if not self.running:
+            return None
+        self._frames += 1
+        if (self._max_frames and self._frames >= self._max_frames) or time.monotonic() >= self._deadline:
+            return self.stop()
+        return None
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """Остановить сессию и записать файлы. Без активной сессии — отчет прошлой"""
+        if not self.running:
+            return self.last_report
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        self.last_report = self._write(time.monotonic() - self._started_at)
+        return self.last_report
+
+    # --- Sampling ---
+
+    def _run(self, interval: float):
+        own = threading.get_ident()
+        while not self._stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(frame)
+
+    def _sample(self, frame):
+        # Стек от листа к корню; ищем, внутри ли Processor и какой стадии
+        chain = []
+        stage = None
+        stage_depth = 0
+        in_processor = False
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == _PROCESSOR_FILE:
+                in_processor = True
+                if code.co_name == _STAGE_FRAME and stage is None:
+                    owner = frame.f_locals.get("stage")
+                    stage = getattr(owner, "name", None) or "unknown"
+                    # Стек стадии начинается под _execute_stage: общий префикс пайплайна не нужен
+                    stage_depth = len(chain)
+            chain.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if not in_processor:
+            return
+        # Поток захвата ждет место в конвейере (submit_frame) — это простой, а не работа кадра
+        if stage is None and chain[0].startswith("threading.py:"):
+            return
+
+        if stage is not None:
+            chain = chain[:stage_depth]
+        key = stage or FRAME_FILE
+        self._stacks[key][";".join(reversed(chain)) or _STAGE_FRAME] += 1
+        self._samples += 1
+
+    # --- Output ---
+
+    def _write(self, elapsed: float) -> Dict[str, Any]:
+        session = f"cam{self.camera_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        path = self.out_dir / session
+        path.mkdir(parents=True, exist_ok=True)
+
+        stages = {}
+        for name, stacks in sorted(self._stacks.items(), key=lambda kv: -sum(kv[1].values())):
+            file_name = f"{_safe(name)}.folded"
+            with open(path / file_name, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            samples = sum(stacks.values())
+            # Самые частые листья: где стадия тратит время сама
+            leaves = Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            stages[name] = {
+                "file": file_name,
+                "samples": samples,
+                "share": round(samples / self._samples, 3) if self._samples else 0.0,
+                "top": [[leaf, count] for leaf, count in leaves.most_common(5)],
+            }
+
+        report = {
+            "session": session,
+            "camera_id": self.camera_id,
+            "frames": self._frames,
+            "samples": self._samples,
+            "seconds": round(elapsed, 2),
+            "stages": stages,
+        }
+        with open(path / "summary.json", "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        logger.info(f"🔬 Profile saved: {path} ({self._samples} samples, {self._frames} frames)")
+        return report
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -1,22 +1,22 @@
-import time
 import struct
 import threading
+import numpy as np
 from pathlib import Path
 from loguru import logger
 from src.core.config import settings
-from src.data.shared_memory import SharedMemoryManager
+from src.data.shared_memory import SharedMemoryManager, ShmRegistry
 
 
 class SessionRecorder:
-    def __init__(self, filename: str, shm_name: str = None):
+    def __init__(self, filename: str, shm_name: str = None, camera_id: int = 0):
         self.filename = Path(filename)
         self.is_recording = False
         self.shm = None
         self._thread = None
 
-        # Если имя не передано, пробуем дефолтное (для тестов),
-        # но в реальности оно должно приходить из handshake
-        self.target_shm_name = shm_name if shm_name else settings.SHM_CAMERA_BUFFER_NAME
+        # Если имя не передано, кольцо камеры camera_id ищется в реестре SHM
+        self.camera_id = camera_id
+        self.target_shm_name = shm_name
 
         # Формат файла .bfm (BikeFit Motion Binary)
 
@@ -24,16 +24,25 @@ class SessionRecorder:
         logger.info(f"🔴 Starting Recording to {self.filename}...")
         try:
             # Подключаемся к существующей памяти
-            # ВАЖНО: Мы создаем конфиг "на лету" или должны знать параметры.
-            # Для простоты пока предполагаем, что параметры в settings совпадают.
-            # В идеале Recorder должен получать Config объект.
+            # Параметры кольца (shape, dtype, формат) берем из реестра SHM.
+            # Явное имя — legacy режим: параметры из settings (формат слота — SHM_PIXEL_FORMAT),
+            # несовпадение с реальным кольцом SharedMemoryManager отклонит (ValueError).
 
             from src.data.models import SharedMemoryConfig
-            cfg = SharedMemoryConfig(
-                name=self.target_shm_name,
-                shape=(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3),
-                dtype='uint8'
-            )
+            if self.target_shm_name:
+                pixel_format = settings.SHM_PIXEL_FORMAT
+                cfg = SharedMemoryConfig(
+                    name=self.target_shm_name, size=0,
+                    shape=pixel_format.frame_shape(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH),
+                    dtype='uint8', pixel_format=pixel_format
+                )
+            else:
+                with ShmRegistry(create=False) as registry:
+                    entry = registry.lookup(self.camera_id)
+                if entry is None or not entry.active:
+                    raise FileNotFoundError(f"camera {self.camera_id} is not in SHM registry")
+                cfg = entry.to_config()
+                self.target_shm_name = entry.name
 
             self.shm = SharedMemoryManager(config=cfg, create=False)
             self.is_recording = True
@@ -55,8 +64,6 @@ class SessionRecorder:
         logger.info(f"💾 Recording saved: {self.filename}")
 
     def _record_loop(self):
-        last_frame_id = -1
-
         # Создаем папку если нет
         self.filename.parent.mkdir(parents=True, exist_ok=True)
 
@@ -64,39 +71,41 @@ class SessionRecorder:
             # Пишем заголовок файла (версия формата)
             f.write(b'BFM1')
 
+            # Свой курсор: пишем КАЖДЫЙ кадр по порядку, а не только голову кольца
+            cursor = self.shm.cursor()
+
             while self.is_recording:
-                data = self.shm.read_frame()
-                if not data:
-                    time.sleep(0.002)
+                # Спим на notifier кольца до следующего кадра (таймаут — чтобы заметить stop)
+                view = cursor.read_next(timeout=0.1)
+                if view is None:
                     continue
 
-                frame_id, timestamp, points = data
-
-                # Пишем только новые кадры
-                if frame_id > last_frame_id:
-                    # Упаковываем обратно
-                    # Формат пакета в файле: [Len(4b)][Header...][Points...]
+                frame_id, timestamp = view.frame_id, view.timestamp
+                if view.overrun:
+                    logger.warning(f"⚠️ Recorder overrun: lost {view.overrun} frames before {frame_id}")
+                view.release()
 
-                    # 1. Заголовок кадра (как в SHM, но для файла)
-                    # Используем форматы из SHM менеджера
-                    header_data = struct.pack(self.shm.HEADER_FORMAT, frame_id, timestamp, 1.0, len(points), 0)
+                # Точки появляются в кольце результатов после Processor (чуть позже кадра)
+                points = self.shm.read_results(frame_id, timeout=0.05)
+                if points is None:
+                    points = np.empty(0, dtype=self.shm.POINT_DTYPE)
 
-                    points_data = bytearray()
-                    # Заглушка для точек (пока пустой список)
-                    # for p in points:
-                    #     points_data.extend(struct.pack(self.shm.POINT_FORMAT, p.id, p.x, p.y))
+                # Упаковываем обратно
+                # Формат пакета в файле: [Len(4b)][Header...][Points...]
 
-                    full_packet = header_data + points_data
-                    packet_len = len(full_packet)
+                # 1. Заголовок кадра (как в SHM, но для файла)
+                # Используем форматы из SHM менеджера
+                header_data = struct.pack(self.shm.HEADER_FORMAT, frame_id, timestamp, 1.0, len(points), 0)
 
-                    # 2. Пишем длину пакета и сам пакет
-                    f.write(struct.pack('I', packet_len))
-                    f.write(full_packet)
+                # Точки: сырые записи KEYPOINT_DTYPE (40 bytes на точку), как в SHM
+                points_data = points.tobytes()
 
-                    if frame_id % 90 == 0:
-                        logger.debug(f"Recorded frame {frame_id}...")
+                full_packet = header_data + points_data
+                packet_len = len(full_packet)
 
-                    last_frame_id = frame_id
+                # 2. Пишем длину пакета и сам пакет
+                f.write(struct.pack('I', packet_len))
+                f.write(full_packet)
 
-                # Спим очень мало, чтобы не пропустить 90 FPS
-                time.sleep(0.001)
\ No newline at end of file
+                if frame_id % 90 == 0:
+                    logger.debug(f"Recorded frame {frame_id} (overrun total: {cursor.overrun_total})...")
@@ -0,0 +1,245 @@
+# src/core/scheduler.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.core.config import settings
+from src.core.pipeline import PipelineStage
+from src.core.telemetry import RollingHistogram
+
+# Уровни QoS стадии: 0 — как объявлено, 1..3 — частота /2, /4, /8, QOS_PAUSED — стадия не запускается
+QOS_PAUSED = 4
+
+
+class StageScheduler:
+    """
+    Расписание стадий по кадрам (работает внутри Processor).
+
+    Стадия с rate_hz запускается раз в period = round(fps / rate_hz) кадров, в своей фазе
+    (frame % period == phase). Без rate_hz — каждый кадр.
+    Фазы низкочастотных стадий разводятся жадно: самые тяжелые (по замеренной
+    задержке) и приоритетные выбирают первыми самый свободный кадр. Поэтому 15 Hz
+    калибровка и 2 Hz монитор не попадают в один кадр и не дают периодический пик.
+
+    fps берется из фактического темпа кадров (EMA интервала): если камера отдает 30
+    вместо 90, периоды пересчитываются, и 15 Hz остаются 15 Hz.
+    """
+    HORIZON = 240  # Кадров в таблице нагрузки при выборе фаз
+    REPLAN_DRIFT = 0.2  # Пересчет плана, если fps уехал больше чем на 20%
+    EMA_ALPHA = 0.05
+    WARMUP_FRAMES = 300  # После разогрева план строится заново — уже по замеренным задержкам
+
+    def __init__(self, fps: float):
+        self.fps = float(fps)
+        self._planned_fps = 0.0
+        self._plan: Dict[str, Tuple[int, int]] = {}  # {stage: (period, phase)}
+        self._frame = -1
+        self._last_ts: Optional[float] = None
+        self._interval: Optional[float] = None
+        self._levels: Dict[str, int] = {}  # Уровни QoS (ставит FrameBudgetGovernor)
+
+    # --- Такт ---
+
+    def begin_frame(self, now: float, stages: List[PipelineStage], costs: Callable[[], Dict[str, float]]):
+        """
+        Вызывается в начале кадра: двигает счетчик, уточняет fps, при дрейфе перестраивает план.
+        costs зовется только при перестройке (средние задержки стадий, мс).
+        """
+        self._frame += 1
+        if self._last_ts is not None:
+            dt = now - self._last_ts
+            if dt > 0:
+                self._interval = dt if self._interval is None else \
+                    self._interval + self.EMA_ALPHA * (dt - self._interval)
+                self.fps = 1.0 / self._interval
+        self._last_ts = now
+
+        # До разогрева fps (EMA) еще не устоялся: живем по плану из настроек камеры
+        if not self._planned_fps or self._frame == self.WARMUP_FRAMES or (
+                self._frame > self.WARMUP_FRAMES and
+                abs(self.fps - self._planned_fps) > self.REPLAN_DRIFT * self._planned_fps):
+            self.plan(stages, costs())
+
+    def invalidate(self):
+        """Набор стадий изменился — план перестроится на следующем кадре"""
+        self._planned_fps = 0.0
+
+    def is_due(self, stage: PipelineStage) -> bool:
+        if self._levels.get(stage.name, 0) >= QOS_PAUSED:
+            return False
+        period, phase = self._plan.get(stage.name, (1, 0))
+        return period <= 1 or self._frame % period == phase
+
+    # --- QoS ---
+
+    def level(self, name: str) -> int:
+        return self._levels.get(name, 0)
+
+    def set_level(self, name: str, level: int):
+        if level > 0:
+            self._levels[name] = level
+        else:
+            self._levels.pop(name, None)
+        self.invalidate()
+
+    def qos_state(self, stage: PipelineStage) -> Optional[Dict[str, Any]]:
+        """Для active_plugins: None, если стадия идет как объявлено"""
+        level = self._levels.get(stage.name, 0)
+        if not level:
+            return None
+        paused = level >= QOS_PAUSED
+        return {"level": level, "paused": paused,
+                "rate_hz": 0.0 if paused else round(self.fps / self.period_for(stage), 2)}
+
+    # --- План ---
+
+    def period_for(self, stage: PipelineStage) -> int:
+        rate = getattr(stage, "rate_hz", None)
+        period = 1 if not rate or rate <= 0 else max(1, int(round(self.fps / rate)))
+        level = self._levels.get(stage.name, 0)
+        if 0 < level < QOS_PAUSED:
+            period *= 2 ** level
+        return period
+
+    def plan(self, stages: List[PipelineStage], costs: Dict[str, float]):
+        """
+        Раскладывает фазы. costs — средняя задержка стадии (мс), неизвестная = 1.0.
+        Явная phase стадии сохраняется (по модулю периода), остальные выбирают кадр
+        с минимальной пиковой нагрузкой среди своих слотов.
+        """
+        load = [0.0] * self.HORIZON
+        plan: Dict[str, Tuple[int, int]] = {}
+
+        periodic = [s for s in stages if self.period_for(s) > 1 and self.level(s.name) < QOS_PAUSED]
+        # Явные фазы — первыми (их не двигаем), дальше приоритет, дальше тяжелые
+        periodic.sort(key=lambda s: (getattr(s, "phase", None) is None,
+                                     -getattr(s, "priority", 0),
+                                     -costs.get(s.name, 1.0)))
+
+        for stage in periodic:
+            period = self.period_for(stage)
+            cost = costs.get(stage.name, 1.0) or 1.0
+            phase = getattr(stage, "phase", None)
+
+            if phase is None:
+                best = None
+                for candidate in range(min(period, self.HORIZON)):
+                    slots = load[candidate::period]
+                    score = (max(slots), sum(slots))
+                    if best is None or score < best[0]:
+                        best = (score, candidate)
+                phase = best[1]
+            else:
+                phase %= period
+
+            for k in range(phase, self.HORIZON, period):
+                load[k] += cost
+            plan[stage.name] = (period, phase)
+
+        self._plan = plan
+        self._planned_fps = self.fps
+        if plan:
+            desc = ", ".join(f"{name} 1/{p}@{ph}" for name, (p, ph) in plan.items())
+            logger.info(f"🗓️ Stage schedule @ {self.fps:.0f} FPS: {desc}")
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {"period": N, "phase": k, "rate_hz": фактическая частота}}"""
+        return {
+            name: {"period": period, "phase": phase, "rate_hz": self.fps / period}
+            for name, (period, phase) in self._plan.items()
+        }
+
+
+class FrameBudgetGovernor:
+    """
+    QoS по бюджету кадра (работает внутри Processor).
+
+    Раз в QOS_INTERVAL_S смотрит p95 времени кадра за QOS_WINDOW_S:
+      - выше бюджета -> на одну ступень замедляет один не-core плагин
+        (низкий priority первым, среди равных — кто больше всего съел за окно):
+        частота /2 -> /4 -> /8 -> пауза (в паузе идет только on_skipped);
+      - ниже бюджета * QOS_RESTORE_RATIO QOS_RESTORE_HOLD раз подряд -> на ступень
+        возвращает последний замедленный.
+    Core-стадии (детекция, трекинг, координаты) не трогаются никогда.
+    """
+
+    def __init__(self, scheduler: StageScheduler, budget_ms: float):
+        self.scheduler = scheduler
+        self.budget_ms = budget_ms
+        self._frame = RollingHistogram(windows=(settings.QOS_WINDOW_S,), slice_s=settings.QOS_WINDOW_S / 4)
+        self._last_eval = 0.0
+        self._changed_at = float("-inf")
+        self._calm = 0
+        self._degraded: List[str] = []  # Стек: возвращаем в обратном порядке
+
+    def forget(self, name: str):
+        """Стадия выгружена (hot-reload): снимаем ее уровень и из стека деградаций"""
+        if name in self._degraded:
+            self._degraded.remove(name)
+        self.scheduler.set_level(name, 0)
+
+    def observe(self, frame_ms: float, now: float):
+        self._frame.record(frame_ms, now)
+
+    def evaluate(self, now: float, stages: List[PipelineStage], health: Dict[str, Dict],
+                 latency: Dict[str, RollingHistogram]):
+        if now - self._last_eval < settings.QOS_INTERVAL_S:
+            return
+        self._last_eval = now
+
+        # Судим только по кадрам после последнего решения, иначе старые пики дожмут лишнюю ступень
+        recent = self._frame.window(min(settings.QOS_WINDOW_S, now - self._changed_at), now)
+        if recent.count < 10:
+            return
+        p95 = recent.percentile(95)
+
+        if p95 > self.budget_ms:
+            self._calm = 0
+            if self._degrade(p95, now, stages, health, latency):
+                self._changed_at = now
+        elif p95 < self.budget_ms * settings.QOS_RESTORE_RATIO and self._degraded:
+            self._calm += 1
+            if self._calm >= settings.QOS_RESTORE_HOLD:
+                self._calm = 0
+                self._restore(p95)
+                self._changed_at = now
+        else:
+            self._calm = 0
+
+    def _degrade(self, p95: float, now: float, stages: List[PipelineStage], health: Dict[str, Dict],
+                 latency: Dict[str, RollingHistogram]) -> bool:
+        candidates = []
+        for stage in stages:
+            meta = health.get(stage.name, {})
+            if meta.get("is_core", True) or not meta.get("active", False):
+                continue
+            if self.scheduler.level(stage.name) >= QOS_PAUSED:
+                continue
+            spent = latency[stage.name].window(settings.QOS_WINDOW_S, now).sum_ms
+            if spent > 0:
+                candidates.append((getattr(stage, "priority", 0), -spent, stage.name))
+
+        if not candidates:
+            return False
+
+        _, spent, name = min(candidates)
+        level = self.scheduler.level(name) + 1
+        self.scheduler.set_level(name, level)
+        if name in self._degraded:
+            self._degraded.remove(name)
+        self._degraded.append(name)
+
+        action = "paused" if level >= QOS_PAUSED else f"rate /{2 ** level}"
+        logger.warning(f"🐢 QoS: frame p95 {p95:.1f} ms > budget {self.budget_ms:.1f} ms "
+                       f"-> '{name}' {action} (spent {-spent:.0f} ms / {settings.QOS_WINDOW_S:g}s)")
+        return True
+
+    def _restore(self, p95: float):
+        name = self._degraded[-1]
+        level = self.scheduler.level(name) - 1
+        self.scheduler.set_level(name, level)
+        if level <= 0:
+            self._degraded.pop()
+
+        state = "restored" if level <= 0 else f"rate /{2 ** level}"
+        logger.info(f"🐇 QoS: frame p95 {p95:.1f} ms, headroom -> '{name}' {state}")
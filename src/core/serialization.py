@@ -0,0 +1,34 @@
+# src/core/serialization.py
+from typing import Any
+
+import numpy as np
+import orjson
+from pydantic import BaseModel
+
+from src.data.models import KeypointTable
+
+# Один набор опций для воркера и API: числовые ключи ({0: ...}) и numpy без tolist()
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj: Any):
+    """Fallback для типов, которые orjson не знает (pydantic модели, произвольные объекты)"""
+    if isinstance(obj, KeypointTable):
+        return obj.to_records()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Сериализация пакета в JSON bytes (один раз, в процессе воркера).
+    Дальше EventBus и API передают bytes как есть, без повторного прохода.
+    """
+    return orjson.dumps(obj, default=encode_default, option=ORJSON_OPTIONS)
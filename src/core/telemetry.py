@@ -0,0 +1,325 @@
+# src/core/telemetry.py
+import math
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Iterable, List
+
+from src.core.config import settings
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в стиле HDR: логарифмические бакеты с фиксированной
+    относительной точностью (SUB_BUCKETS на октаву -> ~9%), от 1 мкс до ~100 сек.
+
+    Дешевая запись (один log2 + инкремент), сливается между процессами
+    (to_dict / from_dict / merge), перцентили считаются по бакетам.
+    """
+    SUB_BUCKETS = 8
+    MIN_US = 1.0
+    N_BUCKETS = SUB_BUCKETS * 27 + 1  # 2^27 мкс ≈ 134 сек
+
+    __slots__ = ("counts", "count", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * self.N_BUCKETS
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    @classmethod
+    def _bucket(cls, ms: float) -> int:
+        us = ms * 1000.0
+        if us <= cls.MIN_US:
+            return 0
+        return min(int(math.log2(us / cls.MIN_US) * cls.SUB_BUCKETS) + 1, cls.N_BUCKETS - 1)
+
+    @classmethod
+    def _upper_ms(cls, bucket: int) -> float:
+        return cls.MIN_US * 2 ** (bucket / cls.SUB_BUCKETS) / 1000.0
+
+    def record(self, ms: float):
+        self._add(self._bucket(ms), ms)
+
+    def _add(self, bucket: int, ms: float):
+        self.counts[bucket] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: 'LatencyHistogram'):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def reset(self):
+        self.counts = [0] * self.N_BUCKETS
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def percentile(self, q: float) -> float:
+        """Верхняя граница бакета, в который попал q-й перцентиль (мс), не больше max"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return min(self._upper_ms(i), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max_ms,
+            "mean": self.sum_ms / self.count if self.count else 0.0,
+        }
+
+    # --- IPC (heartbeat -> оркестратор) ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Компактное представление: только ненулевые бакеты"""
+        return {
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "max_ms": self.max_ms,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'LatencyHistogram':
+        h = cls()
+        if not data:
+            return h
+        for i, c in data.get("buckets", {}).items():
+            h.counts[int(i)] = c
+        h.count = data.get("count", 0)
+        h.sum_ms = data.get("sum_ms", 0.0)
+        h.max_ms = data.get("max_ms", 0.0)
+        return h
+
+    def count_le(self, ms: float) -> int:
+        """Сколько записей заведомо <= ms (бакеты, целиком лежащие ниже границы)"""
+        limit = self._bucket(ms)
+        total = sum(self.counts[:limit])
+        # Граничный бакет целиком ниже ms, только если его верхняя граница не выше ms
+        if self._upper_ms(limit) <= ms:
+            total += self.counts[limit]
+        return total
+
+
+class RollingHistogram:
+    """
+    Скользящая гистограмма: кольцо срезов по slice_s секунд (перцентили за
+    последние N секунд для каждого окна из windows) + накопительная total
+    (для OpenMetrics) + delta с последнего take_delta() (для heartbeat).
+    Потокобезопасна: стадии пишут из пула конвейера, heartbeat и governor читают с потока захвата.
+    """
+
+    def __init__(self, windows: Optional[Iterable[int]] = None, slice_s: Optional[float] = None):
+        self.windows = tuple(windows or settings.METRICS_WINDOWS)
+        self.slice_s = slice_s or settings.METRICS_SLICE_S
+        self._slices: deque = deque(maxlen=int(math.ceil(max(self.windows) / self.slice_s)) + 1)
+        self.total = LatencyHistogram()
+        self._delta = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def _current(self, now: float) -> LatencyHistogram:
+        if not self._slices or now - self._slices[-1][0] >= self.slice_s:
+            self._slices.append((now, LatencyHistogram()))
+        return self._slices[-1][1]
+
+    def record(self, ms: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        bucket = LatencyHistogram._bucket(ms)
+        with self._lock:
+            self._current(now)._add(bucket, ms)
+            self.total._add(bucket, ms)
+            self._delta._add(bucket, ms)
+
+    def merge(self, hist: LatencyHistogram, now: Optional[float] = None):
+        """Добавить уже собранную гистограмму (delta воркера) в текущий срез"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._current(now).merge(hist)
+            self.total.merge(hist)
+
+    def window(self, seconds: float, now: Optional[float] = None) -> LatencyHistogram:
+        now = time.monotonic() if now is None else now
+        merged = LatencyHistogram()
+        with self._lock:
+            for start, hist in self._slices:
+                if now - start < seconds:
+                    merged.merge(hist)
+        return merged
+
+    def mean_ms(self) -> Optional[float]:
+        """Среднее за все время (None, если записей нет)"""
+        with self._lock:
+            return self.total.sum_ms / self.total.count if self.total.count else None
+
+    def take_delta(self) -> LatencyHistogram:
+        # [FIX] Под блокировкой: иначе запись из пула попадает в уже отданную delta и теряется
+        with self._lock:
+            delta, self._delta = self._delta, LatencyHistogram()
+        return delta
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic() if now is None else now
+        return {f"{w}s": self.window(w, now).summary() for w in self.windows}
+
+
+# Ключ полного времени кадра среди стадий (имя стадии так называться не может)
+FRAME_STAGE = "__frame__"
+
+# Границы le (мс) для OpenMetrics histogram: вокруг бюджета кадра 11 мс (90 FPS)
+METRICS_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 11, 16, 33, 66, 100, 250, 1000)
+
+
+class StageMetrics:
+    """
+    Задержки стадий всех камер (живет в главном процессе).
+    Воркеры шлют delta гистограмм в heartbeat, оркестратор кладет их через ingest(),
+    API отдает report() / to_openmetrics() (GET /metrics).
+    """
+    # Семейства OpenMetrics: (имя, описание, фильтр по имени стадии)
+    FAMILIES = (
+        ("bikefit_frame_latency_seconds", "Whole-frame processing time", lambda s: s == FRAME_STAGE),
+        ("bikefit_stage_latency_seconds", "Pipeline stage processing time", lambda s: s != FRAME_STAGE),
+    )
+    LABEL = "stage"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {camera_id: {stage: RollingHistogram}}
+        self._hists: Dict[int, Dict[str, RollingHistogram]] = {}
+
+    def ingest(self, camera_id: int, deltas: Dict[str, Dict[str, Any]]):
+        now = time.monotonic()
+        with self._lock:
+            cam = self._hists.setdefault(camera_id, {})
+            for stage, data in deltas.items():
+                if stage not in cam:
+                    cam[stage] = RollingHistogram()
+                cam[stage].merge(LatencyHistogram.from_dict(data), now)
+
+    def _all_cameras(self, now: float) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Сводка по стадии, слитая по всем камерам (одноименные плагины)"""
+        merged: Dict[str, Dict[str, LatencyHistogram]] = {}
+        for cam in self._hists.values():
+            for stage, rh in cam.items():
+                per_window = merged.setdefault(stage, {f"{w}s": LatencyHistogram() for w in rh.windows})
+                for w in rh.windows:
+                    per_window[f"{w}s"].merge(rh.window(w, now))
+        return {stage: {w: h.summary() for w, h in wins.items()} for stage, wins in merged.items()}
+
+    def report(self) -> Dict[str, Any]:
+        """{camera_id | "all": {stage: {window: {count, p50, p95, p99, max, mean}}}}"""
+        now = time.monotonic()
+        with self._lock:
+            out: Dict[str, Any] = {
+                str(cid): {stage: rh.summary(now) for stage, rh in cam.items()}
+                for cid, cam in self._hists.items()
+            }
+            out["all"] = self._all_cameras(now)
+        return out
+
+    def to_openmetrics(self) -> str:
+        """Текст OpenMetrics: накопительные histogram + скользящие перцентили (gauge)"""
+        return "\n".join(self.metric_lines() + ["# EOF"]) + "\n"
+
+    def metric_lines(self) -> List[str]:
+        """Строки семейств без "# EOF" (GET /metrics склеивает несколько агрегаторов)"""
+        now = time.monotonic()
+        lines: List[str] = []
+        with self._lock:
+            for name, help_text, match in self.FAMILIES:
+                rows = [(cid, stage, rh) for cid, cam in sorted(self._hists.items())
+                        for stage, rh in sorted(cam.items()) if match(stage)]
+
+                lines += [f"# TYPE {name} histogram", f"# UNIT {name} seconds", f"# HELP {name} {help_text}."]
+                for cid, stage, rh in rows:
+                    labels = _labels(cid, stage, self.LABEL)
+                    for le in METRICS_BUCKETS_MS:
+                        lines.append(f'{name}_bucket{{{labels},le="{le / 1000:g}"}} {rh.total.count_le(le)}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {rh.total.count}')
+                    lines.append(f"{name}_count{{{labels}}} {rh.total.count}")
+                    lines.append(f"{name}_sum{{{labels}}} {rh.total.sum_ms / 1000:.9g}")
+
+                gauge = f"{name.rsplit('_', 1)[0]}_window_seconds"
+                lines += [f"# TYPE {gauge} gauge", f"# UNIT {gauge} seconds",
+                          f"# HELP {gauge} {help_text}: rolling percentiles over the window."]
+                for cid, stage, rh in rows:
+                    labels = _labels(cid, stage, self.LABEL)
+                    for w in rh.windows:
+                        stats = rh.window(w, now).summary()
+                        for q in ("p50", "p95", "p99", "max"):
+                            lines.append(f'{gauge}{{{labels},window="{w}s",stat="{q}"}} {stats[q] / 1000:.9g}')
+        return lines
+
+
+# Участки пути кадра по trace пакета: [camera_id, capture, shm, begin, stages, publish] (perf_counter воркера)
+WORKER_HOPS = ("shm", "queue", "stages", "publish")
+
+
+class HopMetrics(StageMetrics):
+    """
+    Сквозная задержка кадра по участкам, от захвата до отправки в WebSocket (главный процесс).
+    Пишет API: участки воркера берет из trace пакета, свои (bus, send) штампует сам.
+    perf_counter монотонный и общий для процессов машины, поэтому отметки разных процессов сравнимы.
+
+    shm — захват -> кадр опубликован в SHM, queue — ожидание места в конвейере,
+    stages — все стадии, publish — сборка пакета (и очередь публикации по порядку),
+    bus — шина + очередь соединения в API, send — отправка в WebSocket, total — захват -> отправлено.
+    Видео: jpeg_wait — захват -> API взял кадр, jpeg_encode — сжатие, jpeg_total — захват -> кадр отдан.
+    display — эхо фронтенда (отправка -> кадр отрисован -> ответ пришел), если включен TRACE_ECHO.
+    """
+    FAMILIES = (
+        ("bikefit_hop_latency_seconds", "Frame latency per hop from capture to send", lambda s: True),
+    )
+    LABEL = "hop"
+
+    def record(self, camera_id: int, hop: str, ms: float, now: Optional[float] = None):
+        now = now or time.monotonic()
+        with self._lock:
+            cam = self._hists.setdefault(camera_id, {})
+            if hop not in cam:
+                cam[hop] = RollingHistogram()
+            cam[hop].record(max(ms, 0.0), now)
+
+    def record_trace(self, trace: List[float], t_received: float, t_sent: float):
+        """trace пакета стрима + когда API его забрал из шины и когда отправил клиенту"""
+        camera_id, capture = int(trace[0]), trace[1]
+        now = time.monotonic()
+        with self._lock:
+            cam = self._hists.setdefault(camera_id, {})
+            marks = trace[1:] + [t_received, t_sent]
+            hops = WORKER_HOPS + ("bus", "send")
+            for i, hop in enumerate(hops):
+                if hop not in cam:
+                    cam[hop] = RollingHistogram()
+                cam[hop].record(max(marks[i + 1] - marks[i], 0.0) * 1000, now)
+            if "total" not in cam:
+                cam["total"] = RollingHistogram()
+            cam["total"].record(max(t_sent - capture, 0.0) * 1000, now)
+
+
+def _labels(camera_id: int, stage: str, label: str = "stage") -> str:
+    if stage == FRAME_STAGE:
+        return f'camera="{camera_id}"'
+    return f'camera="{camera_id}",{label}="{stage}"'
+
+
+# Глобальные агрегаторы главного процесса (оркестратор / API пишут, API читает)
+stage_metrics = StageMetrics()
+trace_metrics = HopMetrics()
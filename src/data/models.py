@@ -1,5 +1,6 @@
 # src/data/models.py
 import time
+from enum import Enum
 from typing import List, Dict, Tuple, Optional, Any
 from pydantic import BaseModel, Field
 import numpy as np
@@ -18,6 +19,23 @@ class FrameFlags:
     SECURITY_ALERT = 1 << 7  # 0x80: Нарушение безопасности
 
 
+class PixelFormat(str, Enum):
+    """
+    Формат пикселей в слоте SHM.
+    GRAY8 — дефолт для трекинга маркеров (детектор все равно работает по яркости).
+    """
+    GRAY8 = "GRAY8"  # (h, w)    1 byte/px
+    YUYV = "YUYV"  # (h, w, 2) 2 bytes/px, канал 0 = Y (яркость)
+    BGR = "BGR"  # (h, w, 3) 3 bytes/px
+
+    def frame_shape(self, height: int, width: int) -> Tuple[int, ...]:
+        if self is PixelFormat.GRAY8:
+            return (height, width)
+        if self is PixelFormat.YUYV:
+            return (height, width, 2)
+        return (height, width, 3)
+
+
 # === 1. Базовые примитивы ===
 
 class Point2D(BaseModel):
@@ -66,13 +84,188 @@ class Point2D(BaseModel):
             self.speed = (self.v_x ** 2 + self.v_y ** 2) ** 0.5
 
 
+class KeypointTable:
+    """
+    Колоночное хранилище точек кадра (vision.keypoints): по numpy-столбцу на поле Point2D.
+    Core-стадии (детекция, трекер, undistort, perspective) работают со столбцами целиком,
+    без цикла по точкам. Плагины по-прежнему итерируют точки: таблица отдает легкие
+    строки-view (KeypointRow) с атрибутами Point2D (p.id, p.x, p.wx = None, если нет).
+
+    None из Point2D хранится как NaN (float-столбцы) / -1 (id).
+    Таблица принадлежит кадру: стадии пишут в нее на месте, между кадрами не переиспользуется.
+    """
+    FLOAT_COLUMNS = ("x", "y", "ux", "uy", "wx", "wy", "v_x", "v_y", "speed", "confidence")
+    INT_COLUMNS = ("id", "age")
+    BOOL_COLUMNS = ("is_stable",)
+    COLUMNS = FLOAT_COLUMNS + INT_COLUMNS + BOOL_COLUMNS
+    # Столбцы, где NaN / -1 означают None (для строк и JSON)
+    OPTIONAL = ("id", "ux", "uy", "wx", "wy")
+
+    __slots__ = COLUMNS
+
+    def __init__(self, size: int = 0, **columns: np.ndarray):
+        for name in self.FLOAT_COLUMNS:
+            fill = 1.0 if name == "confidence" else (np.nan if name in self.OPTIONAL else 0.0)
+            setattr(self, name, np.full(size, fill, dtype=np.float64))
+        self.id = np.full(size, -1, dtype=np.int64)
+        self.age = np.zeros(size, dtype=np.int64)
+        self.is_stable = np.zeros(size, dtype=bool)
+        for name, values in columns.items():
+            getattr(self, name)[:] = values
+
+    @classmethod
+    def from_xy(cls, x: np.ndarray, y: np.ndarray, confidence: Optional[np.ndarray] = None) -> 'KeypointTable':
+        """Новые (не отслеженные) точки"""
+        table = cls(len(x), x=x, y=y)
+        if confidence is not None:
+            table.confidence[:] = confidence
+        return table
+
+    @classmethod
+    def from_points(cls, points: List[Any]) -> 'KeypointTable':
+        """Совместимость: список Point2D (или строк) -> таблица"""
+        if isinstance(points, KeypointTable):
+            return points
+        table = cls(len(points))
+        for i, p in enumerate(points):
+            for name in cls.COLUMNS:
+                value = getattr(p, name, None)
+                if value is not None:
+                    getattr(table, name)[i] = value
+        return table
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __iter__(self):
+        return (KeypointRow(self, i) for i in range(len(self.x)))
+
+    def __getitem__(self, index: int) -> 'KeypointRow':
+        if index < 0:
+            index += len(self.x)
+        if not 0 <= index < len(self.x):
+            raise IndexError(index)
+        return KeypointRow(self, index)
+
+    def select(self, index: np.ndarray) -> 'KeypointTable':
+        """Новая таблица из строк index (маска или индексы) — копия, не view"""
+        table = KeypointTable.__new__(KeypointTable)
+        for name in self.COLUMNS:
+            setattr(table, name, getattr(self, name)[index])
+        return table
+
+    def copy(self) -> 'KeypointTable':
+        table = KeypointTable.__new__(KeypointTable)
+        for name in self.COLUMNS:
+            setattr(table, name, getattr(self, name).copy())
+        return table
+
+    def concat(self, other: 'KeypointTable') -> 'KeypointTable':
+        table = KeypointTable.__new__(KeypointTable)
+        for name in self.COLUMNS:
+            setattr(table, name, np.concatenate((getattr(self, name), getattr(other, name))))
+        return table
+
+    def find(self, point_id: int) -> Optional['KeypointRow']:
+        hits = np.flatnonzero(self.id == point_id)
+        return KeypointRow(self, int(hits[0])) if len(hits) else None
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """JSON-вид, как у списка Point2D (NaN -> None, label из id)"""
+        columns = {}
+        for name in self.COLUMNS:
+            values = getattr(self, name)
+            if name == "id":
+                columns[name] = [None if v < 0 else v for v in values.tolist()]
+            elif name in self.OPTIONAL:
+                columns[name] = [None if v != v else v for v in values.tolist()]
+            else:
+                columns[name] = values.tolist()
+        names = list(columns)
+        records = [dict(zip(names, row)) for row in zip(*columns.values())]
+        for record in records:
+            record["label"] = f"ID {record['id']}" if record["id"] is not None else None
+        return records
+
+
+class KeypointRow:
+    """
+    Строка KeypointTable с интерфейсом Point2D (чтение и запись пишут прямо в столбцы).
+    Живет, пока жива таблица кадра: не храните строки между кадрами, копируйте значения.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: KeypointTable, index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def label(self) -> Optional[str]:
+        pid = self.id
+        return f"ID {pid}" if pid is not None else None
+
+    def model_dump(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in KeypointTable.COLUMNS}
+        data["label"] = self.label
+        return data
+
+    def __repr__(self) -> str:
+        return f"KeypointRow(id={self.id}, x={self.x}, y={self.y})"
+
+
+def _row_property(name: str):
+    optional = name in KeypointTable.OPTIONAL
+    cast = float if name in KeypointTable.FLOAT_COLUMNS else (bool if name in KeypointTable.BOOL_COLUMNS else int)
+    missing = -1 if name == "id" else np.nan
+
+    def getter(row: KeypointRow):
+        value = cast(getattr(row._table, name)[row._index])
+        if optional and (value == -1 if name == "id" else value != value):
+            return None
+        return value
+
+    def setter(row: KeypointRow, value):
+        getattr(row._table, name)[row._index] = missing if value is None else value
+
+    return property(getter, setter)
+
+
+for _name in KeypointTable.COLUMNS:
+    setattr(KeypointRow, _name, _row_property(_name))
+
+
 # === 2. Конфигурации Памяти ===
 
 class SharedMemoryConfig(BaseModel):
     name: str
     size: int
-    shape: Tuple[int, int, int] = (0, 0, 0)
+    # (h, w) для GRAY8, (h, w, 2) для YUYV, (h, w, 3) для BGR
+    shape: Tuple[int, ...] = (0, 0, 0)
     dtype: str = "uint8"
+    pixel_format: PixelFormat = PixelFormat.BGR
+
+
+class ShmRegistryEntry(BaseModel):
+    """
+    Запись реестра SHM (см. ShmRegistry): все, что нужно читателю,
+    чтобы подключиться к кольцу камеры без handshake и угадывания имен.
+    generation растет при каждой публикации/снятии -> сравнением ловим hot-swap.
+    """
+    camera_id: int
+    name: str
+    results_name: str = ""
+    shape: Tuple[int, ...] = (0, 0, 0)
+    dtype: str = "uint8"
+    pixel_format: PixelFormat = PixelFormat.BGR
+    capacity: int = 0
+    session_id: int = 0
+    layout_version: int = 0
+    generation: int = 0
+    active: bool = False
+
+    def to_config(self) -> SharedMemoryConfig:
+        return SharedMemoryConfig(name=self.name, size=0, shape=self.shape,
+                                  dtype=self.dtype, pixel_format=self.pixel_format)
 
 
 # === 3. Пакет данных кадра ===
@@ -0,0 +1,66 @@
+# src/data/pixels.py
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.data.models import PixelFormat
+
+# OpenCV < 4.8 не умеет BGR -> YUYV, тогда пакуем вручную
+_BGR2YUYV = getattr(cv2, "COLOR_BGR2YUV_YUYV", None)
+
+
+def to_gray(image: np.ndarray, fmt: PixelFormat, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Яркость кадра в нативном формате.
+    GRAY8 -> сам кадр, YUYV -> Y plane (view, без копии), BGR -> cvtColor (в out, если передан).
+    """
+    if fmt is PixelFormat.GRAY8 or image.ndim == 2:
+        return image
+    if fmt is PixelFormat.YUYV:
+        return image[:, :, 0]
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
+
+
+class ImageBuffers:
+    """
+    Переиспользуемые буферы производных изображений (FrameContext.gray / binary / pyramid ...).
+    Один набор на кадр в работе: Processor берет его из пула на старте кадра и возвращает
+    после публикации, поэтому массивы не выделяются заново каждый кадр.
+    """
+
+    def __init__(self):
+        self._arrays: Dict[Any, np.ndarray] = {}
+
+    def get(self, key: Any, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        arr = self._arrays.get(key)
+        if arr is None or arr.shape != shape or arr.dtype != dtype:
+            arr = self._arrays[key] = np.empty(shape, dtype=dtype)
+        return arr
+
+
+def to_bgr(image: np.ndarray, fmt: PixelFormat) -> np.ndarray:
+    """Кадр в BGR (для JPEG превью, сохранения калибровочных снимков и т.п.)"""
+    if fmt is PixelFormat.BGR:
+        return image
+    if fmt is PixelFormat.YUYV:
+        return cv2.cvtColor(image, cv2.COLOR_YUV2BGR_YUYV)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+def convert_bgr_into(src: np.ndarray, dst: np.ndarray, fmt: PixelFormat):
+    """
+    Пишет BGR кадр с камеры в слот SHM нужного формата (dst — view слота).
+    Конвертация идет прямо в dst, промежуточных массивов нет.
+    """
+    if fmt is PixelFormat.BGR:
+        dst[:] = src
+    elif fmt is PixelFormat.GRAY8:
+        cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst)
+    elif _BGR2YUYV is not None:
+        cv2.cvtColor(src, _BGR2YUYV, dst=dst)
+    else:
+        yuv = cv2.cvtColor(src, cv2.COLOR_BGR2YUV)
+        dst[:, :, 0] = yuv[:, :, 0]
+        dst[:, 0::2, 1] = yuv[:, 0::2, 1]  # U (на пару пикселей)
+        dst[:, 1::2, 1] = yuv[:, 0::2, 2]  # V
@@ -80,6 +80,7 @@ class PluginCommand(BaseModel):
     target: str = Field(..., description="ID получателя")
     cmd: str = Field(..., description="Имя команды")
     args: Dict[str, Any] = Field(default_factory=dict, description="Параметры")
+    request_id: Optional[str] = Field(None, description="ID запроса: с ним API вернет command_ack")
 
 # --- 4. Состояние Системы ---
 
@@ -1,20 +1,276 @@
+import ctypes
+import ctypes.util
+import mmap
+import os
+import platform
+import random
+import select
+import shutil
 import struct
+import sys
+import tempfile
 import time
 import numpy as np
 from multiprocessing import shared_memory
-from typing import Tuple, Optional, Any
+from typing import Tuple, Optional, Any, List, Dict
 from loguru import logger
 
 # Импортируем модели и настройки
-from src.data.models import SharedMemoryConfig
+from src.data.models import SharedMemoryConfig, ShmRegistryEntry, PixelFormat, KeypointTable
 from src.core.config import settings
 
+CACHE_LINE = 64
+PAGE_SIZE = mmap.PAGESIZE
+# Бессрочная аренда (pin_slot(timeout=LEASE_FOREVER)): писатель не снимает ее по таймауту
+LEASE_FOREVER = 0xFFFF_FFFF_FFFF_FFFF
+
+
+def _align_up(value: int, alignment: int) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def _warm_up_segment(shm: shared_memory.SharedMemory, name: str):
+    """
+    Подготовка свежесозданного сегмента (вызывать ДО init_header — страницы обнуляются).
+    - SHM_HUGEPAGES: подсказка ядру про transparent huge pages (работает, если
+      /sys/kernel/mm/transparent_hugepage/shmem_enabled = advise/always).
+    - SHM_PREFAULT: пишем по байту в каждую страницу, чтобы page fault'ы
+      случились сейчас, а не на первых кадрах после (пере)запуска воркера.
+    - SHM_MLOCK: фиксируем страницы в RAM (нужен RLIMIT_MEMLOCK / CAP_IPC_LOCK).
+    Все шаги best-effort: при отказе ядра пишем warning и работаем дальше.
+    """
+    mm = getattr(shm, "_mmap", None)
+
+    if settings.SHM_HUGEPAGES and mm is not None and hasattr(mmap, "MADV_HUGEPAGE"):
+        try:
+            mm.madvise(mmap.MADV_HUGEPAGE)
+        except OSError as e:
+            logger.debug(f"THP hint rejected for {name}: {e}")
+
+    if not (settings.SHM_PREFAULT or settings.SHM_MLOCK):
+        return
+
+    pages = np.frombuffer(shm.buf, dtype=np.uint8)
+    try:
+        if settings.SHM_PREFAULT:
+            pages[::PAGE_SIZE] = 0
+
+        if settings.SHM_MLOCK:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            if libc.mlock(ctypes.c_void_p(pages.ctypes.data), ctypes.c_size_t(pages.nbytes)) != 0:
+                err = ctypes.get_errno()
+                logger.warning(f"⚠️ mlock failed for {name}: errno {err} (check ulimit -l)")
+    finally:
+        # Иначе SharedMemory.close() упадет с BufferError
+        del pages
+
+
+# Номер syscall futex (Linux). None -> FrameNotifier.wait() спит на FIFO (см. FrameNotifier).
+# [FIX] Только на Linux: на macOS те же номера — другие syscall (arm64 98 = connect, x86_64 202 = __sysctl)
+_SYS_FUTEX = None
+if sys.platform.startswith("linux"):
+    _SYS_FUTEX = {"x86_64": 202, "amd64": 202, "aarch64": 98, "arm64": 98,
+                  "armv7l": 240, "i686": 240, "i386": 240}.get(platform.machine().lower())
+_FUTEX_WAIT = 0  # Без FUTEX_PRIVATE_FLAG: слово лежит в общей памяти разных процессов
+_FUTEX_WAKE = 1
+_INT_MAX = 2 ** 31 - 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+_libc = None
+if _SYS_FUTEX is not None:
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.syscall.restype = ctypes.c_long
+    except OSError:
+        _libc = None
+
+
+# [NEW] Каталог FIFO читателей для платформ без futex: <tmp>/bikefit_wake/<имя кольца>/
+_WAKE_ROOT = os.path.join(tempfile.gettempdir(), "bikefit_wake")
+
+
+class FrameNotifier:
+    """
+    Межпроцессное "кадр готов": 32-битный счетчик в заголовке кольца + futex.
+    Писатель после публикации кадра делает notify() (счетчик++ и FUTEX_WAKE всем),
+    читатели спят в wait() вместо sleep-поллинга и просыпаются сразу.
+
+    Имени/fd нет — слово живет внутри уже открытого сегмента, поэтому любой
+    процесс, подключенный к кольцу, автоматически может ждать.
+
+    [FIX] Без futex (macOS / неизвестная арх.) у каждого читателя свой FIFO в
+    каталоге кольца: wait() спит в select(), notify() пишет по байту в каждый FIFO.
+    Следующее за счетчиком слово (WakeGen) читатель меняет после создания FIFO —
+    писатель перечитывает каталог, только когда оно изменилось.
+    Нет и FIFO (Windows) — wait() поллит счетчик раз в 1 мс.
+
+    Пример (без гонок: токен берется ДО проверки данных):
+        token = notifier.current()
+        if nothing_new(): notifier.wait(token, timeout=0.1)
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, offset: int, owner: bool = False):
+        self._shm = shm
+        self._offset = offset
+        self._gen_offset = offset + 4
+        self._owner = owner
+        # Адрес слова для syscall. Массив сразу удаляем (иначе BufferError при close).
+        # Сам syscall на уже unmapped адресе вернет EFAULT, а не segfault.
+        word = np.ndarray((1,), dtype=np.uint32, buffer=shm.buf, offset=offset)
+        self._addr = word.ctypes.data
+        del word
+
+        self._wake_dir = None
+        if _libc is None and hasattr(os, "mkfifo"):
+            self._wake_dir = os.path.join(_WAKE_ROOT, shm.name.lstrip("/"))
+        # Писатель: открытые FIFO читателей {path: fd} и последнее виденное WakeGen
+        self._wake_fds: Dict[str, int] = {}
+        self._wake_gen: Optional[int] = None
+        # Читатель: свой FIFO (чтение + собственный конец записи, чтобы select не видел EOF)
+        self._fifo_path: Optional[str] = None
+        self._fifo_fds: Optional[Tuple[int, int]] = None
+
+    def current(self) -> int:
+        """Текущее значение счетчика (токен для wait)"""
+        return struct.unpack_from('I', self._shm.buf, self._offset)[0]
+
+    def notify(self):
+        """Сторона писателя (один писатель на кольцо)"""
+        value = (self.current() + 1) & 0xFFFFFFFF
+        struct.pack_into('I', self._shm.buf, self._offset, value)
+        if _libc is not None:
+            _libc.syscall(_SYS_FUTEX, ctypes.c_void_p(self._addr), _FUTEX_WAKE, _INT_MAX, None, None, 0)
+        elif self._wake_dir is not None:
+            self._wake_fifos()
+
+    def wait(self, token: int, timeout: float) -> bool:
+        """
+        Блокирует, пока счетчик == token (не дольше timeout секунд).
+        True — был notify() после получения token.
+        """
+        deadline = time.perf_counter() + timeout
+        # FIFO регистрируем ДО проверки счетчика: notify() после проверки его уже увидит
+        fifo_fd = self._open_fifo() if _libc is None else None
+        while True:
+            if self.current() != token:
+                return True
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+
+            if _libc is not None:
+                ts = _Timespec(int(remaining), int((remaining % 1.0) * 1e9))
+                # GIL отпускается на время syscall (ctypes)
+                _libc.syscall(_SYS_FUTEX, ctypes.c_void_p(self._addr), _FUTEX_WAIT,
+                              ctypes.c_uint32(token), ctypes.byref(ts), None, 0)
+            elif fifo_fd is not None:
+                if select.select([fifo_fd], [], [], remaining)[0]:
+                    self._drain_fifo(fifo_fd)
+            else:
+                time.sleep(min(remaining, 0.001))
+
+    # --- Без futex: FIFO на читателя ---
+
+    def _open_fifo(self) -> Optional[int]:
+        """Сторона читателя: создает свой FIFO один раз и сообщает о нем писателю (WakeGen)"""
+        if self._fifo_fds is not None:
+            return self._fifo_fds[0]
+        if self._wake_dir is None:
+            return None
+        path = os.path.join(self._wake_dir, f"{os.getpid()}_{id(self):x}")
+        try:
+            os.makedirs(self._wake_dir, exist_ok=True)
+            os.mkfifo(path, 0o600)
+            rfd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            wfd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            logger.warning(f"⚠️ FrameNotifier: no FIFO for {self._wake_dir} ({e}), falling back to polling")
+            self._wake_dir = None
+            return None
+        self._fifo_path, self._fifo_fds = path, (rfd, wfd)
+        # Любое НОВОЕ значение: два читателя, записавшие одновременно, не сольются в одно изменение
+        gen = struct.unpack_from('I', self._shm.buf, self._gen_offset)[0]
+        struct.pack_into('I', self._shm.buf, self._gen_offset, (gen + random.getrandbits(31) + 1) & 0xFFFFFFFF)
+        return rfd
+
+    @staticmethod
+    def _drain_fifo(fd: int):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _wake_fifos(self):
+        """Сторона писателя: по байту в FIFO каждого читателя"""
+        gen = struct.unpack_from('I', self._shm.buf, self._gen_offset)[0]
+        if gen != self._wake_gen:
+            self._wake_gen = gen
+            self._scan_fifos()
+        for path, fd in list(self._wake_fds.items()):
+            try:
+                os.write(fd, b"\0")
+            except BlockingIOError:
+                pass  # FIFO полон: читатель и так проснется
+            except OSError:
+                # EPIPE: читатель ушел, не убрав за собой FIFO
+                os.close(fd)
+                del self._wake_fds[path]
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def _scan_fifos(self):
+        try:
+            names = os.listdir(self._wake_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self._wake_dir, name)
+            if path in self._wake_fds:
+                continue
+            try:
+                self._wake_fds[path] = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError:
+                pass  # ENXIO: FIFO без читателя (еще не открыт / читатель умер)
+
+    def close(self):
+        """Закрывает FIFO (свой — удаляет; владелец кольца удаляет весь каталог)"""
+        for fd in list(self._wake_fds.values()) + list(self._fifo_fds or ()):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._wake_fds, self._fifo_fds = {}, None
+        if self._fifo_path:
+            try:
+                os.unlink(self._fifo_path)
+            except OSError:
+                pass
+            self._fifo_path = None
+        if self._owner and self._wake_dir:
+            shutil.rmtree(self._wake_dir, ignore_errors=True)
+
 
 class VideoFrameLayout:
     """
-    Управляет форматом ОДНОГО слота кадра (Secure Protocol v2.1).
+    Управляет форматом ОДНОГО слота кадра (Secure Protocol v2.3).
     Structure:
-    [ Header (24 bytes) | Pixels (...) ]
+    [ Seq (8 bytes) | Header (24 bytes) | pad до PAGE_SIZE | Pixels (...) | pad до PAGE_SIZE ]
+
+    Seq + Header занимают одну cache line (64b) и лежат на своей странице:
+    запись заголовка не дергает линии пикселей, а пиксели начинаются
+    с границы страницы (memcpy / cvtColor идут по выровненной памяти).
+    Размер слота кратен PAGE_SIZE, поэтому выравнивание сохраняется для всех слотов.
+
+    Seq ('Q'): счетчик seqlock (uint64).
+      - Нечетный -> писатель сейчас внутри слота.
+      - Четный   -> слот согласован.
 
     Header Format ('qdfBH'):
       - q: frame_id   (int64, 8 bytes)
@@ -23,13 +279,48 @@ class VideoFrameLayout:
       - B: flags      (uint8, 1 byte)
       - H: reserved   (uint16, 2 bytes)
     """
+    _SEQ_FORMAT = 'Q'
+    SEQ_SIZE = struct.calcsize(_SEQ_FORMAT)
     _HEADER_FORMAT = 'qdfBH'
-    HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+    # Версия layout кольца (публикуется в реестре, читатель сверяет перед attach)
+    LAYOUT_VERSION = 4  # 4: заголовок кольца результатов 24 байта (WakeGen)
+    META_SIZE = SEQ_SIZE + struct.calcsize(_HEADER_FORMAT)
+    # Смещение пикселей внутри слота (заголовок дополнен до страницы)
+    HEADER_SIZE = _align_up(META_SIZE, PAGE_SIZE)
 
     @classmethod
     def get_slot_size(cls, shape: Tuple[int, ...], dtype='uint8') -> int:
         pixel_bytes = np.prod(shape) * np.dtype(dtype).itemsize
-        return cls.HEADER_SIZE + int(pixel_bytes)
+        return _align_up(cls.HEADER_SIZE + int(pixel_bytes), PAGE_SIZE)
+
+    # --- Seqlock: сторона писателя ---
+
+    @classmethod
+    def begin_write(cls, buffer_view: memoryview) -> int:
+        """
+        Открывает запись в слот: seq становится нечетным.
+        Возвращает новое значение seq (передать в end_write).
+        """
+        seq = struct.unpack_from(cls._SEQ_FORMAT, buffer_view, 0)[0] | 1
+        struct.pack_into(cls._SEQ_FORMAT, buffer_view, 0, seq)
+        return seq
+
+    @classmethod
+    def end_write(cls, buffer_view: memoryview, seq: int):
+        """Закрывает запись: seq снова четный (и больше, чем до записи)."""
+        struct.pack_into(cls._SEQ_FORMAT, buffer_view, 0, seq + 1)
+
+    @classmethod
+    def write_header(cls, buffer_view: memoryview, frame_id: int, timestamp: float,
+                     math_salt: float = 1.0, flags: int = 0):
+        """Пишет только заголовок (пиксели уже лежат в слоте). Вызывать внутри begin/end_write."""
+        struct.pack_into(cls._HEADER_FORMAT, buffer_view, cls.SEQ_SIZE,
+                         frame_id, timestamp, math_salt, flags, 0)
+
+    @classmethod
+    def get_pixel_view(cls, buffer_view: memoryview, shape: Tuple[int, ...], dtype='uint8') -> np.ndarray:
+        """ndarray поверх пикселей слота (для захвата камерой прямо в SHM)"""
+        return np.ndarray(shape, dtype=dtype, buffer=buffer_view[cls.HEADER_SIZE:])
 
     @classmethod
     def write_to_buf(cls, buffer_view: memoryview,
@@ -39,38 +330,160 @@ class VideoFrameLayout:
                      math_salt: float = 1.0,
                      flags: int = 0):
         """
-        Записывает кадр и метаданные безопасности в буфер.
+        Записывает кадр и метаданные безопасности в буфер (под seqlock).
         """
-        # 1. Пишем заголовок
-        struct.pack_into(cls._HEADER_FORMAT, buffer_view, 0,
-                         frame_id, timestamp, math_salt, flags, 0)
+        seq = cls.begin_write(buffer_view)
+        try:
+            # 1. Пишем заголовок
+            cls.write_header(buffer_view, frame_id, timestamp, math_salt, flags)
+
+            # 2. Пишем пиксели
+            # Создаем numpy array поверх shared memory
+            dst_arr = cls.get_pixel_view(buffer_view, frame.shape, frame.dtype)
+            # Копируем данные (Zero-Copy запись в память)
+            dst_arr[:] = frame[:]
+        finally:
+            cls.end_write(buffer_view, seq)
 
-        # 2. Пишем пиксели
-        # Вычисляем смещение для тела кадра
-        body_view = buffer_view[cls.HEADER_SIZE:]
-        # Создаем numpy array поверх shared memory
-        dst_arr = np.ndarray(frame.shape, dtype=frame.dtype, buffer=body_view)
-        # Копируем данные (Zero-Copy запись в память)
-        dst_arr[:] = frame[:]
+    # --- Seqlock: сторона читателя ---
+
+    @classmethod
+    def read_begin(cls, buffer_view: memoryview) -> int:
+        """
+        Снимок seq перед чтением.
+        Возвращает -1, если писатель сейчас внутри слота.
+        """
+        seq = struct.unpack_from(cls._SEQ_FORMAT, buffer_view, 0)[0]
+        return -1 if seq & 1 else seq
+
+    @classmethod
+    def read_validate(cls, buffer_view: memoryview, seq: int) -> bool:
+        """
+        True, если слот не перезаписывался с момента read_begin.
+        Вызывать ПОСЛЕ того, как данные из view использованы (encode, расчет...).
+        """
+        if seq < 0:
+            return False
+        return struct.unpack_from(cls._SEQ_FORMAT, buffer_view, 0)[0] == seq
+
+    @classmethod
+    def peek(cls, shm_buf: memoryview, slot_offset: int) -> Tuple[int, int]:
+        """
+        Быстрое чтение (seq, frame_id) слота без создания view.
+        Используется FrameCursor для обхода кольца.
+        """
+        seq = struct.unpack_from(cls._SEQ_FORMAT, shm_buf, slot_offset)[0]
+        frame_id = struct.unpack_from('q', shm_buf, slot_offset + cls.SEQ_SIZE)[0]
+        return seq, frame_id
 
     @classmethod
     def parse_from_buf(cls, buffer_view: memoryview, shape: Tuple[int, ...], dtype='uint8'):
         """
         Читает кадр и возвращает расширенный кортеж данных.
+        ВНИМАНИЕ: без проверки seqlock. Для безопасного чтения см. SlotView.
         """
-        frame_id, ts, salt, flags, _ = struct.unpack_from(cls._HEADER_FORMAT, buffer_view, 0)
-        image_view = np.ndarray(shape, dtype=dtype, buffer=buffer_view[cls.HEADER_SIZE:])
+        frame_id, ts, salt, flags, _ = struct.unpack_from(cls._HEADER_FORMAT, buffer_view, cls.SEQ_SIZE)
+        image_view = cls.get_pixel_view(buffer_view, shape, dtype)
 
         return frame_id, ts, salt, flags, image_view
 
 
+class SlotView:
+    """
+    Zero-Copy представление слота кольца, защищенное seqlock.
+    Картинка (image) смотрит прямо в SHM. Писатель может перезаписать слот
+    в любой момент, поэтому после обработки нужно вызвать is_valid():
+    False -> результат (JPEG, запись на диск...) собран из рваного кадра и его надо выбросить.
+
+    Пример:
+        with mgr.read_latest() as view:
+            ok, jpg = cv2.imencode('.jpg', view.image)
+            if view.is_valid(): send(jpg)
+    """
+    __slots__ = ("slot_index", "seq", "frame_id", "timestamp", "math_salt", "flags", "image", "overrun",
+                 "_buf", "_mgr", "_lease")
+
+    def __init__(self, buffer_view: memoryview, slot_index: int, seq: int,
+                 frame_id: int, timestamp: float, math_salt: float, flags: int, image: np.ndarray,
+                 manager: Optional['SharedMemoryManager'] = None):
+        self._buf = buffer_view
+        self._mgr = manager
+        # Срок аренды слота (ns, CLOCK_MONOTONIC), 0 — слот не арендован
+        self._lease = 0
+        self.slot_index = slot_index
+        self.seq = seq
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.math_salt = math_salt
+        self.flags = flags
+        self.image = image
+        # Сколько кадров читатель пропустил перед этим (заполняет FrameCursor)
+        self.overrun = 0
+
+    def is_valid(self) -> bool:
+        """Проверка seqlock: слот не перезаписан с момента открытия view"""
+        if self._buf is None:
+            return False
+        return VideoFrameLayout.read_validate(self._buf, self.seq)
+
+    def pin(self, timeout: Optional[float] = None) -> bool:
+        """
+        Арендует слот: писатель будет пропускать его, пока аренда не снята (release)
+        или не истекла (timeout, по умолчанию settings.SHM_LEASE_TIMEOUT).
+        Нужна медленным потребителям (JPEG высокого качества, запись на диск),
+        чтобы работать со слотом без копии. False — слот уже перезаписан.
+        """
+        if self._mgr is None or self._buf is None:
+            return False
+        self._lease = self._mgr.pin_slot(self.slot_index, timeout)
+        if not self.is_valid():
+            # Писатель успел зайти в слот до аренды
+            self._mgr.unpin_slot(self.slot_index, self._lease)
+            self._lease = 0
+            return False
+        return True
+
+    def release(self):
+        """
+        Отпускает ссылки на SHM (и аренду слота, если была).
+        Без этого SharedMemory.close() упадет с BufferError (exported pointers exist).
+        """
+        if self._lease and self._mgr is not None:
+            self._mgr.unpin_slot(self.slot_index, self._lease)
+        self._lease = 0
+        self._mgr = None
+        self.image = None
+        self._buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
 class RingBufferLayout:
     """
     Управляет заголовком ВСЕГО кольца (Global Header).
-    Structure: [ WriteIndex (4b) | Capacity (4b) | ... Slots ... ]
+    Structure:
+    [ WriteIndex (4b) | Capacity (4b) | NotifySeq (4b) | WakeGen (4b) | Skipped (8b) | LeaseExpired (8b)
+      | pad до 64 | Leases (capacity * 8b) | pad до PAGE_SIZE | ... Slots ... ]
+
+    NotifySeq — futex слово FrameNotifier (растет на каждый опубликованный кадр).
+    WakeGen — читатели меняют его, создав свой FIFO (FrameNotifier без futex).
+    Skipped / LeaseExpired — счетчики писателя: сколько раз арендованный слот
+    был пропущен и сколько аренд он снял по таймауту.
+    Leases — срок аренды каждого слота (ns, CLOCK_MONOTONIC), 0 — свободен.
+
+    Глобальный заголовок занимает целую страницу: слоты начинаются с границы
+    страницы, а частые обновления write_index не делят cache line с данными.
     """
-    _GLOBAL_HEADER_FMT = 'II'
-    GLOBAL_HEADER_SIZE = struct.calcsize(_GLOBAL_HEADER_FMT)
+    _GLOBAL_HEADER_FMT = 'IIIIQQ'
+    NOTIFY_OFFSET = struct.calcsize('II')
+    STATS_OFFSET = struct.calcsize('IIII')
+    LEASE_OFFSET = _align_up(struct.calcsize(_GLOBAL_HEADER_FMT), CACHE_LINE)
+    GLOBAL_HEADER_SIZE = PAGE_SIZE
+    MAX_CAPACITY = (GLOBAL_HEADER_SIZE - LEASE_OFFSET) // 8
 
     @classmethod
     def calc_total_size(cls, shape: Tuple[int, ...], dtype='uint8', capacity: int = 3) -> int:
@@ -80,38 +493,376 @@ class RingBufferLayout:
     @classmethod
     def init_header(cls, shm_buf: memoryview, capacity: int):
         """Инициализация глобального заголовка при создании памяти"""
-        struct.pack_into(cls._GLOBAL_HEADER_FMT, shm_buf, 0, 0, capacity)
+        if capacity > cls.MAX_CAPACITY:
+            raise ValueError(f"Ring capacity {capacity} > {cls.MAX_CAPACITY} (lease table is one page)")
+        struct.pack_into(cls._GLOBAL_HEADER_FMT, shm_buf, 0, 0, capacity, 0, 0, 0, 0)
 
     @classmethod
     def get_write_index(cls, shm_buf: memoryview) -> int:
         """Получить индекс последнего записанного слота"""
-        idx, _ = struct.unpack_from(cls._GLOBAL_HEADER_FMT, shm_buf, 0)
-        return idx
+        return struct.unpack_from('I', shm_buf, 0)[0]
 
     @classmethod
     def get_capacity(cls, shm_buf: memoryview) -> int:
         """Получить емкость буфера"""
-        _, cap = struct.unpack_from(cls._GLOBAL_HEADER_FMT, shm_buf, 0)
-        return cap
+        return struct.unpack_from('I', shm_buf, 4)[0]
 
     @classmethod
     def update_write_index(cls, shm_buf: memoryview, new_index: int):
-        """Обновить индекс записи"""
-        _, cap = struct.unpack_from(cls._GLOBAL_HEADER_FMT, shm_buf, 0)
-        struct.pack_into(cls._GLOBAL_HEADER_FMT, shm_buf, 0, new_index, cap)
+        """Обновить индекс записи (читателей будит SharedMemoryManager.publish)"""
+        struct.pack_into('I', shm_buf, 0, new_index)
+
+    @classmethod
+    def get_slot_offset(cls, slot_index: int, slot_size: int) -> int:
+        """Смещение начала слота от начала сегмента"""
+        return cls.GLOBAL_HEADER_SIZE + (slot_index * slot_size)
+
+    # --- Аренда слотов ---
+
+    @classmethod
+    def get_lease(cls, shm_buf: memoryview, slot_index: int) -> int:
+        return struct.unpack_from('Q', shm_buf, cls.LEASE_OFFSET + slot_index * 8)[0]
+
+    @classmethod
+    def set_lease(cls, shm_buf: memoryview, slot_index: int, deadline_ns: int):
+        struct.pack_into('Q', shm_buf, cls.LEASE_OFFSET + slot_index * 8, deadline_ns)
+
+    @classmethod
+    def get_stats(cls, shm_buf: memoryview) -> Tuple[int, int]:
+        """(skipped, lease_expired)"""
+        return struct.unpack_from('QQ', shm_buf, cls.STATS_OFFSET)
+
+    @classmethod
+    def add_stats(cls, shm_buf: memoryview, skipped: int, expired: int):
+        old_skipped, old_expired = cls.get_stats(shm_buf)
+        struct.pack_into('QQ', shm_buf, cls.STATS_OFFSET, old_skipped + skipped, old_expired + expired)
 
     @classmethod
     def get_slot_view(cls, shm_buf: memoryview, slot_index: int, slot_size: int) -> memoryview:
         """Получить memoryview конкретного слота"""
-        offset = cls.GLOBAL_HEADER_SIZE + (slot_index * slot_size)
+        offset = cls.get_slot_offset(slot_index, slot_size)
         return shm_buf[offset: offset + slot_size]
 
 
+class FrameCursor:
+    """
+    Независимый курсор читателя по кольцу (у каждого потребителя свой).
+
+    - read_next(): следующий по порядку кадр (Recorder — пишет КАЖДЫЙ кадр).
+    - read_latest(): самый свежий кадр (Preview — пропускает лишнее).
+
+    В обоих случаях view.overrun = сколько кадров перезаписано до того,
+    как читатель успел их забрать. Накопительный счетчик — overrun_total.
+
+    timeout > 0: если кадра еще нет, курсор спит на FrameNotifier кольца
+    до публикации следующего (вместо sleep-поллинга на стороне читателя).
+    """
+
+    def __init__(self, manager: 'SharedMemoryManager', after_frame_id: int = -1):
+        self.mgr = manager
+        self.last_frame_id = after_frame_id
+        self.overrun_total = 0
+
+    def _scan(self) -> List[Tuple[int, int]]:
+        """Согласованные (frame_id, slot_index) всех заполненных слотов кольца"""
+        buf = self.mgr.shm.buf
+        found = []
+        for idx in range(self.mgr.capacity):
+            offset = RingBufferLayout.get_slot_offset(idx, self.mgr.slot_size)
+            seq, fid = VideoFrameLayout.peek(buf, offset)
+            if seq == 0 or seq & 1:
+                continue  # Пустой слот или писатель внутри
+            if VideoFrameLayout.peek(buf, offset)[0] != seq:
+                continue  # Заголовок поменялся во время чтения
+            found.append((fid, idx))
+        return found
+
+    def _take(self, pick_latest: bool, after: int) -> Optional[SlotView]:
+        # Две попытки: слот могут перезаписать между обходом и открытием
+        for _ in range(2):
+            candidates = [c for c in self._scan() if c[0] > after]
+            if not candidates:
+                return None
+
+            fid, idx = max(candidates) if pick_latest else min(candidates)
+            view = self.mgr.open_slot(idx)
+            if view is None:
+                continue
+            if view.frame_id != fid:
+                view.release()
+                continue
+
+            view.overrun = fid - after - 1 if after >= 0 else 0
+            self.overrun_total += view.overrun
+            self.last_frame_id = fid
+            return view
+        return None
+
+    def _wait_take(self, pick_latest: bool, after: Optional[int], timeout: float) -> Optional[SlotView]:
+        deadline = time.perf_counter() + timeout
+        while True:
+            notifier = self.mgr.notifier
+            if not self.mgr.shm or notifier is None:
+                return None
+            # Токен до проверки: notify между _take и wait не потеряется
+            token = notifier.current()
+            view = self._take(pick_latest, self.last_frame_id if after is None else after)
+            remaining = deadline - time.perf_counter()
+            if view is not None or remaining <= 0:
+                return view
+            notifier.wait(token, remaining)
+
+    def read_next(self, after_frame_id: Optional[int] = None, timeout: float = 0.0) -> Optional[SlotView]:
+        """
+        Следующий кадр после after_frame_id (по умолчанию — после последнего прочитанного).
+        Возвращает None, если новых кадров нет (за timeout секунд).
+        """
+        if not self.mgr.shm: return None
+        if timeout > 0:
+            return self._wait_take(False, after_frame_id, timeout)
+        after = self.last_frame_id if after_frame_id is None else after_frame_id
+        return self._take(pick_latest=False, after=after)
+
+    def read_latest(self, timeout: float = 0.0) -> Optional[SlotView]:
+        """Самый свежий кадр, если он новее последнего прочитанного (ждет до timeout секунд)"""
+        if not self.mgr.shm: return None
+        if timeout > 0:
+            return self._wait_take(True, None, timeout)
+        return self._take(pick_latest=True, after=self.last_frame_id)
+
+
+# Фиксированный layout одной точки в SHM (40 bytes).
+# None в Point2D хранится как NaN (координаты) или -1 (id).
+KEYPOINT_DTYPE = np.dtype([
+    ('id', '<i4'),
+    ('x', '<f4'), ('y', '<f4'),
+    ('ux', '<f4'), ('uy', '<f4'),
+    ('wx', '<f4'), ('wy', '<f4'),
+    ('vx', '<f4'), ('vy', '<f4'),
+    ('confidence', '<f4'),
+])
+
+
+# Поле KEYPOINT_DTYPE <- столбец KeypointTable (None там уже NaN / -1)
+_RESULT_COLUMNS = (("id", "id"), ("x", "x"), ("y", "y"), ("ux", "ux"), ("uy", "uy"), ("wx", "wx"), ("wy", "wy"),
+                   ("vx", "v_x"), ("vy", "v_y"), ("confidence", "confidence"))
+
+
+class ResultsLayout:
+    """
+    Кольцо результатов обработки (точки + метрики кадра), по одному на камеру.
+    Structure:
+    [ Global Header (24 bytes) | Slot 0 | Slot 1 | ... ]
+
+    Global Header ('IIIIII'): write_index, capacity, max_points, notify_seq (futex слово FrameNotifier),
+    wake_gen (FIFO читателей без futex), reserved
+    Slot: [ Seq (8b) | Header 'qdIf' (24b) | Points (max_points * KEYPOINT_DTYPE) ]
+      - q: frame_id   (int64)
+      - d: timestamp  (double)
+      - I: count      (uint32, точек в кадре)
+      - f: frame_ms   (float, время Processor.process_frame)
+
+    Слот выбирается как frame_id % capacity, поэтому результат ищется по frame_id
+    без обхода кольца (frame_id видеокадра == frame_id результата).
+    """
+    _GLOBAL_HEADER_FMT = 'IIIIII'
+    GLOBAL_HEADER_SIZE = struct.calcsize(_GLOBAL_HEADER_FMT)
+    _SEQ_FORMAT = 'Q'
+    SEQ_SIZE = struct.calcsize(_SEQ_FORMAT)
+    _HEADER_FORMAT = 'qdIf'
+    HEADER_SIZE = SEQ_SIZE + struct.calcsize(_HEADER_FORMAT)
+    NOTIFY_OFFSET = struct.calcsize('III')
+
+    @classmethod
+    def get_slot_size(cls, max_points: int) -> int:
+        return cls.HEADER_SIZE + max_points * KEYPOINT_DTYPE.itemsize
+
+    @classmethod
+    def calc_total_size(cls, capacity: int, max_points: int) -> int:
+        return cls.GLOBAL_HEADER_SIZE + cls.get_slot_size(max_points) * capacity
+
+    @classmethod
+    def init_header(cls, shm_buf: memoryview, capacity: int, max_points: int):
+        struct.pack_into(cls._GLOBAL_HEADER_FMT, shm_buf, 0, 0, capacity, max_points, 0, 0, 0)
+
+    @classmethod
+    def read_header(cls, shm_buf: memoryview) -> Tuple[int, int, int]:
+        """(write_index, capacity, max_points)"""
+        idx, cap, max_points = struct.unpack_from('III', shm_buf, 0)
+        return idx, cap, max_points
+
+    @classmethod
+    def update_write_index(cls, shm_buf: memoryview, new_index: int):
+        struct.pack_into('I', shm_buf, 0, new_index)
+
+    @classmethod
+    def get_slot_offset(cls, slot_index: int, slot_size: int) -> int:
+        return cls.GLOBAL_HEADER_SIZE + slot_index * slot_size
+
+
+class ResultsMemoryManager:
+    """
+    RAII обертка над кольцом результатов.
+    Воркер пишет (create=True), API / Recorder / Fusion читают (create=False).
+    Читатель получает копию точек (max_points * 40 bytes) под seqlock — без pickle/JSON.
+    """
+
+    def __init__(self, name: str, create: bool = True,
+                 capacity: Optional[int] = None, max_points: Optional[int] = None):
+        self.name = name
+        self.is_owner = create
+        self.capacity = capacity or settings.SHM_RESULTS_COUNT
+        self.max_points = max_points or settings.SHM_RESULTS_MAX_POINTS
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.notifier: Optional[FrameNotifier] = None
+
+        if self.is_owner:
+            self._allocate()
+        else:
+            self._attach()
+        self.slot_size = ResultsLayout.get_slot_size(self.max_points)
+        self.notifier = FrameNotifier(self.shm, ResultsLayout.NOTIFY_OFFSET, owner=self.is_owner)
+
+    def _allocate(self):
+        try:
+            temp = shared_memory.SharedMemory(name=self.name)
+            temp.unlink()
+            temp.close()
+            logger.warning(f"🧹 Cleaned up stale SHM: {self.name}")
+        except FileNotFoundError:
+            pass
+
+        size = ResultsLayout.calc_total_size(self.capacity, self.max_points)
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        _warm_up_segment(self.shm, self.name)
+        ResultsLayout.init_header(self.shm.buf, self.capacity, self.max_points)
+        logger.info(f"💾 Results SHM Created: {self.name} | {size / 1024:.1f} KB | {self.capacity} slots")
+
+    def _attach(self):
+        self.shm = shared_memory.SharedMemory(name=self.name, create=False)
+        _, self.capacity, self.max_points = ResultsLayout.read_header(self.shm.buf)
+        logger.debug(f"🔗 Attached to Results SHM: {self.name}")
+
+    def _points_view(self, offset: int) -> np.ndarray:
+        return np.ndarray((self.max_points,), dtype=KEYPOINT_DTYPE,
+                          buffer=self.shm.buf, offset=offset + ResultsLayout.HEADER_SIZE)
+
+    # --- Writer ---
+
+    def write(self, frame_id: int, timestamp: float, points: List[Any], frame_ms: float = 0.0):
+        """
+        Записывает точки кадра (KeypointTable или список Point2D) в слот frame_id % capacity.
+        Лишние точки (> max_points) отбрасываются.
+        """
+        if not self.shm: return
+
+        slot_idx = frame_id % self.capacity
+        offset = ResultsLayout.get_slot_offset(slot_idx, self.slot_size)
+        buf = self.shm.buf
+        count = min(len(points), self.max_points)
+
+        seq = struct.unpack_from(ResultsLayout._SEQ_FORMAT, buf, offset)[0] | 1
+        struct.pack_into(ResultsLayout._SEQ_FORMAT, buf, offset, seq)
+        try:
+            if count and isinstance(points, KeypointTable):
+                # Столбцы таблицы -> поля структуры (без цикла по точкам)
+                rows = self._points_view(offset)
+                for field, column in _RESULT_COLUMNS:
+                    rows[field][:count] = getattr(points, column)[:count]
+                del rows
+            elif count:
+                nan = float('nan')
+                rows = self._points_view(offset)
+                rows[:count] = [(
+                    p.id if p.id is not None else -1,
+                    p.x, p.y,
+                    p.ux if p.ux is not None else nan, p.uy if p.uy is not None else nan,
+                    p.wx if p.wx is not None else nan, p.wy if p.wy is not None else nan,
+                    p.v_x, p.v_y,
+                    p.confidence
+                ) for p in points[:count]]
+                del rows
+            struct.pack_into(ResultsLayout._HEADER_FORMAT, buf, offset + ResultsLayout.SEQ_SIZE,
+                             frame_id, timestamp, count, frame_ms)
+        finally:
+            struct.pack_into(ResultsLayout._SEQ_FORMAT, buf, offset, seq + 1)
+
+        ResultsLayout.update_write_index(buf, slot_idx)
+        self.notifier.notify()
+
+    # --- Readers ---
+
+    def read(self, frame_id: int, timeout: float = 0.0) -> Optional[Tuple[int, float, float, np.ndarray]]:
+        """
+        Результат конкретного кадра: (frame_id, timestamp, frame_ms, points).
+        None — кадр еще не обработан (за timeout секунд) или уже вытеснен из кольца.
+        """
+        if not self.shm: return None
+        deadline = time.perf_counter() + timeout
+        while True:
+            token = self.notifier.current()
+            res = self._read_slot(frame_id % self.capacity, frame_id)
+            remaining = deadline - time.perf_counter()
+            if res is not None or remaining <= 0:
+                return res
+            self.notifier.wait(token, remaining)
+
+    def read_latest(self) -> Optional[Tuple[int, float, float, np.ndarray]]:
+        """Последний записанный результат"""
+        if not self.shm: return None
+        idx, _, _ = ResultsLayout.read_header(self.shm.buf)
+        return self._read_slot(idx, None)
+
+    def _read_slot(self, slot_idx: int, expected_fid: Optional[int]):
+        buf = self.shm.buf
+        offset = ResultsLayout.get_slot_offset(slot_idx, self.slot_size)
+
+        seq = struct.unpack_from(ResultsLayout._SEQ_FORMAT, buf, offset)[0]
+        if seq == 0 or seq & 1:
+            return None
+
+        fid, ts, count, frame_ms = struct.unpack_from(
+            ResultsLayout._HEADER_FORMAT, buf, offset + ResultsLayout.SEQ_SIZE)
+        if expected_fid is not None and fid != expected_fid:
+            return None
+
+        rows = self._points_view(offset)
+        points = rows[:count].copy()
+        del rows
+
+        if struct.unpack_from(ResultsLayout._SEQ_FORMAT, buf, offset)[0] != seq:
+            return None  # Слот перезаписан во время копирования
+        return fid, ts, frame_ms, points
+
+    def close(self):
+        if self.shm:
+            try:
+                self.shm.close()
+            except Exception as e:
+                logger.warning(f"Error closing SHM handle: {e}")
+
+            if self.is_owner:
+                try:
+                    self.shm.unlink()
+                    logger.info(f"🗑️ SHM Unlinked: {self.name}")
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error unlinking SHM: {e}")
+
+            self.shm = None
+            if self.notifier:
+                self.notifier.close()
+            self.notifier = None
+
+
 class SharedMemoryManager:
     """
     Менеджер разделяемой памяти (RAII Wrapper).
     Отвечает за создание, подключение и очистку ресурсов.
+    Рядом с видеокольцом живет кольцо результатов (<name>_res) с тем же временем жизни.
     """
+    RESULTS_SUFFIX = "_res"
 
     def __init__(
             self,
@@ -121,6 +872,7 @@ class SharedMemoryManager:
         self.name = config.name
         self.shape = config.shape
         self.dtype = config.dtype
+        self.pixel_format = config.pixel_format
 
         # Берем capacity из настроек, если это создание, иначе прочитаем из памяти
         self.capacity = settings.SHM_BUFFER_COUNT
@@ -132,16 +884,23 @@ class SharedMemoryManager:
         self.size = RingBufferLayout.calc_total_size(self.shape, self.dtype, self.capacity)
 
         self.shm: Optional[shared_memory.SharedMemory] = None
+        # "Кадр готов" для читателей (futex слово в глобальном заголовке)
+        self.notifier: Optional[FrameNotifier] = None
+
+        # Кольцо результатов (точки + метрики кадра)
+        self.results_name = f"{self.name}{self.RESULTS_SUFFIX}"
+        self.results: Optional[ResultsMemoryManager] = None
 
         # Ссылки на форматы для рекордера (чтобы не дублировать)
         self.HEADER_FORMAT = VideoFrameLayout._HEADER_FORMAT
-        # Для точек пока используем простой формат (в будущем Protobuf)
-        self.POINT_FORMAT = 'idd'  # int id, double x, double y
+        # Точки пишутся в файл тем же бинарным layout, что и в SHM
+        self.POINT_DTYPE = KEYPOINT_DTYPE
 
         if self.is_owner:
             self._allocate()
         else:
             self._attach()
+        self.notifier = FrameNotifier(self.shm, RingBufferLayout.NOTIFY_OFFSET, owner=self.is_owner)
 
     def _allocate(self):
         # 1. Попытка очистки мусора от старых запусков
@@ -156,9 +915,13 @@ class SharedMemoryManager:
         # 2. Создание новой памяти
         try:
             self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=self.size)
+            # THP / prefault / mlock — до заголовка (prefault пишет нули в каждую страницу)
+            _warm_up_segment(self.shm, self.name)
             # Инициализируем заголовок (index=0, capacity=settings)
             RingBufferLayout.init_header(self.shm.buf, self.capacity)
             logger.info(f"💾 SecureSHM Created: {self.name} | {self.size / 1024 / 1024:.2f} MB | {self.capacity} slots")
+
+            self.results = ResultsMemoryManager(self.results_name, create=True)
         except Exception as e:
             logger.critical(f"Failed to create SHM {self.name}: {e}")
             raise
@@ -168,31 +931,183 @@ class SharedMemoryManager:
             self.shm = shared_memory.SharedMemory(name=self.name, create=False)
             # Читаем реальную емкость из заголовка
             self.capacity = RingBufferLayout.get_capacity(self.shm.buf)
-            # Пересчитываем размер слота (на случай если конфиг отличается)
-            # (В продакшене тут нужна проверка версий)
+            self.size = RingBufferLayout.calc_total_size(self.shape, self.dtype, self.capacity)
+            self._check_layout()
             logger.debug(f"🔗 Attached to SHM: {self.name}")
         except FileNotFoundError:
             logger.error(f"❌ SHM {self.name} not found.")
             raise
+        except ValueError:
+            self.shm.close()
+            self.shm = None
+            raise
+
+        # Результатов может не быть (старый воркер / replay) -> работаем только с видео
+        try:
+            self.results = ResultsMemoryManager(self.results_name, create=False)
+        except FileNotFoundError:
+            self.results = None
+
+    def _check_layout(self):
+        """
+        [FIX] Читатель пришел со своими shape/dtype (из реестра или из настроек) — сверяем с кольцом.
+        Заголовок кольца формат кадра не хранит: сверяем размер сегмента и запись реестра
+        (ловит и кадры с тем же числом байт, но другой формы). Несовпадение -> ValueError.
+        """
+        if self.shm.size != self.size:
+            raise ValueError(f"SHM {self.name}: {self.shm.size} bytes, expected {self.size} "
+                             f"for shape {tuple(self.shape)} {self.dtype} x{self.capacity}")
+
+        registry = ShmRegistry.attach()
+        if registry is None:
+            return
+        try:
+            entry = next((e for e in registry.entries() if e.name == self.name), None)
+        finally:
+            registry.close()
+        if entry is not None and (tuple(entry.shape) != tuple(self.shape) or entry.dtype != self.dtype):
+            raise ValueError(f"SHM {self.name}: registry says {tuple(entry.shape)} {entry.dtype}, "
+                             f"reader expects {tuple(self.shape)} {self.dtype}")
+
+    def open_slot(self, slot_index: int) -> Optional[SlotView]:
+        """
+        Открывает Zero-Copy view слота под seqlock.
+        Возвращает None, если писатель сейчас внутри слота или слот пуст.
+        """
+        if not self.shm: return None
+
+        slot_view = RingBufferLayout.get_slot_view(self.shm.buf, slot_index, self.slot_size)
+        seq = VideoFrameLayout.read_begin(slot_view)
+        if seq <= 0:
+            # -1: идет запись, 0: в слот еще ни разу не писали
+            return None
+
+        fid, ts, salt, flags, img = VideoFrameLayout.parse_from_buf(slot_view, self.shape, self.dtype)
+        view = SlotView(slot_view, slot_index, seq, fid, ts, salt, flags, img, manager=self)
+
+        # Заголовок мог поменяться между read_begin и parse -> сразу отсекаем
+        # frame_id < 0: захват в этот слот сорвался, данных нет
+        if fid < 0 or not view.is_valid():
+            view.release()
+            return None
+        return view
+
+    # --- Аренда слотов ---
+    # Lock-free и без атомиков: аренда — best-effort подсказка писателю.
+    # Окончательная проверка кадра по-прежнему SlotView.is_valid() (seqlock).
+    # Несколько читателей одного слота: срок = максимум, снимает аренду только тот,
+    # чей срок записан последним (остальные дотягивают до своего is_valid()).
+
+    def pin_slot(self, slot_index: int, timeout: Optional[float] = None) -> int:
+        """
+        Арендует слот, возвращает записанный срок (ns) — нужен для unpin_slot
+        (0 — слот уже под более длинной чужой арендой, снимать нечего).
+        timeout=LEASE_FOREVER — до явного unpin_slot (кадр в конвейере процессора).
+        """
+        if not self.shm: return 0
+        if timeout == LEASE_FOREVER:
+            deadline = LEASE_FOREVER
+        else:
+            timeout = settings.SHM_LEASE_TIMEOUT if timeout is None else timeout
+            deadline = time.monotonic_ns() + int(timeout * 1e9)
+        current = RingBufferLayout.get_lease(self.shm.buf, slot_index)
+        if current > deadline:
+            # [FIX] Слот уже арендован дольше (другим читателем / конвейером): чужую аренду
+            # не присваиваем, иначе наш unpin_slot снимет ее раньше срока
+            return 0
+        RingBufferLayout.set_lease(self.shm.buf, slot_index, deadline)
+        return deadline
+
+    def unpin_slot(self, slot_index: int, deadline: int):
+        if not self.shm: return
+        # Чужую (более длинную) аренду не трогаем
+        if RingBufferLayout.get_lease(self.shm.buf, slot_index) == deadline:
+            RingBufferLayout.set_lease(self.shm.buf, slot_index, 0)
+
+    def next_write_slot(self) -> int:
+        """
+        Сторона писателя: следующий слот для записи, пропуская арендованные.
+        Голову (последний опубликованный кадр) не трогаем никогда.
+        Если арендовано все — пишем в обычный следующий слот (аренда срывается,
+        читатель увидит это через is_valid()).
+        """
+        buf = self.shm.buf
+        head_idx = RingBufferLayout.get_write_index(buf)
+        now = time.monotonic_ns()
+        skipped = expired = 0
+        chosen = None
+
+        for step in range(1, self.capacity):
+            idx = (head_idx + step) % self.capacity
+            deadline = RingBufferLayout.get_lease(buf, idx)
+            if deadline:
+                if deadline > now:
+                    skipped += 1
+                    continue
+                # Читатель завис / умер, не отпустив слот
+                RingBufferLayout.set_lease(buf, idx, 0)
+                expired += 1
+            chosen = idx
+            break
+
+        if skipped or expired:
+            RingBufferLayout.add_stats(buf, skipped, expired)
+        return chosen if chosen is not None else (head_idx + 1) % self.capacity
+
+    def lease_stats(self) -> Dict[str, int]:
+        """Счетчики писателя для мониторинга (heartbeat)"""
+        if not self.shm: return {"skipped": 0, "lease_expired": 0}
+        skipped, expired = RingBufferLayout.get_stats(self.shm.buf)
+        return {"skipped": skipped, "lease_expired": expired}
+
+    def publish(self, slot_index: int):
+        """Сторона писателя: делает слот головой кольца и будит ждущих читателей"""
+        RingBufferLayout.update_write_index(self.shm.buf, slot_index)
+        self.notifier.notify()
+
+    def read_latest(self) -> Optional[SlotView]:
+        """
+        Последний записанный кадр (без копирования).
+        После использования view.image проверить view.is_valid().
+        """
+        if not self.shm: return None
+        head_idx = RingBufferLayout.get_write_index(self.shm.buf)
+        return self.open_slot(head_idx)
+
+    def cursor(self, after_frame_id: int = -1) -> FrameCursor:
+        """Новый независимый курсор читателя"""
+        return FrameCursor(self, after_frame_id)
+
+    def read_results(self, frame_id: int, timeout: float = 0.0) -> Optional[np.ndarray]:
+        """
+        Точки кадра (structured array KEYPOINT_DTYPE) или None, если их нет в кольце.
+        timeout > 0: подождать, пока Processor допишет результат этого кадра.
+        """
+        if not self.results: return None
+        res = self.results.read(frame_id, timeout)
+        return res[3] if res else None
 
-    def read_frame(self) -> Optional[Tuple[int, float, list]]:
+    def read_frame(self) -> Optional[Tuple[int, float, Any]]:
         """
         Метод для чтения последнего кадра (для Recorder/UI).
-        Возвращает (frame_id, timestamp, dummy_points_placeholder).
-        В будущем здесь будет чтение реальных точек.
+        Возвращает (frame_id, timestamp, points).
+        points — structured array KEYPOINT_DTYPE (пустой, если кадр еще не обработан).
         """
         if not self.shm: return None
 
         try:
-            head_idx = RingBufferLayout.get_write_index(self.shm.buf)
-            slot_view = RingBufferLayout.get_slot_view(self.shm.buf, head_idx, self.slot_size)
-
-            # Парсим заголовок и картинку (картинка нам тут не нужна, только метаданные для теста)
-            fid, ts, salt, flags, img = VideoFrameLayout.parse_from_buf(slot_view, self.shape, self.dtype)
+            # Картинка нам тут не нужна, только согласованные метаданные
+            # (open_slot уже проверил seqlock после разбора заголовка)
+            view = self.read_latest()
+            if view is None:
+                return None
+            fid, ts = view.frame_id, view.timestamp
+            view.release()
 
-            # TODO: Чтение точек пока заглушено, возвращаем пустой список
-            # В реальной системе точки лежат в EventBus или отдельной SHM области
-            return fid, ts, []
+            points = self.read_results(fid)
+            if points is None:
+                points = np.empty(0, dtype=KEYPOINT_DTYPE)
+            return fid, ts, points
 
         except Exception as e:
             logger.warning(f"Read error: {e}")
@@ -200,6 +1115,13 @@ class SharedMemoryManager:
 
     def close(self):
         """Корректное закрытие ресурсов"""
+        if self.notifier:
+            self.notifier.close()
+        self.notifier = None
+        if self.results:
+            self.results.close()
+            self.results = None
+
         if self.shm:
             try:
                 self.shm.close()
@@ -221,4 +1143,222 @@ class SharedMemoryManager:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
\ No newline at end of file
+        self.close()
+
+class RegistryLayout:
+    """
+    Реестр всех живых колец камер (один сегмент с известным именем).
+    Structure:
+    [ Global Header (16 bytes) | Entry 0 | Entry 1 | ... ]
+
+    Global Header ('IIII'): magic, version, capacity, reserved
+    Entry: [ Seq (8b) | Body (_ENTRY_FORMAT) | pad до cache line ]
+      - i: camera_id        - I: active
+      - Q: generation       - q: session_id
+      - I: capacity         - I: layout_version (VideoFrameLayout.LAYOUT_VERSION)
+      - I + 4I: ndim, shape - 8s: dtype, 8s: pixel_format
+      - 64s: name, 64s: results_name
+
+    Запись камеры лежит в слоте camera_id % capacity и защищена своим seqlock.
+    """
+    MAGIC = 0x52534642  # 'BFSR'
+    VERSION = 1
+    MAX_DIMS = 4
+    _GLOBAL_HEADER_FMT = 'IIII'
+    GLOBAL_HEADER_SIZE = _align_up(struct.calcsize(_GLOBAL_HEADER_FMT), CACHE_LINE)
+    _SEQ_FORMAT = 'Q'
+    SEQ_SIZE = struct.calcsize(_SEQ_FORMAT)
+    _ENTRY_FORMAT = 'iIQqIII4I8s8s64s64s'
+    ENTRY_SIZE = _align_up(SEQ_SIZE + struct.calcsize(_ENTRY_FORMAT), CACHE_LINE)
+    # Смещение generation внутри записи (для быстрого peek)
+    _GENERATION_OFFSET = SEQ_SIZE + struct.calcsize('iI')
+
+    @classmethod
+    def calc_total_size(cls, capacity: int) -> int:
+        return cls.GLOBAL_HEADER_SIZE + cls.ENTRY_SIZE * capacity
+
+    @classmethod
+    def init_header(cls, shm_buf: memoryview, capacity: int):
+        struct.pack_into(cls._GLOBAL_HEADER_FMT, shm_buf, 0, cls.MAGIC, cls.VERSION, capacity, 0)
+
+    @classmethod
+    def read_header(cls, shm_buf: memoryview) -> Tuple[int, int, int]:
+        """(magic, version, capacity)"""
+        magic, version, capacity, _ = struct.unpack_from(cls._GLOBAL_HEADER_FMT, shm_buf, 0)
+        return magic, version, capacity
+
+    @classmethod
+    def get_entry_offset(cls, index: int) -> int:
+        return cls.GLOBAL_HEADER_SIZE + index * cls.ENTRY_SIZE
+
+
+class ShmRegistry:
+    """
+    RAII обертка над реестром SHM (settings.SHM_REGISTRY_NAME).
+    Владелец — оркестратор (create=True). Воркер публикует свое кольцо (publish),
+    API / Recorder / Replay / Fusion подключаются по camera_id (lookup) и
+    ловят hot-swap сравнением generation — без очередей и угадывания имен.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False, capacity: Optional[int] = None):
+        self.name = name or settings.SHM_REGISTRY_NAME
+        self.is_owner = create
+        self.capacity = capacity or settings.SHM_REGISTRY_SLOTS
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+        if self.is_owner:
+            self._allocate()
+        else:
+            self._attach()
+
+    @classmethod
+    def attach(cls, name: Optional[str] = None) -> Optional['ShmRegistry']:
+        """Подключение без исключений: None, если реестра нет (оркестратор не запущен)"""
+        try:
+            return cls(name=name, create=False)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _allocate(self):
+        try:
+            temp = shared_memory.SharedMemory(name=self.name)
+            temp.unlink()
+            temp.close()
+            logger.warning(f"🧹 Cleaned up stale SHM: {self.name}")
+        except FileNotFoundError:
+            pass
+
+        size = RegistryLayout.calc_total_size(self.capacity)
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        RegistryLayout.init_header(self.shm.buf, self.capacity)
+        logger.info(f"📇 SHM Registry Created: {self.name} | {self.capacity} entries")
+
+    def _attach(self):
+        self.shm = shared_memory.SharedMemory(name=self.name, create=False)
+        magic, version, capacity = RegistryLayout.read_header(self.shm.buf)
+        if magic != RegistryLayout.MAGIC or version != RegistryLayout.VERSION:
+            self.shm.close()
+            self.shm = None
+            raise ValueError(f"SHM Registry {self.name}: unsupported layout (magic={magic:#x}, v{version})")
+        self.capacity = capacity
+        logger.debug(f"🔗 Attached to SHM Registry: {self.name}")
+
+    def _read_entry(self, camera_id: int) -> Optional[tuple]:
+        if not self.shm: return None
+        buf = self.shm.buf
+        offset = RegistryLayout.get_entry_offset(camera_id % self.capacity)
+        for _ in range(3):
+            seq = struct.unpack_from(RegistryLayout._SEQ_FORMAT, buf, offset)[0]
+            if seq == 0:
+                return None  # Камера ни разу не публиковалась
+            if seq & 1:
+                time.sleep(0)
+                continue
+            fields = struct.unpack_from(RegistryLayout._ENTRY_FORMAT, buf, offset + RegistryLayout.SEQ_SIZE)
+            if struct.unpack_from(RegistryLayout._SEQ_FORMAT, buf, offset)[0] == seq:
+                return fields
+        return None
+
+    def _write_entry(self, camera_id: int, fields: tuple):
+        buf = self.shm.buf
+        offset = RegistryLayout.get_entry_offset(camera_id % self.capacity)
+        seq = struct.unpack_from(RegistryLayout._SEQ_FORMAT, buf, offset)[0] | 1
+        struct.pack_into(RegistryLayout._SEQ_FORMAT, buf, offset, seq)
+        try:
+            struct.pack_into(RegistryLayout._ENTRY_FORMAT, buf, offset + RegistryLayout.SEQ_SIZE, *fields)
+        finally:
+            struct.pack_into(RegistryLayout._SEQ_FORMAT, buf, offset, seq + 1)
+
+    # --- Writer (воркер / оркестратор) ---
+
+    def publish(self, camera_id: int, mgr: 'SharedMemoryManager', session_id: int) -> int:
+        """Публикует кольцо камеры. Возвращает новую generation."""
+        if not self.shm: return 0
+        shape = tuple(mgr.shape)
+        if len(shape) > RegistryLayout.MAX_DIMS:
+            raise ValueError(f"Shape {shape} has more than {RegistryLayout.MAX_DIMS} dims")
+
+        generation = self.generation(camera_id) + 1
+        dims = shape + (0,) * (RegistryLayout.MAX_DIMS - len(shape))
+        self._write_entry(camera_id, (
+            camera_id, 1, generation, session_id, mgr.capacity,
+            VideoFrameLayout.LAYOUT_VERSION, len(shape), *dims,
+            str(mgr.dtype).encode(), mgr.pixel_format.value.encode(),
+            mgr.name.encode(), (mgr.results_name if mgr.results else "").encode()
+        ))
+        logger.info(f"📇 Registry: Cam {camera_id} -> {mgr.name} (gen {generation})")
+        return generation
+
+    def withdraw(self, camera_id: int):
+        """Снимает кольцо камеры с публикации (воркер остановлен). generation растет."""
+        fields = self._read_entry(camera_id)
+        if fields is None or not fields[1]:
+            return
+        fields = list(fields)
+        fields[1] = 0
+        fields[2] += 1
+        self._write_entry(camera_id, tuple(fields))
+
+    # --- Readers ---
+
+    def generation(self, camera_id: int) -> int:
+        """Быстрый peek generation (для поллинга hot-swap в горячем цикле)"""
+        if not self.shm: return 0
+        offset = RegistryLayout.get_entry_offset(camera_id % self.capacity)
+        return struct.unpack_from('Q', self.shm.buf, offset + RegistryLayout._GENERATION_OFFSET)[0]
+
+    def lookup(self, camera_id: int) -> Optional[ShmRegistryEntry]:
+        """Актуальная запись камеры или None, если кольцо не опубликовано"""
+        fields = self._read_entry(camera_id)
+        if fields is None or fields[0] != camera_id:
+            return None  # Не опубликовано / слот занят другой камерой (camera_id % capacity)
+        return self._to_entry(fields)
+
+    def entries(self) -> List[ShmRegistryEntry]:
+        """Все опубликованные (active) кольца"""
+        # [FIX] Идем по слотам и берем camera_id из записи: lookup(idx) терял
+        # камеры, у которых camera_id != номеру слота (camera_id % capacity)
+        found = []
+        for idx in range(self.capacity):
+            fields = self._read_entry(idx)
+            if fields is not None and fields[1]:
+                found.append(self._to_entry(fields))
+        return found
+
+    @staticmethod
+    def _to_entry(fields: tuple) -> ShmRegistryEntry:
+        (cid, active, generation, session_id, capacity, layout_version,
+         ndim, d0, d1, d2, d3, dtype, pixel_format, name, results_name) = fields
+        return ShmRegistryEntry(
+            camera_id=cid, active=bool(active), generation=generation,
+            session_id=session_id, capacity=capacity, layout_version=layout_version,
+            shape=(d0, d1, d2, d3)[:ndim],
+            dtype=dtype.rstrip(b"\0").decode(),
+            pixel_format=PixelFormat(pixel_format.rstrip(b"\0").decode()),
+            name=name.rstrip(b"\0").decode(),
+            results_name=results_name.rstrip(b"\0").decode(),
+        )
+
+    def close(self):
+        if self.shm:
+            try:
+                self.shm.close()
+            except Exception as e:
+                logger.warning(f"Error closing SHM handle: {e}")
+
+            if self.is_owner:
+                try:
+                    self.shm.unlink()
+                    logger.info(f"🗑️ SHM Unlinked: {self.name}")
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error unlinking SHM: {e}")
+
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
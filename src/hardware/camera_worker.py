@@ -1,5 +1,6 @@
 import time
 import signal
+import functools
 import os
 import queue
 import cv2
@@ -9,19 +10,80 @@ from loguru import logger as log
 
 # Core
 from src.core.processor import Processor
+from src.core.profiler import SamplingProfiler
 from src.core.event_bus import EventBus
 from src.core.config import settings
 from src.core.device_manager import device_manager
 
 # Data & Memory
-from src.data.models import SharedMemoryConfig
-from src.data.shared_memory import SharedMemoryManager, VideoFrameLayout, RingBufferLayout
+from src.data.models import SharedMemoryConfig, PixelFormat
+from src.data.pixels import convert_bgr_into
+from src.data.shared_memory import SharedMemoryManager, VideoFrameLayout, RingBufferLayout, ShmRegistry, LEASE_FOREVER
 from src.data.schemas import CameraConfig, PluginCommand
 
 # Hardware
 from src.hardware.webcam import Webcam
 
 
+def _ack_command(bus: EventBus, camera_id: int, pkt: dict, t_received: float,
+                 ok: bool, result=None, error: str = None, coalesced: int = 1):
+    """Подтверждение команды, пришедшей через EventBus.request (без request_id — молча)"""
+    if not isinstance(pkt, dict) or not pkt.get("request_id"):
+        return
+    bus.publish_ack({
+        "request_id": pkt["request_id"],
+        "camera_id": camera_id,
+        "ok": ok,
+        "result": result,
+        "error": error,
+        "coalesced": coalesced,
+        "t_received": t_received,
+        "t_applied": time.perf_counter(),
+    })
+
+
+def _apply_config_run(bus: EventBus, camera_id: int, webcam: Webcam, current_config: CameraConfig,
+                      run: list) -> CameraConfig:
+    """
+    Применяет подряд идущие SET_CONFIG одним вызовом (пачка движений слайдера -> одно применение).
+    run: [(pkt, t_received, args)]. Возвращает новый конфиг (при ошибке — прежний).
+    """
+    updates = {}
+    for _, _, args in run:
+        updates.update(args)
+
+    ok, result, error = True, None, None
+    try:
+        cfg_dict = current_config.model_dump()
+        cfg_dict.update(updates)
+        new_config = CameraConfig(**cfg_dict)
+        webcam.apply_config(new_config)
+        current_config = new_config
+        applied = current_config.model_dump()
+        result = {k: applied[k] for k in updates if k in applied}
+        log.info(f"⚙️ Config Updated: {updates}")
+    except Exception as e:
+        ok, error = False, str(e)
+        log.error(f"SET_CONFIG failed: {e}")
+
+    bus.telemetry.on_command("coalesced", len(run) - 1)
+    for pkt, t_received, _ in run:
+        _ack_command(bus, camera_id, pkt, t_received, ok, result, error, coalesced=len(run))
+    return current_config
+
+
+def _frame_done(shm: SharedMemoryManager, frame_id: int, ts: float, slot_index, lease: int,
+                ctx, frame_ms: float):
+    """Кадр обработан: точки -> SHM результатов (без сериализации для API/Recorder/Fusion), слот свободен"""
+    if shm.results:
+        try:
+            shm.results.write(frame_id, ts, ctx.get_data("vision", "keypoints", []), frame_ms)
+        except Exception as e:
+            log.error(f"Results SHM write error: {e}")
+    if slot_index is not None:
+        shm.unpin_slot(slot_index, lease)
+
+
 # [FIX] Добавил device_index=None в аргументы
 def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: EventBus, device_index: int = None):
     """
@@ -44,7 +106,9 @@ def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: Event
 
     webcam = None
     shm = None
+    registry = None
     processor = None
+    profiler = None
 
     # === 1. Resolve Profile & Hardware ===
     camera_profile = None
@@ -110,32 +174,46 @@ def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: Event
     session_id = int(time.time())
     unique_shm_name = f"{shm_config.name}_{session_id}"
 
+    # Формат слота: профиль камеры -> глобальная настройка (GRAY8 для маркеров)
+    pixel_format = (camera_profile.pixel_format if camera_profile and camera_profile.pixel_format
+                    else settings.SHM_PIXEL_FORMAT)
+    frame_shape = pixel_format.frame_shape(real_h, real_w)
+
     # Recalculate size
-    frame_size_bytes = real_w * real_h * 3
+    frame_size_bytes = int(np.prod(frame_shape))
     total_shm_size = frame_size_bytes * settings.SHM_BUFFER_COUNT
 
-    log.info(f"📏 Hardware Resolution: {real_w}x{real_h}. Re-allocating SHM to {total_shm_size / 1024 / 1024:.2f} MB")
+    log.info(f"📏 Hardware Resolution: {real_w}x{real_h} ({pixel_format.value}). "
+             f"Re-allocating SHM to {total_shm_size / 1024 / 1024:.2f} MB")
 
     try:
+        shm_update = {
+            "name": unique_shm_name, "shape": frame_shape, "size": total_shm_size,
+            "pixel_format": pixel_format
+        }
         try:
-            current_shm_config = shm_config.model_copy(update={
-                "name": unique_shm_name, "shape": (real_h, real_w, 3), "size": total_shm_size
-            })
+            current_shm_config = shm_config.model_copy(update=shm_update)
         except AttributeError:
-            current_shm_config = shm_config.copy(update={
-                "name": unique_shm_name, "shape": (real_h, real_w, 3), "size": total_shm_size
-            })
+            current_shm_config = shm_config.copy(update=shm_update)
 
         shm = SharedMemoryManager(config=current_shm_config, create=True)
         shm_buf = shm.shm.buf
 
-        # Handshake
+        # Реестр: API / Recorder / Fusion найдут кольцо по camera_id (без handshake)
+        registry = ShmRegistry.attach()
+        if registry:
+            registry.publish(camera_id, shm, session_id)
+        else:
+            log.warning("⚠️ SHM Registry not found. Readers will rely on handshake only.")
+
+        # Handshake (для фронтенда: роль, формат кадра)
         bus.publish_critical({
             "type": "shm_handshake",
             "payload": {
                 "camera_id": camera_id, "role": current_role,
                 "shm_name": unique_shm_name, "shape": current_shm_config.shape,
-                "dtype": current_shm_config.dtype
+                "dtype": current_shm_config.dtype, "results_name": shm.results_name,
+                "pixel_format": pixel_format.value
             }
         })
 
@@ -146,7 +224,8 @@ def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: Event
 
     # === 4. Processor & Calibration ===
     try:
-        processor = Processor(bus, camera_id)
+        processor = Processor(bus, camera_id, pixel_format=pixel_format)
+        profiler = SamplingProfiler(camera_id)
         current_config = CameraConfig(camera_id=camera_id)
 
         if camera_profile and camera_profile.calibration_file:
@@ -164,78 +243,147 @@ def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: Event
 
     except Exception as e:
         log.critical(f"❌ Processor/Config Error: {e}")
+        if registry:
+            registry.withdraw(camera_id)
+            registry.close()
         if shm: shm.close()
         webcam.release()
         return
 
     # === 5. Main Loop ===
     frame_idx = int(time.time() * 1000)
-    queue_cmd = bus._command_queues.get(camera_id)
     math_salt = 1.0
     last_heartbeat = time.time()
 
+    # Камера всегда отдает BGR. Для GRAY8/YUYV захватываем в один переиспользуемый
+    # буфер и конвертируем прямо в слот (BGR идет в слот без промежуточных копий).
+    capture_buf = None
+    if pixel_format is not PixelFormat.BGR:
+        capture_buf = np.empty((real_h, real_w, 3), dtype=np.uint8)
+
     log.success(f"🎥 Worker-{camera_id} Running at {TARGET_W}x{TARGET_H}. Salt Protected.")
 
     try:
         while should_run:
             # --- Command Handling ---
-            if queue_cmd:
-                while not queue_cmd.empty():
-                    try:
-                        pkt = queue_cmd.get_nowait()
-                        if isinstance(pkt, dict):
-                            cmd = pkt.get("cmd") or pkt.get("payload", {}).get("cmd")
-                            args = pkt.get("args") or pkt.get("payload", {}).get("args", {})
-                            target = pkt.get("target")
-                        else:
-                            cmd = getattr(pkt, "cmd", None)
-                            args = getattr(pkt, "args", {})
-                            target = getattr(pkt, "target", None)
-
-                        if cmd == "SET_SALT":
-                            math_salt = float(args.get("salt", 1.0))
-
-                        elif cmd == "SET_CONFIG":
-                            cfg_dict = current_config.model_dump()
-                            cfg_dict.update(args)
-                            current_config = CameraConfig(**cfg_dict)
-                            webcam.apply_config(current_config)
-                            log.info(f"⚙️ Config Updated: {args}")
-
-                        elif processor:
-                            plugin_cmd = PluginCommand(target=target or "broadcast", cmd=cmd, args=args)
-                            processor.handle_command(plugin_cmd)
-
-                    except queue.Empty:
-                        break
-
-            # --- Capture ---
-            ret, frame = webcam.read_frame()
-            if not ret or frame is None:
+            # [FIX] Команды строго в порядке поступления; склеиваются только
+            # ПОДРЯД идущие SET_CONFIG (применяются перед следующей командой)
+            config_run = []
+            for pkt in bus.take_commands(camera_id):
+                t_received = time.perf_counter()
+                if isinstance(pkt, dict):
+                    cmd = pkt.get("cmd") or pkt.get("payload", {}).get("cmd")
+                    args = pkt.get("args") or pkt.get("payload", {}).get("args", {})
+                    target = pkt.get("target")
+                else:
+                    cmd = getattr(pkt, "cmd", None)
+                    args = getattr(pkt, "args", {})
+                    target = getattr(pkt, "target", None)
+
+                if cmd == "SET_CONFIG":
+                    config_run.append((pkt, t_received, args))
+                    continue
+                if config_run:
+                    current_config = _apply_config_run(bus, camera_id, webcam, current_config, config_run)
+                    config_run = []
+
+                try:
+                    result = None
+                    if cmd == "SET_SALT":
+                        math_salt = float(args.get("salt", 1.0))
+                        result = {"salt": math_salt}
+
+                    elif cmd == "REQUEST_KEYFRAME":
+                        # Без drain: флаг подхватит ближайший публикуемый кадр
+                        if processor:
+                            processor.request_keyframe()
+
+                    elif cmd == "PROFILE_START":
+                        # args: frames / seconds (автостоп), interval_ms
+                        result = profiler.start(args.get("frames"), args.get("seconds"),
+                                                args.get("interval_ms"))
+
+                    elif cmd == "PROFILE_STOP":
+                        # Отчет: сессия (папка в data/profiles), сэмплы и топ функций по стадиям
+                        result = profiler.stop()
+
+                    elif cmd == "RELOAD_PLUGINS":
+                        # Отчет (что заменено, сколько мс) уходит в ack
+                        if processor:
+                            result = processor.reload_plugins(args.get("modules"))
+
+                    elif processor:
+                        plugin_cmd = PluginCommand(target=target or "broadcast", cmd=cmd, args=args)
+                        processor.handle_command(plugin_cmd)
+
+                    _ack_command(bus, camera_id, pkt, t_received, True, result)
+                except Exception as e:
+                    log.error(f"Command '{cmd}' failed: {e}")
+                    _ack_command(bus, camera_id, pkt, t_received, False, error=str(e))
+
+            if config_run:
+                current_config = _apply_config_run(bus, camera_id, webcam, current_config, config_run)
+
+            # --- Capture (прямо в слот SHM, без промежуточного кадра и memcpy) ---
+            ret = False
+            t_capture = None
+            if capture_buf is not None:
+                # Ждем кадр ДО выбора слота: seqlock держим только на время конвертации,
+                # а аренды читателей проверяем прямо перед записью
+                ret, _ = webcam.read_frame(out=capture_buf)
+                t_capture = time.perf_counter()
+
+            # Следующий слот, пропуская арендованные читателями (см. SlotView.pin)
+            next_idx = shm.next_write_slot()
+            slot_view = RingBufferLayout.get_slot_view(shm_buf, next_idx, shm.slot_size)
+            frame = VideoFrameLayout.get_pixel_view(slot_view, shm.shape, shm.dtype)
+
+            seq = VideoFrameLayout.begin_write(slot_view)
+            try:
+                if capture_buf is None:
+                    ret, _ = webcam.read_frame(out=frame)
+                elif ret:
+                    convert_bgr_into(capture_buf, frame, pixel_format)
+                ts = time.perf_counter()
+                # frame_id = -1 помечает слот пустым, если захват сорвался
+                VideoFrameLayout.write_header(slot_view, frame_idx if ret else -1, ts, math_salt, 0)
+            except Exception as e:
+                log.error(f"Capture Error: {e}")
+                VideoFrameLayout.write_header(slot_view, -1, 0.0, math_salt, 0)
+            finally:
+                VideoFrameLayout.end_write(slot_view, seq)
+
+            if not ret:
+                del frame, slot_view
                 time.sleep(0.005)
                 continue
 
-            ts = time.perf_counter()
+            # Голова кольца + wakeup ждущих читателей (API, Recorder)
+            shm.publish(next_idx)
+            # Начало сквозной трассы кадра: захват и публикация в SHM (дальше отмечает Processor)
+            trace = [t_capture or ts, time.perf_counter()]
 
-            if frame.shape[1] != TARGET_W or frame.shape[0] != TARGET_H:
-                frame = cv2.resize(frame, (TARGET_W, TARGET_H))
-
-            # --- Write SHM ---
-            slot_view = None
+            # --- Process ---
+            # Процессор работает прямо на слоте. Кадр уже опубликован читателям,
+            # поэтому он read-only: плагины не должны рисовать поверх SHM.
+            frame.flags.writeable = False
             try:
-                head_idx = RingBufferLayout.get_write_index(shm_buf)
-                next_idx = (head_idx + 1) % shm.capacity
-                slot_view = RingBufferLayout.get_slot_view(shm_buf, next_idx, shm.slot_size)
-
-                VideoFrameLayout.write_to_buf(slot_view, frame, frame_idx, ts, math_salt, 0)
-                RingBufferLayout.update_write_index(shm_buf, next_idx)
-            except:
-                pass
+                if processor.pipelined:
+                    # Конвейер: стадии считают кадр в пуле, а мы идем за следующим.
+                    # Слот арендуем, пока кадр в работе, — писатель его обойдет.
+                    # [FIX] Бессрочно до on_done: стадии могут читать слот дольше SHM_LEASE_TIMEOUT.
+                    # В работе не больше PIPELINE_DEPTH кадров, так что свободные слоты остаются.
+                    lease = shm.pin_slot(next_idx, timeout=LEASE_FOREVER)
+                    processor.submit_frame(frame, frame_idx, current_config, on_done=functools.partial(
+                        _frame_done, shm, frame_idx, ts, next_idx, lease), trace=trace)
+                else:
+                    t_proc = time.perf_counter()
+                    ctx = processor.process_frame(frame, frame_idx, current_config, trace=trace)
+                    frame_ms = (time.perf_counter() - t_proc) * 1000
+                    _frame_done(shm, frame_idx, ts, None, 0, ctx, frame_ms)
+                    del ctx
             finally:
-                if slot_view is not None: del slot_view
-
-            # --- Process ---
-            processor.process_frame(frame, frame_idx, current_config)
+                del frame, slot_view
 
             # --- Heartbeat ---
             if time.time() - last_heartbeat > 1.0:
@@ -243,17 +391,40 @@ def run_camera_worker(camera_id: int, shm_config: SharedMemoryConfig, bus: Event
                     "camera_id": camera_id,
                     "role": current_role,
                     "sn": target_serial,
-                    "config": current_config.model_dump()
+                    "config": current_config.model_dump(),
+                    # Аренды слотов: сколько раз писатель обходил занятый слот / снимал зависшую аренду
+                    "shm": shm.lease_stats(),
+                    # Счетчики шины этого процесса (очереди, потери, задержка put)
+                    "bus": bus.telemetry.snapshot(),
+                    # Задержки стадий с прошлого heartbeat (оркестратор копит скользящие окна)
+                    "perf": processor.take_latency_delta()
                 })
                 last_heartbeat = time.time()
 
+            # --- Профайлер (автостоп по кадрам / времени) ---
+            profiler.on_frame()
+
+            # --- Hot-reload плагинов (settings.PLUGIN_HOT_RELOAD) ---
+            processor.watch_plugins(time.time())
+
             frame_idx += 1
 
     except Exception as e:
         log.critical(f"Worker Crash: {e}")
     finally:
         log.info(f"🛑 CameraWorker-{camera_id} cleanup...")
+        # Кадры в конвейере держат view слотов SHM: сначала доводим их до конца
+        if profiler:
+            profiler.stop()  # Незаконченная сессия все равно сохраняется
+        if processor:
+            processor.close()
         if webcam: webcam.release()
+        if registry:
+            try:
+                registry.withdraw(camera_id)
+                registry.close()
+            except:
+                pass
         if shm:
             try:
                 shm.close()
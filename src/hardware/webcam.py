@@ -77,10 +77,41 @@ class Webcam:
 
         return True
 
-    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+    def read_frame(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Захват кадра.
+        out: готовый массив (например, view слота SHM). Драйвер декодирует прямо в него,
+        без промежуточного ndarray и копирования.
+        """
         if not self._is_connected or self._cap is None:
             return False, None
-        return self._cap.read()
+        if out is None:
+            return self._cap.read()
+
+        ret, frame = self._cap.read(out)
+        if not ret or frame is None:
+            return False, None
+
+        # OpenCV переаллоцирует буфер, если формат кадра не совпал с out (смена разрешения и т.п.)
+        if frame.ctypes.data != out.ctypes.data:
+            if frame.shape == out.shape:
+                out[:] = frame
+            else:
+                cv2.resize(frame, (out.shape[1], out.shape[0]), dst=out)
+        return True, out
+
+    def get_resolution(self) -> Tuple[int, int]:
+        """Фактическое разрешение (width, height), которое отдает драйвер."""
+        if self._cap is None:
+            return self._target_width, self._target_height
+        return int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def capture_to_buffer(self, shm_buffer: memoryview) -> bool:
+        """Совместимость с ICamera: захват BGR кадра прямо в переданный буфер."""
+        w, h = self.get_resolution()
+        dst = np.ndarray((h, w, 3), dtype=np.uint8, buffer=shm_buffer)
+        ret, _ = self.read_frame(out=dst)
+        return ret
 
     def release(self):
         self._is_connected = False
@@ -20,19 +20,20 @@ def main():
     logger.add("logs/bikefit_{time}.log", rotation="10 MB")
     logger.info(f"🚀 Starting BikeFit Motion System v3.0 (Orchestrated)...")
 
-    # 1. Manager для общей памяти (IPC)
-    manager = multiprocessing.Manager()
+    # 1. Manager нужен только прокси-транспорту шины (native работает на прямых очередях)
+    manager = multiprocessing.Manager() if settings.EVENT_BUS_TRANSPORT == "manager" else None
 
     # 2. Event Bus (без сохранения manager внутри)
     bus = EventBus(manager)
-    logger.info("✅ Event Bus initialized (Shared Memory Mode).")
+    logger.info(f"✅ Event Bus initialized ({bus.transport} transport).")
 
     # 3. Шаблон памяти
     shm_template = SharedMemoryConfig(
         name="shm_cam_0",
         size=0,
-        shape=(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3),
-        dtype="uint8"
+        shape=settings.SHM_PIXEL_FORMAT.frame_shape(settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH),
+        dtype="uint8",
+        pixel_format=settings.SHM_PIXEL_FORMAT
     )
 
     # 4. Оркестратор
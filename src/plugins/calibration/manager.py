@@ -1,10 +1,10 @@
 # src/plugins/calibration/manager.py
 import cv2
-import numpy as np
 import time
 import base64
 from loguru import logger
 from src.core.pipeline import PipelineStage, FrameContext
+from src.data.pixels import to_bgr
 
 # Убедись, что эти файлы существуют и лежат рядом
 from .lens import LensCalibrator
@@ -15,7 +15,8 @@ from .session_manager import CalibrationSession, create_session, get_all_session
 
 class CalibrationPlugin(PipelineStage):
     def __init__(self):
-        super().__init__("calibration_tool")
+        # 15 FPS: чтобы не забить WebSocket, особенно в режиме паузы (расписание — StageScheduler)
+        super().__init__("calibration_tool", rate_hz=15.0, reads=(), writes=())
 
         # 1. Modules
         self.lens = LensCalibrator()
@@ -44,9 +45,6 @@ class CalibrationPlugin(PipelineStage):
         self.is_wizard_open = False
         self.is_paused = True
 
-        self.FPS_PROCESS = 15.0
-        self.last_process_time = 0.0
-
         # 5. Caches
         self._cached_markers_count = 0
         self.current_board_angle = 0.0
@@ -64,12 +62,7 @@ class CalibrationPlugin(PipelineStage):
         if not self.is_wizard_open:
             return
 
-        # 2. THROTTLING: Ограничиваем частоту обновлений UI (15 FPS)
-        # Это критично, чтобы не забить WebSocket, особенно в режиме паузы.
-        now = time.time()
-        if (now - self.last_process_time) < (1.0 / self.FPS_PROCESS):
-            return
-        self.last_process_time = now
+        # 2. THROTTLING: частоту (15 FPS) держит StageScheduler через rate_hz
 
         # 3. HOT SWAP LOGIC
         if self._pending_apply_event:
@@ -104,12 +97,10 @@ class CalibrationPlugin(PipelineStage):
         if ctx.frame is None:
             return
 
-        if len(ctx.frame.shape) == 3:
-            gray = cv2.cvtColor(ctx.frame, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = ctx.frame
+        # Общий gray кадра (детектор уже мог его посчитать)
+        gray = ctx.gray
 
-        self.current_brightness = int(np.mean(gray))
+        self.current_brightness = int(ctx.mean_brightness)
 
         # 7. Detect
         raw_corners, raw_ids = self.lens.detect_markers(gray)
@@ -135,6 +126,7 @@ class CalibrationPlugin(PipelineStage):
 
         # 10. Auto Capture
         if self.auto_capture_active:
+            now = time.time()
             if (now - self.last_auto_capture_time) > self.COOLDOWN_CAPTURE:
                 valid_markers = len(charuco_ids) if charuco_ids is not None else 0
                 if valid_markers >= self.min_markers_threshold:
@@ -144,7 +136,8 @@ class CalibrationPlugin(PipelineStage):
         # 11. Capture Frame
         if self._capture_requested:
             self._capture_requested = False
-            frame_obj = self.session.add_frame(ctx.frame)
+            # Сессия хранит снимки в BGR (JPEG + детекция через BGR2GRAY)
+            frame_obj = self.session.add_frame(to_bgr(ctx.frame, ctx.pixel_format))
             if frame_obj.valid:
                 logger.info(f"📸 Frame captured: {frame_obj.id}")
                 self._cached_heatmap = self.session.get_heatmap()
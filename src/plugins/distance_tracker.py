@@ -11,7 +11,8 @@ from src.core.config import ROOT_DIR
 
 class DistanceTrackerPlugin(PipelineStage):
     def __init__(self):
-        super().__init__("distance_tracker")
+        # process() (трекинг + UI) ~ каждый 5-й кадр при 90 FPS, в остальных кадрах on_skipped() — только трекинг
+        super().__init__("distance_tracker", rate_hz=18.0, reads=("vision.keypoints",), writes=())
         self.is_tracking = False
         self.target_id = None  # ID точки, которую трекаем (int)
 
@@ -71,11 +72,28 @@ class DistanceTrackerPlugin(PipelineStage):
             self.current_distance = 0.0
             logger.info("📏 Stop tracking")
 
+    # Hot-reload: идущее измерение не сбрасывается (метаданные калибровки новый экземпляр читает сам)
+    def get_state(self):
+        return {
+            "is_tracking": self.is_tracking, "target_id": self.target_id,
+            "start_wx": self.start_wx, "start_wy": self.start_wy,
+            "start_screen_pos": self.start_screen_pos, "current_distance": self.current_distance,
+        }
+
+    def set_state(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def process(self, ctx: FrameContext):
         # Всегда отправляем UI данные, даже если не трекаем
-        if ctx.frame_id % 5 == 0:  # Оптимизация частоты отправки
-            self._send_ui(ctx)
+        self._send_ui(ctx)
+        self._track(ctx)
+
+    def on_skipped(self, ctx: FrameContext):
+        # Дистанция и линия на кадре нужны каждый кадр, UI — только по расписанию
+        self._track(ctx)
 
+    def _track(self, ctx: FrameContext):
         if not self.is_tracking or self.target_id is None:
             return
 
@@ -111,7 +129,8 @@ class DistanceTrackerPlugin(PipelineStage):
         # logger.info(f"dx dy current_distance : {dx} {dy} {self.current_distance}")
 
         # 3. ОТРИСОВКА (Визуальная связь)
-        if ctx.frame is not None and self.start_screen_pos:
+        # Кадр из слота SHM read-only (его уже читают API/Recorder) -> рисуем только на своих копиях
+        if ctx.frame is not None and ctx.frame.flags.writeable and self.start_screen_pos:
             # Линия от старта до текущей
             cv2.line(ctx.frame,
                      self.start_screen_pos,
@@ -5,7 +5,7 @@ from src.core.pipeline import PipelineStage, FrameContext
 
 class FPSMeterPlugin(PipelineStage):
     def __init__(self):
-        super().__init__(name="fps_meter")
+        super().__init__(name="fps_meter", reads=(), writes=("fps_meter",))
         self.last_time = time.time()
         self.frames = 0
         self.fps = 0.0
@@ -1,4 +1,5 @@
 # src/plugins/geometry_manager.py
+import copy
 import math
 from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
@@ -10,7 +11,7 @@ from src.data.models import Point2D
 
 class GeometryManager(PipelineStage):
     def __init__(self):
-        super().__init__(name="geometry_manager")
+        super().__init__(name="geometry_manager", reads=("vision.keypoints",), writes=("overlay.geometry",))
         # id -> { type, points: [], color, current, min, max, unit }
         self.tools: Dict[str, Dict[str, Any]] = {}
 
@@ -42,6 +43,13 @@ class GeometryManager(PipelineStage):
         elif cmd == "cmd_clear_all":
             self.tools.clear()
 
+    # Hot-reload: инструменты пользователя переживают перезагрузку модуля
+    def get_state(self):
+        return copy.deepcopy(self.tools)
+
+    def set_state(self, state):
+        self.tools = copy.deepcopy(state)
+
     def process(self, ctx: FrameContext):
         # 1. Получаем объекты Point2D (они содержат x, y, ux, uy, wx, wy)
         points: List[Point2D] = ctx.get_data("vision", "keypoints", [])
@@ -110,11 +118,15 @@ class GeometryManager(PipelineStage):
             if val > tool["max"]: tool["max"] = val
 
         # 3. Публикация данных
+        # [FIX] Снимок кадра, а не живой dict: в конвейере следующий кадр меняет self.tools,
+        # пока DeltaEncoder еще сериализует этот
+        snapshot = copy.deepcopy(self.tools)
+
         # Overlay для VideoPlayer (чтобы рисовать линии поверх видео)
-        ctx.set_data("overlay", "geometry", self.tools)
+        ctx.set_data("overlay", "geometry", snapshot)
 
         # Данные для UI виджета (список значений)
-        ctx.ui.update_widget("geometry_control", "Geometry Tools", {"tools": self.tools}, "custom")
+        ctx.ui.update_widget("geometry_control", "Geometry Tools", {"tools": snapshot}, "custom")
 
     def _get_angle_coords(self, p: Point2D) -> Optional[Tuple[float, float]]:
         """Выбирает лучшие координаты для угловых расчетов"""
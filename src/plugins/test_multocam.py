@@ -5,7 +5,7 @@ from src.core.pipeline import PipelineStage, FrameContext
 
 class TestMultiCamPlugin(PipelineStage):
     def __init__(self):
-        super().__init__("test_multicam")  # Имя для команд
+        super().__init__("test_multicam", reads=(), writes=())  # Имя для команд
         self.frame_counter = 0
 
     def process(self, ctx: FrameContext):
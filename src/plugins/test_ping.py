@@ -8,7 +8,7 @@ from loguru import logger
 
 class TestPingPlugin(PipelineStage):
     def __init__(self):
-        super().__init__("test_ping")  # Имя плагина для команд
+        super().__init__("test_ping", reads=(), writes=())  # Имя плагина для команд
         self.counter = 0
         self.is_green = False
 
@@ -6,6 +6,7 @@ import os
 from src.core.pipeline import PipelineStage, FrameContext
 from loguru import logger
 from src.core.config import ROOT_DIR
+from src.data.models import KeypointTable
 
 
 class PerspectiveStage(PipelineStage):
@@ -16,7 +17,7 @@ class PerspectiveStage(PipelineStage):
     """
 
     def __init__(self):
-        super().__init__(name="perspective")
+        super().__init__(name="perspective", reads=("vision.keypoints",), writes=("vision.keypoints",))
         self.perspective_matrix = None
         self.px_per_cm = 1.0
         self.is_active = False
@@ -51,48 +52,42 @@ class PerspectiveStage(PipelineStage):
 
     def process(self, ctx: FrameContext):
         points = ctx.get_data("vision", "keypoints", [])
-        if not points:
+        if not len(points):
             return
+        if not isinstance(points, KeypointTable):
+            # Совместимость: список Point2D от стороннего детектора
+            points = KeypointTable.from_points(points)
+            ctx.set_data("vision", "keypoints", points)
+
+        # Приоритет: UX (исправленные) -> X (сырые)
+        px = np.where(np.isnan(points.ux), points.x, points.ux)
+        py = np.where(np.isnan(points.uy), points.y, points.uy)
 
         # ВАРИАНТ 1: Если калибровки НЕТ (или пауза)
         # Используем линейный масштаб (fallback)
         if not self.is_active or self.is_paused:
             scale = self.px_per_cm if self.px_per_cm > 0 else 1.0
-            for p in points:
-                val_x = p.ux if p.ux is not None else p.x
-                val_y = p.uy if p.uy is not None else p.y
-                # Просто делим пиксели на масштаб
-                p.wx = val_x / scale
-                p.wy = val_y / scale
+            # Просто делим пиксели на масштаб
+            points.wx[:] = px / scale
+            points.wy[:] = py / scale
             return
 
         # ВАРИАНТ 2: Матрица ЕСТЬ
         try:
-            src_pts = []
-            for p in points:
-                # Приоритет: UX (исправленные) -> X (сырые)
-                px = p.ux if p.ux is not None else p.x
-                py = p.uy if p.uy is not None else p.y
-                src_pts.append([[px, py]])
-
-            src_pts = np.array(src_pts, dtype=np.float32)
+            src_pts = np.column_stack((px, py)).astype(np.float32).reshape(-1, 1, 2)
 
             # Применяем матрицу.
             # Т.к. доска была задана как 0.04 (метры), результат будет в МЕТРАХ.
             dst_pts = cv2.perspectiveTransform(src_pts, self.perspective_matrix)
 
-            for i, p in enumerate(points):
-                raw_wx_meters = float(dst_pts[i][0][0])
-                raw_wy_meters = float(dst_pts[i][0][1])
-
-                # [FIX] КОНВЕРТАЦИЯ: Метры -> Сантиметры
-                # Мы не делим на px_per_cm, потому что матрица уже сделала всю геометрию.
-                # Мы просто приводим единицы измерения к CM.
-                p.wx = raw_wx_meters * 100.0
-                p.wy = raw_wy_meters * 100.0
+            # [FIX] КОНВЕРТАЦИЯ: Метры -> Сантиметры
+            # Мы не делим на px_per_cm, потому что матрица уже сделала всю геометрию.
+            # Мы просто приводим единицы измерения к CM.
+            points.wx[:] = dst_pts[:, 0, 0] * 100.0
+            points.wy[:] = dst_pts[:, 0, 1] * 100.0
 
         except Exception as e:
             logger.error(f"Perspective calc error: {e}")
             # Fallback
-            for p in points:
-                p.wx, p.wy = 0.0, 0.0
\ No newline at end of file
+            points.wx[:] = 0.0
+            points.wy[:] = 0.0
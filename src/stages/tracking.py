@@ -1,12 +1,11 @@
 import numpy as np
 from scipy.spatial import distance as dist
-from collections import OrderedDict
 import time
-from typing import List, Dict, Any
+from typing import Dict, Any
 from loguru import logger
 
 from src.core.pipeline import PipelineStage, FrameContext
-from src.data.models import Point2D
+from src.data.models import KeypointTable
 
 
 class CentroidTrackerStage(PipelineStage):
@@ -16,11 +15,12 @@ class CentroidTrackerStage(PipelineStage):
     """
 
     def __init__(self):
-        super().__init__(name="tracker")
+        super().__init__(name="tracker", reads=("vision.keypoints",), writes=("vision.keypoints",))
 
         self.next_id = 1
-        self.objects: OrderedDict[int, Point2D] = OrderedDict()
-        self.disappeared: OrderedDict[int, int] = OrderedDict()
+        # Состояние трекера — та же колоночная таблица (строка = объект, порядок = порядок регистрации)
+        self.objects = KeypointTable()
+        self.disappeared = np.zeros(0, dtype=np.int64)
 
         # Настройки
         self.max_disappeared = 45  # 0.5 сек при 90 FPS
@@ -30,29 +30,29 @@ class CentroidTrackerStage(PipelineStage):
         self._last_ts = time.time()
         self._fps = 0.0
 
-    def register(self, point: Point2D):
-        """Регистрирует новый объект"""
-        point.id = self.next_id
-        point.label = f"ID {self.next_id}"
-        point.age = 0
-        point.is_stable = False
-
-        # Инициализируем скорости нулями, если их нет
-        if not hasattr(point, 'v_x') or point.v_x is None:
-            point.v_x = 0.0
-            point.v_y = 0.0
+    def register(self, points: KeypointTable):
+        """Регистрирует новые объекты (всю таблицу разом)"""
+        n = len(points)
+        if not n:
+            return
+        points.id[:] = np.arange(self.next_id, self.next_id + n)
+        points.age[:] = 0
+        points.is_stable[:] = False
+        points.v_x[:] = 0.0
+        points.v_y[:] = 0.0
 
-        self.objects[self.next_id] = point
-        self.disappeared[self.next_id] = 0
-        self.next_id += 1
+        self.objects = self.objects.concat(points)
+        self.disappeared = np.concatenate((self.disappeared, np.zeros(n, dtype=np.int64)))
+        self.next_id += n
 
-    def deregister(self, object_id):
-        del self.objects[object_id]
-        del self.disappeared[object_id]
+    def deregister(self, keep: np.ndarray):
+        """Оставляет только строки keep (маска)"""
+        self.objects = self.objects.select(keep)
+        self.disappeared = self.disappeared[keep]
 
     def process(self, ctx: FrameContext):
         # 1. Входные данные (от BlobDetection)
-        input_points: List[Point2D] = ctx.get_data("vision", "keypoints", [])
+        input_points = KeypointTable.from_points(ctx.get_data("vision", "keypoints", []))
 
         # Рассчитываем dt (время с прошлого кадра) для корректного расчета скорости
         # В идеале нужно хранить timestamp предыдущего кадра, но пока берем фиксированный
@@ -60,116 +60,77 @@ class CentroidTrackerStage(PipelineStage):
 
         # Если трекер пуст, просто регистрируем всё
         if len(self.objects) == 0:
-            for p in input_points:
-                self.register(p)
+            self.register(input_points.copy())
             self._finalize(ctx)
             return
 
-        # 2. Подготовка списков
-        object_ids = list(self.objects.keys())
-
-        # --- PREDICTIVE LOGIC ---
-        # Вместо текущих координат берем ПРЕДСКАЗАННЫЕ: (x + v_x*dt, y + v_y*dt)
-        predicted_centroids = []
-        for oid in object_ids:
-            obj = self.objects[oid]
-            # Предсказание позиции (Линейная экстраполяция)
-            pred_x = obj.x + (obj.v_x * dt if obj.v_x else 0)
-            pred_y = obj.y + (obj.v_y * dt if obj.v_y else 0)
-            predicted_centroids.append([pred_x, pred_y])
-
-        predicted_centroids = np.array(predicted_centroids)
+        objects = self.objects
 
         # Если входных точек нет, увеличиваем счетчик пропажи
-        if not input_points:
-            for obj_id in list(self.disappeared.keys()):
-                self.disappeared[obj_id] += 1
-                if self.disappeared[obj_id] > self.max_disappeared:
-                    self.deregister(obj_id)
+        if not len(input_points):
+            self.disappeared += 1
+            self.deregister(self.disappeared <= self.max_disappeared)
             self._finalize(ctx)
             return
 
-        input_centroids = np.array([[p.x, p.y] for p in input_points])
+        # 2. --- PREDICTIVE LOGIC ---
+        # Вместо текущих координат берем ПРЕДСКАЗАННЫЕ: (x + v_x*dt, y + v_y*dt)
+        predicted_centroids = np.column_stack((objects.x + objects.v_x * dt, objects.y + objects.v_y * dt))
+        input_centroids = np.column_stack((input_points.x, input_points.y))
 
         # 3. Расчет дистанций (между Предсказанием и Реальностью)
         D = dist.cdist(predicted_centroids, input_centroids)
 
-        # Находим соответствия (Greedy approach)
+        # Находим соответствия (Greedy approach): строки по возрастанию лучшей дистанции,
+        # каждая берет свой ближайший столбец, если он еще свободен и не дальше max_distance.
+        # Пары за порогом столбец не занимают -> сначала фильтр, потом первое вхождение столбца
         rows = D.min(axis=1).argsort()
         cols = D.argmin(axis=1)[rows]
-
-        used_rows = set()
-        used_cols = set()
-
-        for (row, col) in zip(rows, cols):
-            if row in used_rows or col in used_cols:
-                continue
-
-            # Проверяем дистанцию (если предсказание ошиблось слишком сильно - это не тот маркер)
-            if D[row, col] > self.max_distance:
-                continue
-
-            object_id = object_ids[row]
-            new_observation = input_points[col]
-            existing_object = self.objects[object_id]
-
-            # === ОБНОВЛЕНИЕ ОБЪЕКТА ===
-
-            # 1. Расчет мгновенной скорости
-            # v_x = (new_x - old_x) / dt
-            # Используем update_speed из модели Point2D (если он есть) или считаем вручную
-            inst_v_x = (new_observation.x - existing_object.x) / dt
-            inst_v_y = (new_observation.y - existing_object.y) / dt
-
-            # Сглаживание скорости (Exponential Moving Average), чтобы не дергалось от шума
-            alpha = 0.5  # Коэффициент сглаживания
-            prev_v_x = existing_object.v_x if existing_object.v_x else 0.0
-            prev_v_y = existing_object.v_y if existing_object.v_y else 0.0
-
-            existing_object.v_x = prev_v_x * alpha + inst_v_x * (1 - alpha)
-            existing_object.v_y = prev_v_y * alpha + inst_v_y * (1 - alpha)
-
-            # 2. Обновляем координаты
-            existing_object.x = new_observation.x
-            existing_object.y = new_observation.y
-            existing_object.confidence = new_observation.confidence
-
-            # Сброс счетчика исчезновения
-            existing_object.age += 1
-            self.disappeared[object_id] = 0
-
-            # Важно: сбрасываем undistorted координаты, их должен пересчитать следующий стейдж
-            existing_object.ux = None
-            existing_object.uy = None
-
-            used_rows.add(row)
-            used_cols.add(col)
-
-        # 4. Обработка "пропавших" (тех, кого не нашли)
-        unused_rows = set(range(0, D.shape[0])).difference(used_rows)
-        for row in unused_rows:
-            obj_id = object_ids[row]
-            # Если объект потерялся, можно обнулить скорость или оставить старую (инерция)
-            # Пока оставим как есть, но увеличим счетчик пропажи
-            self.disappeared[obj_id] += 1
-            if self.disappeared[obj_id] > self.max_disappeared:
-                self.deregister(obj_id)
+        near = D[rows, cols] <= self.max_distance
+        rows, cols = rows[near], cols[near]
+        _, first = np.unique(cols, return_index=True)
+        first.sort()
+        rows, cols = rows[first], cols[first]
+
+        # === ОБНОВЛЕНИЕ ОБЪЕКТОВ (все совпавшие разом) ===
+
+        # 1. Мгновенная скорость + сглаживание (Exponential Moving Average), чтобы не дергалось от шума
+        alpha = 0.5  # Коэффициент сглаживания
+        new_x, new_y = input_points.x[cols], input_points.y[cols]
+        objects.v_x[rows] = objects.v_x[rows] * alpha + (new_x - objects.x[rows]) / dt * (1 - alpha)
+        objects.v_y[rows] = objects.v_y[rows] * alpha + (new_y - objects.y[rows]) / dt * (1 - alpha)
+
+        # 2. Обновляем координаты
+        objects.x[rows] = new_x
+        objects.y[rows] = new_y
+        objects.confidence[rows] = input_points.confidence[cols]
+        objects.age[rows] += 1
+
+        # Важно: сбрасываем undistorted координаты, их должен пересчитать следующий стейдж
+        objects.ux[rows] = np.nan
+        objects.uy[rows] = np.nan
+
+        # 4. Обработка "пропавших" (тех, кого не нашли): скорость оставляем (инерция), счетчик растет
+        matched = np.zeros(len(objects), dtype=bool)
+        matched[rows] = True
+        self.disappeared[matched] = 0
+        self.disappeared[~matched] += 1
+        self.deregister(self.disappeared <= self.max_disappeared)
 
         # 5. Регистрация новых (тех, кого не сматчили)
-        unused_cols = set(range(0, D.shape[1])).difference(used_cols)
-        for col in unused_cols:
-            self.register(input_points[col])
+        unused = np.ones(len(input_points), dtype=bool)
+        unused[cols] = False
+        self.register(input_points.select(unused))
 
         self._finalize(ctx)
 
     def _finalize(self, ctx: FrameContext):
-        # Отправляем только живые объекты
-        tracked_list = []
-        for obj_id, obj in self.objects.items():
-            if self.disappeared[obj_id] == 0:
-                tracked_list.append(obj)
+        # Отправляем только живые объекты.
+        # select() — копия: в конвейере Processor прошлый кадр еще читают
+        # (geometry, сериализация), а self.objects следующий кадр уже двигает
+        tracked = self.objects.select(self.disappeared == 0)
 
-        ctx.set_data("vision", "keypoints", tracked_list)
+        ctx.set_data("vision", "keypoints", tracked)
 
         # UI Throttling
         if ctx.frame_id % 15 == 0:
@@ -177,7 +138,7 @@ class CentroidTrackerStage(PipelineStage):
             ctx.ui.update_widget(
                 "tracker_stat",
                 "Tracking",
-                {"active": len(tracked_list), "total": self.next_id - 1},
+                {"active": len(tracked), "total": self.next_id - 1},
                 "text"
             )
 
@@ -190,7 +151,7 @@ class CentroidTrackerStage(PipelineStage):
 
     def handle_command(self, cmd: str, args: Dict[str, Any]):
         if cmd == "reset_tracker":
-            self.objects.clear()
-            self.disappeared.clear()
+            self.objects = KeypointTable()
+            self.disappeared = np.zeros(0, dtype=np.int64)
             self.next_id = 1
             logger.info("♻️ Tracker reset")
\ No newline at end of file
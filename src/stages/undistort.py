@@ -6,6 +6,7 @@ import os
 from loguru import logger
 from src.core.pipeline import PipelineStage, FrameContext
 from src.core.config import ROOT_DIR  # [ВАЖНО] Используем глобальный корень
+from src.data.models import KeypointTable
 
 
 class UndistortStage(PipelineStage):
@@ -17,7 +18,7 @@ class UndistortStage(PipelineStage):
     """
 
     def __init__(self):
-        super().__init__(name="undistort")
+        super().__init__(name="undistort", reads=("vision.keypoints",), writes=("vision.keypoints",))
         self.camera_matrix = None
         self.dist_coeffs = None
         self.is_active = False
@@ -68,19 +69,22 @@ class UndistortStage(PipelineStage):
 
     def process(self, ctx: FrameContext):
         points = ctx.get_data("vision", "keypoints", [])
-        if not points:
+        if not len(points):
             return
+        if not isinstance(points, KeypointTable):
+            # Совместимость: список Point2D от стороннего детектора
+            points = KeypointTable.from_points(points)
+            ctx.set_data("vision", "keypoints", points)
 
         # Если стадия выключена, конфига нет или пауза -> просто копируем координаты
         if not self.is_active or self.is_paused:
-            for p in points:
-                p.ux = p.x
-                p.uy = p.y
+            points.ux[:] = points.x
+            points.uy[:] = points.y
             return
 
         try:
-            # Подготовка данных для OpenCV (N, 1, 2)
-            src_pts = np.array([[[p.x, p.y]] for p in points], dtype=np.float64)
+            # Подготовка данных для OpenCV (N, 1, 2) — прямо из столбцов
+            src_pts = np.column_stack((points.x, points.y)).reshape(-1, 1, 2)
 
             # P=camera_matrix сохраняет масштаб картинки (не обрезает края)
             dst_pts = cv2.undistortPoints(
@@ -88,12 +92,11 @@ class UndistortStage(PipelineStage):
             )
 
             # Запись результатов
-            for i, p in enumerate(points):
-                p.ux = float(dst_pts[i][0][0])
-                p.uy = float(dst_pts[i][0][1])
+            points.ux[:] = dst_pts[:, 0, 0]
+            points.uy[:] = dst_pts[:, 0, 1]
 
         except Exception as e:
             logger.error(f"Undistort calc error: {e}")
             # Fallback на случай сбоя математики
-            for p in points:
-                p.ux, p.uy = p.x, p.y
\ No newline at end of file
+            points.ux[:] = points.x
+            points.uy[:] = points.y
@@ -0,0 +1,32 @@
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+from src.data.models import SharedMemoryConfig
+from src.data.shared_memory import SharedMemoryManager, RingBufferLayout, VideoFrameLayout
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def shm():
+    """Маленькое видеокольцо (8x8 BGR, SHM_BUFFER_COUNT слотов) с кольцом результатов"""
+    cfg = SharedMemoryConfig(name=f"bf_test_{os.getpid()}_{next(_names)}", size=0, shape=(8, 8, 3))
+    mgr = SharedMemoryManager(cfg, create=True)
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def write_frame():
+    """Писатель как в воркере: следующий слот (с учетом аренд) -> кадр под seqlock -> publish"""
+    def write(mgr: SharedMemoryManager, frame_id: int, value: int = 0) -> int:
+        idx = mgr.next_write_slot()
+        view = RingBufferLayout.get_slot_view(mgr.shm.buf, idx, mgr.slot_size)
+        VideoFrameLayout.write_to_buf(view, np.full(mgr.shape, value, dtype=np.uint8), frame_id, float(frame_id))
+        del view
+        mgr.publish(idx)
+        return idx
+    return write
@@ -0,0 +1,50 @@
+import time
+
+from src.core.event_bus import (BusTelemetry, EventBus, CHANNEL_UPSTREAM, POLICY_LATEST, TOPIC_STREAM,
+                                TRANSPORT_NATIVE)
+
+
+def test_counters_and_snapshot():
+    tel = BusTelemetry()
+    t0 = time.perf_counter()
+    tel.on_put(TOPIC_STREAM, t0, True)
+    tel.on_put(TOPIC_STREAM, t0, True)
+    tel.on_put(TOPIC_STREAM, t0, False)
+    tel.on_get(TOPIC_STREAM, 2)
+
+    snap = tel.snapshot()[TOPIC_STREAM]
+    assert (snap["enqueued"], snap["dropped"], snap["dequeued"]) == (2, 1, 2)
+    assert snap["put_latency"]  # Гистограмма put уходит в heartbeat вместе со счетчиками
+
+
+def test_report_merges_remote_snapshots_and_depth():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    worker = BusTelemetry()
+    for ok in (True, True, False):
+        worker.on_put(CHANNEL_UPSTREAM, time.perf_counter(), ok)
+    bus.record_remote_telemetry("camera_0", worker.snapshot())
+
+    bus.publish_event("heartbeat", {})
+    time.sleep(0.1)  # feeder-поток дописывает pipe
+    report = bus.telemetry_report()
+
+    upstream = report["channels"][CHANNEL_UPSTREAM]
+    assert report["sources"] == ["local", "camera_0"]
+    assert (upstream["enqueued"], upstream["dropped"]) == (3, 1)
+    assert upstream["depth"] == 1
+    assert upstream["put_latency_ms"]
+
+
+def test_full_queue_and_slow_subscriber_drops_are_reported():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    for i in range(12):
+        bus.publish_stream({"frame_id": i})  # Очередь стрима на 10
+    assert bus.telemetry.counters[TOPIC_STREAM]["dropped"] == 2
+
+    sub = bus.subscribe(TOPIC_STREAM, policy=POLICY_LATEST)
+    deadline = time.time() + 2.0
+    while sub.dropped < 9 and time.time() < deadline:
+        time.sleep(0.01)
+    report = bus.telemetry_report()
+    assert report["subscribers"][TOPIC_STREAM] == [{"policy": POLICY_LATEST, "depth": 1, "dropped": 9}]
+    sub.close()
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+from src.core.pipeline import FrameContext
+from src.data.schemas import CameraConfig
+from src.plugins.calibration import session_manager
+from src.plugins.calibration.manager import CalibrationPlugin
+
+
+def _plugin(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_manager, "SESSION_ROOT", tmp_path)
+    plugin = CalibrationPlugin()
+    plugin.session = session_manager.CalibrationSession(0, "test_session")
+    plugin.is_wizard_open = True
+    plugin.is_paused = False
+    plugin.auto_capture_active = True
+    plugin.min_markers_threshold = 4
+
+    # interpolateCornersCharuco есть не во всех сборках OpenCV: углы доски берем из найденных маркеров
+    def interpolate(corners, ids, gray):
+        if ids is None or len(ids) == 0:
+            return None, None
+        return np.concatenate(corners).reshape(-1, 1, 2)[:len(ids)], ids
+
+    monkeypatch.setattr(plugin.lens, "interpolate", interpolate)
+    monkeypatch.setattr(plugin.lens, "estimate_angle", lambda *args: 0.0)
+    monkeypatch.setattr(plugin.session, "_detect", lambda image: (True, 4))
+    monkeypatch.setattr(plugin.session, "get_heatmap", lambda: [])
+    return plugin
+
+
+def _board_frame(plugin):
+    board = plugin.lens.CHARUCO_BOARD.generateImage((700, 980), marginSize=40)
+    return cv2.cvtColor(board, cv2.COLOR_GRAY2BGR)
+
+
+def _ctx(frame, frame_id=1):
+    return FrameContext(frame, frame_id, CameraConfig(camera_id=0), camera_id=0)
+
+
+def test_auto_capture_branch_captures_frame(tmp_path, monkeypatch):
+    plugin = _plugin(tmp_path, monkeypatch)
+
+    plugin.process(_ctx(_board_frame(plugin)))
+
+    assert plugin.last_auto_capture_time > 0
+    assert len(plugin.session.frames) == 1
+
+
+def test_auto_capture_respects_cooldown(tmp_path, monkeypatch):
+    plugin = _plugin(tmp_path, monkeypatch)
+    frame = _board_frame(plugin)
+
+    plugin.process(_ctx(frame, 1))
+    first = plugin.last_auto_capture_time
+    plugin.process(_ctx(frame, 2))
+
+    assert plugin.last_auto_capture_time == first
+    assert len(plugin.session.frames) == 1
+
+
+def test_auto_capture_skips_frame_without_board(tmp_path, monkeypatch):
+    plugin = _plugin(tmp_path, monkeypatch)
+
+    plugin.process(_ctx(np.zeros((480, 640, 3), np.uint8)))
+
+    assert plugin.last_auto_capture_time == 0.0
+    assert plugin.session.frames == {}
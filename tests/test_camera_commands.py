@@ -0,0 +1,35 @@
+from src.core.event_bus import EventBus, TRANSPORT_NATIVE
+from src.data.schemas import CameraConfig
+from src.hardware.camera_worker import _apply_config_run
+
+
+class _Webcam:
+    def __init__(self, fail=False):
+        self.applied = []
+        self.fail = fail
+
+    def apply_config(self, config):
+        if self.fail:
+            raise RuntimeError("device busy")
+        self.applied.append(config)
+
+
+def _run(*updates):
+    return [({"cmd": "SET_CONFIG", "args": u}, 0.0, u) for u in updates]
+
+
+def test_config_run_applied_once_last_value_wins():
+    bus, webcam = EventBus(transport=TRANSPORT_NATIVE), _Webcam()
+    config = _apply_config_run(bus, 0, webcam, CameraConfig(camera_id=0),
+                               _run({"exposure": 10}, {"gain": 3}, {"exposure": 20}))
+
+    assert len(webcam.applied) == 1
+    assert config.exposure == 20 and config.gain == 3
+    assert bus.telemetry.commands["coalesced"] == 2
+
+
+def test_config_run_failure_keeps_previous_config():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    before = CameraConfig(camera_id=0, exposure=5)
+    config = _apply_config_run(bus, 0, _Webcam(fail=True), before, _run({"exposure": 50}))
+    assert config is before
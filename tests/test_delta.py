@@ -0,0 +1,145 @@
+import json
+
+from src.core.delta import DeltaEncoder, STATE_FIELDS, read_trace
+
+
+def _fields(fps=30.0, plugins=("vision",), config=None, widgets=None, notifications=None):
+    return {"fps": fps, "errors": [], "active_plugins": list(plugins), "camera_config": config,
+            "widgets": widgets or [], "notifications": notifications or []}
+
+
+def _full(fields, results):
+    """Ожидаемое состояние кадра после слияния (как полный пакет)"""
+    state = {name: fields.get(name) for name in STATE_FIELDS}
+    state["camera_config"] = state["camera_config"] or {}  # None уходит как {}
+    return state, {ns: dict(keys) for ns, keys in results.items() if keys}
+
+
+def _merge(base, packet):
+    """Контракт слияния клиента (docs/API_REFERENCE.md, applyDelta во фронтенде)"""
+    state = {name: packet.get(name, base.get(name)) for name in STATE_FIELDS}
+    results = {ns: dict(keys) for ns, keys in base.get("results", {}).items()}
+    for ns, keys in packet.get("results", {}).items():
+        results.setdefault(ns, {}).update(keys)
+    for ns, key in packet.get("removed", []):
+        results.get(ns, {}).pop(key, None)
+    return state, {ns: keys for ns, keys in results.items() if keys}
+
+
+class _Client:
+    def __init__(self):
+        self.bases = {}
+
+    def apply(self, raw: bytes):
+        packet = json.loads(raw)
+        if not packet["delta"]:
+            self.bases[packet["frame_id"]] = packet
+            return _merge({}, packet)
+        base = self.bases.get(packet["kf"])
+        return None if base is None else _merge(base, packet)
+
+
+def _frames():
+    """Кадры с изменением, добавлением и удалением ключей results и полей состояния"""
+    return [
+        (_fields(), {"vision": {"keypoints": [1, 2]}, "calibration": {"preview": "a", "score": 1}}),
+        (_fields(), {"vision": {"keypoints": [1, 2]}, "calibration": {"preview": "a", "score": 1}}),
+        (_fields(fps=29.5), {"vision": {"keypoints": [3]}, "calibration": {"preview": "a", "score": 1}}),
+        (_fields(plugins=("vision", "calibration")), {"vision": {"keypoints": [3]}, "calibration": {"score": 2}}),
+        (_fields(config={"exposure": 10}), {"vision": {"keypoints": [3], "fps": 5}}),
+        (_fields(), {}),
+    ]
+
+
+def test_delta_round_trip_restores_full_payload():
+    enc, client = DeltaEncoder(interval=100), _Client()
+    for i, (fields, results) in enumerate(_frames()):
+        raw = enc.encode(1000 + i, 0, fields, results)
+        assert json.loads(raw)["delta"] is (i > 0)
+        assert client.apply(raw) == _full(fields, results)
+
+
+def test_delta_carries_only_changes_and_removed_keys():
+    enc = DeltaEncoder(interval=100)
+    frames = _frames()
+    enc.encode(1, 0, *frames[0])
+    assert json.loads(enc.encode(2, 0, *frames[1])) == {
+        "frame_id": 2, "camera_id": 0, "kf": 1, "delta": True}
+
+    packet = json.loads(enc.encode(3, 0, *frames[3]))
+    assert packet["active_plugins"] == ["vision", "calibration"]
+    assert packet["results"] == {"vision": {"keypoints": [3]}, "calibration": {"score": 2}}
+    assert packet["removed"] == [["calibration", "preview"]]
+    assert "fps" not in packet
+
+
+def test_lost_deltas_do_not_break_state():
+    # Delta считается от keyframe: клиенту достаточно keyframe и последнего пакета
+    enc, client = DeltaEncoder(interval=100), _Client()
+    packets = [enc.encode(10 + i, 0, f, r) for i, (f, r) in enumerate(_frames())]
+    client.apply(packets[0])
+    assert client.apply(packets[-1]) == _full(*_frames()[-1])
+    assert client.apply(packets[3]) == _full(*_frames()[3])
+
+
+def test_keyframe_interval_and_forced_keyframe():
+    enc = DeltaEncoder(interval=3)
+    fields, results = _frames()[0]
+    kinds = [json.loads(enc.encode(i, 0, fields, results))["delta"] for i in range(7)]
+    assert kinds == [False, True, True, False, True, True, False]
+
+    enc.request_keyframe()
+    packet = json.loads(enc.encode(7, 0, fields, results))
+    assert packet["delta"] is False and packet["kf"] == 7
+    assert json.loads(enc.encode(8, 0, fields, results))["kf"] == 7
+
+
+def test_interval_zero_sends_only_keyframes():
+    enc = DeltaEncoder(interval=0)
+    fields, results = _frames()[0]
+    assert all(not json.loads(enc.encode(i, 0, fields, results))["delta"] for i in range(4))
+
+
+def test_client_without_base_drops_delta():
+    enc, client = DeltaEncoder(interval=100), _Client()
+    enc.encode(1, 0, *_frames()[0])
+    assert client.apply(enc.encode(2, 0, *_frames()[2])) is None
+
+
+def test_widgets_accumulate_by_id():
+    enc = DeltaEncoder(interval=100)
+    a1, b1, a2 = {"widget_id": "a", "v": 1}, {"widget_id": "b", "v": 1}, {"widget_id": "a", "v": 2}
+    assert json.loads(enc.encode(1, 0, _fields(widgets=[a1, b1]), {}))["widgets"] == [a1, b1]
+    assert json.loads(enc.encode(2, 0, _fields(widgets=[a1, b1]), {})).get("widgets") is None
+    assert json.loads(enc.encode(3, 0, _fields(widgets=[a2]), {}))["widgets"] == [a2]
+
+    enc.request_keyframe()
+    assert json.loads(enc.encode(4, 0, _fields(), {}))["widgets"] == [a2, b1]
+
+
+def test_trace_is_first_key_and_readable_without_parsing():
+    enc = DeltaEncoder(interval=100)
+    raw = enc.encode(1, 3, *_frames()[0], trace=[1.5, 2.25])
+    assert read_trace(raw) == [3.0, 1.5, 2.25]
+    assert json.loads(raw)["trace"] == [3, 1.5, 2.25]
+    assert read_trace(enc.encode(2, 3, *_frames()[0])) is None
+
+
+def test_send_time_appended_to_worker_bytes_and_dicts():
+    import time
+    from src.api.server import with_send_time
+    enc = DeltaEncoder(interval=100)
+    raw = enc.encode(1, 3, *_frames()[0], trace=[1.5, 2.25])
+
+    t0 = time.perf_counter()
+    stamped = with_send_time(raw)
+    t1 = time.perf_counter()
+    packet = json.loads(stamped)
+    # Дописан последним ключом: trace остается первым, остальной пакет не тронут
+    assert read_trace(stamped) == [3.0, 1.5, 2.25]
+    assert t0 - 1e-6 <= packet.pop("t_send") <= t1 + 1e-6
+    assert packet == json.loads(raw)
+
+    source = {"trace": [3, 1.5], "fps": 30.0}
+    stamped = with_send_time(source)
+    assert "t_send" not in source and stamped["t_send"] >= t1 and stamped["fps"] == 30.0
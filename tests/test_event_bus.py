@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import signal
+import struct
+import threading
+import time
+
+import pytest
+
+from src.core.event_bus import EventBus, CHANNEL_UPSTREAM, TOPIC_STREAM, TRANSPORT_NATIVE, resolve_camera_id
+
+
+def _native_bus():
+    return EventBus(transport=TRANSPORT_NATIVE)
+
+
+def _drain_stream(bus, expected, timeout=2.0):
+    items, deadline = [], time.time() + timeout
+    while len(items) < expected and time.time() < deadline:
+        items += bus.get_stream_batch(64, 0.05)
+    return items
+
+
+def test_full_stream_queue_drops_newest_without_reading():
+    bus = _native_bus()
+    for i in range(15):
+        bus.publish_stream({"frame_id": i})
+    time.sleep(0.1)  # feeder-поток дописывает pipe
+
+    counters = bus.telemetry.counters[TOPIC_STREAM]
+    assert counters["dequeued"] == 0  # Производитель ничего не забирал из общей очереди
+    assert counters["enqueued"] == 10 and counters["dropped"] == 5
+    assert [p["frame_id"] for p in _drain_stream(bus, 10)] == list(range(10))
+
+
+def _drain_commands(bus, camera_id, expected, timeout=2.0):
+    items, deadline = [], time.time() + timeout
+    while len(items) < expected and time.time() < deadline:
+        items += bus.take_commands(camera_id)
+    return items
+
+
+@pytest.mark.parametrize("target, expected", [
+    ("camera_2", 2), ("cam_2", 2), ("2", 2), (2, 2),
+    ("system", None), ("fps_meter", None), ("camera_x", None), (None, None),
+])
+def test_resolve_camera_id(target, expected):
+    assert resolve_camera_id(target) == expected
+
+
+def test_take_commands_keeps_arrival_order():
+    bus = _native_bus()
+    bus.register_worker(1)
+    bus.send_command("cam_1", "SET_CONFIG", {"exposure": 10})
+    bus.send_command(1, {"cmd": "SET_SALT", "args": {"salt": 2.0}})
+    bus.send_command("camera_1", "SET_CONFIG", {"exposure": 20})
+
+    cmds = _drain_commands(bus, 1, 3)
+    assert [(c["cmd"], c["args"]) for c in cmds] == [
+        ("SET_CONFIG", {"exposure": 10}), ("SET_SALT", {"salt": 2.0}), ("SET_CONFIG", {"exposure": 20}),
+    ]
+    assert bus.take_commands(7) == []  # Незарегистрированная камера
+
+
+def test_worker_bus_carries_only_its_own_channels():
+    bus = _native_bus()
+    bus.register_worker(1)
+    bus.register_worker(2)
+
+    wbus = bus.for_worker(1)
+    own = bus._worker_channels[1]
+    assert wbus._stream_queue is own.queues[TOPIC_STREAM]
+    assert wbus._upstream_queue is own.queues[CHANNEL_UPSTREAM]
+    assert list(wbus._command_queues) == [1] and wbus._worker_channels == {}
+
+    wbus.publish_stream({"camera_id": 1})
+    wbus.publish_event("heartbeat", {"camera_id": 1})
+    assert _drain_stream(bus, 1) == [{"camera_id": 1}]
+    assert bus.get_updates_batch(timeout=1.0) == [{"type": "heartbeat", "payload": {"camera_id": 1}}]
+
+
+def test_restart_rebuilds_worker_channels():
+    bus = _native_bus()
+    bus.register_worker(1)
+    old = bus._worker_channels[1]
+    bus.register_worker(1)
+    assert bus._worker_channels[1] is not old
+    assert bus._command_queues[1] is bus._worker_channels[1].command
+
+
+def test_torn_message_drops_only_that_worker_channel():
+    bus = _native_bus()
+    bus.register_worker(1)
+    bus.register_worker(2)
+    healthy = bus.for_worker(2)
+    for i in range(3):
+        healthy.publish_stream({"camera_id": 2, "frame_id": i})
+    time.sleep(0.1)  # feeder-поток дописывает pipe
+
+    # Воркер 1 умер посреди сообщения: заголовок на 100 байт, дошли 3
+    torn = bus._worker_channels[1].queues[TOPIC_STREAM]
+    os.write(torn._writer.fileno(), struct.pack("!i", 100) + b"abc")
+    bus.detach_worker(1)  # Воркер 2 "жив": его конец записи остается открытым
+
+    items = _drain_stream(bus, 3)
+    assert [p["frame_id"] for p in items] == [0, 1, 2]
+    assert 1 not in bus._worker_channels and 2 in bus._worker_channels
+
+
+def _spam_stream(bus, camera_id, count):
+    # Процесс воркера: count пакетов (0 — бесконечно), затем ждем, пока не убьют
+    i = 0
+    while not count or i < count:
+        bus.publish_stream({"camera_id": camera_id, "frame_id": i})
+        i += 1
+    time.sleep(60)
+
+
+def test_killed_worker_does_not_break_other_workers(monkeypatch):
+    # Как в приложении: spawn, у воркера только переданные ему fd
+    spawn = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(multiprocessing, "get_context", lambda method=None: spawn)
+    bus = _native_bus()
+    procs = {}
+    for cid, count in ((1, 0), (2, 5)):
+        bus.register_worker(cid)
+        procs[cid] = spawn.Process(target=_spam_stream, args=(bus.for_worker(cid), cid, count), daemon=True)
+        procs[cid].start()
+        bus.detach_worker(cid)
+
+    try:
+        items, deadline = [], time.time() + 20
+        while time.time() < deadline:
+            items += bus.get_stream_batch(64, 0.05)
+            if 2 in {p["camera_id"] for p in items} and 1 in {p["camera_id"] for p in items}:
+                break
+        os.kill(procs[1].pid, signal.SIGKILL)  # Посреди put
+        procs[1].join(5)
+
+        deadline = time.time() + 10
+        while time.time() < deadline and (1 in bus._worker_channels
+                                          or sum(p["camera_id"] == 2 for p in items) < 5):
+            items += bus.get_stream_batch(64, 0.05)
+    finally:
+        for proc in procs.values():
+            proc.kill()
+
+    assert 1 not in bus._worker_channels  # EOF: канал убитого воркера отброшен
+    assert [p["frame_id"] for p in items if p["camera_id"] == 2] == list(range(5))
+
+
+def _fill_upstream(bus, n):
+    for i in range(n):
+        bus.publish_event("heartbeat", {"i": i})
+    time.sleep(0.1)  # feeder-поток дописывает pipe
+
+
+def test_batch_drain_respects_max_items_and_order():
+    bus = _native_bus()
+    _fill_upstream(bus, 10)
+
+    first = bus.get_updates_batch(max_items=4)
+    rest = bus.get_updates_batch(max_items=100)
+    assert [m["payload"]["i"] for m in first] == [0, 1, 2, 3]
+    assert [m["payload"]["i"] for m in rest] == list(range(4, 10))
+    assert bus.get_updates_batch() == []
+    assert bus.telemetry.counters[CHANNEL_UPSTREAM]["dequeued"] == 10
+
+
+def test_batch_drain_blocks_until_first_message():
+    bus = _native_bus()
+    t0 = time.perf_counter()
+    assert bus.get_updates_batch(timeout=0.05) == []
+    assert time.perf_counter() - t0 >= 0.05
+
+    threading.Timer(0.05, bus.publish_event, ("heartbeat", {"i": 0})).start()
+    t0 = time.perf_counter()
+    batch = bus.get_updates_batch(timeout=2.0)
+    assert [m["payload"]["i"] for m in batch] == [0]
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_batch_drain_waits_on_all_worker_channels():
+    bus = _native_bus()
+    for cid in (1, 2):
+        bus.register_worker(cid)
+    worker = bus.for_worker(2)
+
+    threading.Timer(0.05, worker.publish_event, ("heartbeat", {"camera_id": 2})).start()
+    t0 = time.perf_counter()
+    batch = bus.get_updates_batch(timeout=2.0)
+    assert [m["payload"] for m in batch] == [{"camera_id": 2}]
+    assert time.perf_counter() - t0 < 1.0
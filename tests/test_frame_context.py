@@ -0,0 +1,93 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import src.core.pipeline as pipeline
+from src.core.pipeline import FrameContext
+from src.data.models import PixelFormat
+from src.data.pixels import ImageBuffers
+from src.data.schemas import CameraConfig
+
+
+def _bgr(h=16, w=16):
+    return np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def _ctx(frame, fmt=PixelFormat.BGR, buffers=None):
+    return FrameContext(frame, 1, CameraConfig(camera_id=0), camera_id=0, pixel_format=fmt, buffers=buffers)
+
+
+@pytest.fixture
+def count_to_gray(monkeypatch):
+    calls = []
+    real = pipeline.to_gray
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.01)  # Окно для гонки параллельных стадий
+        return real(*args, **kwargs)
+    monkeypatch.setattr(pipeline, "to_gray", counting)
+    return calls
+
+
+def test_gray_is_computed_once_and_read_only(count_to_gray):
+    frame = _bgr()
+    ctx = _ctx(frame)
+    gray = ctx.gray
+    assert ctx.gray is gray and len(count_to_gray) == 1
+    assert np.array_equal(gray, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    with pytest.raises(ValueError):
+        gray[0, 0] = 1
+
+
+def test_parallel_stages_share_one_computation(count_to_gray):
+    ctx = _ctx(_bgr())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ctx.gray)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(count_to_gray) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_gray8_frame_is_used_as_is():
+    frame = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    assert np.shares_memory(_ctx(frame, PixelFormat.GRAY8).gray, frame)
+
+
+def test_yuyv_gray_is_contiguous_y_plane():
+    frame = np.random.default_rng(1).integers(0, 256, (8, 8, 2), dtype=np.uint8)
+    gray = _ctx(frame, PixelFormat.YUYV).gray
+    assert gray.flags.c_contiguous and np.array_equal(gray, frame[:, :, 0])
+
+
+def test_binary_memoized_per_threshold():
+    ctx = _ctx(_bgr())
+    low, high = ctx.binary(50), ctx.binary(200)
+    assert ctx.binary(50) is low
+    assert not np.shares_memory(low, high)
+    assert np.array_equal(low, np.where(ctx.gray > 50, 255, 0).astype(np.uint8))
+    assert np.array_equal(high, np.where(ctx.gray > 200, 255, 0).astype(np.uint8))
+
+
+def test_pyramid_and_brightness():
+    ctx = _ctx(_bgr(16, 16))
+    assert ctx.pyramid(0) is ctx.gray
+    assert ctx.pyramid(2).shape == (4, 4)
+    assert ctx.pyramid(1) is ctx.pyramid(1)
+
+    expected = float(cv2.mean(ctx.gray)[0])
+    assert ctx.histogram().sum() == 16 * 16
+    assert ctx.mean_brightness == pytest.approx(expected, abs=1e-3)
+
+
+def test_buffers_are_reused_across_frames():
+    buffers = ImageBuffers()
+    first = _ctx(_bgr(), buffers=buffers).gray
+    second = _ctx(_bgr(), buffers=buffers).gray
+    assert np.shares_memory(first, second)
@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import platform
+import sys
+import threading
+import time
+
+import pytest
+
+import src.data.shared_memory as shm_module
+
+
+def _load_copy(monkeypatch, sys_platform, machine):
+    """Свежая копия модуля под чужую платформу (основной модуль не трогаем)"""
+    monkeypatch.setattr(sys, "platform", sys_platform)
+    monkeypatch.setattr(platform, "machine", lambda: machine)
+    spec = importlib.util.spec_from_file_location("_shm_platform_copy", shm_module.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_no_futex_on_macos(monkeypatch):
+    for machine in ("arm64", "x86_64"):
+        module = _load_copy(monkeypatch, "darwin", machine)
+        assert module._SYS_FUTEX is None
+        assert module._libc is None
+
+
+def test_futex_numbers_on_linux(monkeypatch):
+    assert _load_copy(monkeypatch, "linux", "x86_64")._SYS_FUTEX == 202
+    assert _load_copy(monkeypatch, "linux", "aarch64")._SYS_FUTEX == 98
+    assert _load_copy(monkeypatch, "linux", "riscv64")._SYS_FUTEX is None
+
+
+@pytest.fixture
+def no_futex(monkeypatch):
+    """Путь без futex (как на macOS); поллинг со sleep запрещен — ждать можно только в select"""
+    monkeypatch.setattr(shm_module, "_libc", None)
+
+    def no_sleep(_):
+        raise AssertionError("FrameNotifier fell back to sleep polling")
+    monkeypatch.setattr(shm_module.time, "sleep", no_sleep)
+
+
+def _reader(mgr):
+    return shm_module.FrameNotifier(mgr.shm, shm_module.RingBufferLayout.NOTIFY_OFFSET)
+
+
+def test_wait_without_futex_blocks_until_notify(no_futex, shm):
+    reader = _reader(shm)
+    token = reader.current()
+    threading.Timer(0.05, shm.notifier.notify).start()
+
+    t0 = time.perf_counter()
+    assert reader.wait(token, 5.0)
+    assert 0.03 < time.perf_counter() - t0 < 1.0
+    reader.close()
+
+
+def test_wait_without_futex_times_out(no_futex, shm):
+    reader = _reader(shm)
+    t0 = time.perf_counter()
+    assert not reader.wait(reader.current(), 0.05)
+    assert time.perf_counter() - t0 >= 0.05
+    reader.close()
+
+
+def test_one_notify_wakes_every_fifo_reader(no_futex, shm):
+    readers = [_reader(shm) for _ in range(3)]
+    token = shm.notifier.current()
+    woke = []
+    threads = [threading.Thread(target=lambda r=r: woke.append(r.wait(token, 5.0))) for r in readers]
+    for t in threads:
+        t.start()
+    threading.Event().wait(0.1)  # Все читатели уже в select
+    shm.notifier.notify()
+    for t in threads:
+        t.join(2.0)
+    assert woke == [True, True, True]
+    for r in readers:
+        r.close()
+
+
+def test_fifo_cleanup(no_futex, shm):
+    reader = _reader(shm)
+    reader.wait(reader.current(), 0.01)
+    wake_dir = reader._wake_dir
+    assert len(os.listdir(wake_dir)) == 1
+    reader.close()
+    assert os.listdir(wake_dir) == []
+    shm.close()  # Владелец кольца удаляет каталог
+    assert not os.path.exists(wake_dir)
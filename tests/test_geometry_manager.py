@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.core.pipeline import FrameContext
+from src.data.models import KeypointTable
+from src.data.schemas import CameraConfig
+from src.plugins.geometry_manager import GeometryManager
+
+
+def _ctx(frame_id, xs):
+    ctx = FrameContext(np.zeros((4, 4), np.uint8), frame_id, CameraConfig(camera_id=0), camera_id=0)
+    points = KeypointTable.from_xy(np.array(xs, dtype=float), np.zeros(len(xs)))
+    points.id[:] = np.arange(1, len(xs) + 1)
+    ctx.set_data("vision", "keypoints", points)
+    return ctx
+
+
+def _tools_widget(ctx):
+    return next(w for w in ctx.ui.get_updates()["widgets"] if w.widget_id == "geometry_control").data["tools"]
+
+
+def test_published_geometry_is_a_frame_snapshot():
+    stage = GeometryManager()
+    stage.handle_command("cmd_add_tool", {"id": "d", "type": "distance", "points": [1, 2]})
+
+    first = _ctx(1, [0.0, 10.0])
+    stage.process(first)
+    # Следующий кадр (в конвейере — параллельно с сериализацией первого) и команда
+    stage.process(_ctx(2, [0.0, 30.0]))
+    stage.handle_command("cmd_add_tool", {"id": "e", "type": "distance", "points": [1, 2]})
+
+    overlay = first.get_data("overlay", "geometry")
+    assert list(overlay) == ["d"] and overlay["d"]["current"] == 10.0
+    assert _tools_widget(first)["d"]["current"] == 10.0
+    assert stage.tools["d"]["current"] == 30.0
+
+
+def test_state_transfer_does_not_share_tools():
+    old = GeometryManager()
+    old.handle_command("cmd_add_tool", {"id": "d", "type": "distance", "points": [1, 2]})
+
+    new = GeometryManager()
+    new.set_state(old.get_state())
+    old.handle_command("cmd_clear_all", {})
+    assert list(new.tools) == ["d"]
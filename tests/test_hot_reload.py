@@ -0,0 +1,153 @@
+import itertools
+import os
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+import src.core.processor as processor_module
+from src.core.config import settings
+from src.core.processor import Processor
+from src.data.schemas import CameraConfig
+
+_packages = itertools.count()
+
+PLUGIN = '''
+from src.core.pipeline import PipelineStage
+
+STEP = {step}
+
+
+class Counter(PipelineStage):
+    def __init__(self):
+        super().__init__("counter", reads=(), writes=("counter",))
+        self.count = 0
+        self.step = STEP
+
+    def process(self, ctx):
+        self.count += self.step
+        ctx.set_data("counter", "count", self.count)
+
+    def get_state(self):
+        return {{"count": self.count}}
+
+    def set_state(self, state):
+        self.count = state["count"]
+{extra}
+'''
+
+EXTRA_STAGE = '''
+
+class Extra(PipelineStage):
+    def __init__(self):
+        super().__init__("extra", reads=(), writes=("extra",))
+
+    def process(self, ctx):
+        pass
+'''
+
+
+class _Bus:
+    def __getattr__(self, name):
+        return lambda *a, **k: None
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    """Пакет-плагин во временной папке; plugin_modules() видит только его"""
+    package = f"bf_hot_{os.getpid()}_{next(_packages)}"
+    (tmp_path / package).mkdir()
+    (tmp_path / package / "__init__.py").write_text("")
+    path = tmp_path / package / "counter.py"
+    module_path = f"{package}.counter"
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(processor_module, "plugin_modules", lambda: {module_path: str(path)})
+
+    def write(step=1, extra="", raw=None):
+        path.write_text(raw if raw is not None else textwrap.dedent(PLUGIN.format(step=step, extra=extra)))
+        # mtime с точностью до секунды на части ФС: сдвигаем явно, чтобы изменение заметили
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000 * (write.n + 1)))
+        write.n += 1
+    write.n = 0
+    write.module_path = module_path
+    yield write
+    sys.modules.pop(module_path, None)
+    sys.modules.pop(package, None)
+
+
+@pytest.fixture
+def proc(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_WORKERS", 0)
+    monkeypatch.setattr(settings, "QOS_ENABLED", False)
+    monkeypatch.setattr(Processor, "_load_pipeline", lambda self: None)
+    p = Processor(_Bus(), camera_id=3)
+    yield p
+    p.close()
+
+
+def _run(proc, frame_id):
+    return proc.process_frame(np.zeros((4, 4), np.uint8), frame_id, CameraConfig(camera_id=3))
+
+
+def test_reload_swaps_code_and_keeps_state(plugin, proc):
+    plugin(step=1)
+    assert proc.reload_plugins()["added"] == ["counter"]
+    for i in range(3):
+        _run(proc, i)
+    old = proc._stage_map["counter"]
+    assert old.count == 3
+
+    plugin(step=10)
+    assert proc.changed_plugin_modules() == [plugin.module_path]
+    report = proc.reload_plugins([plugin.module_path])
+    new = proc._stage_map["counter"]
+
+    assert report["reloaded"] == ["counter"] and not report["failed"]
+    assert new is not old and proc.stages == [new]
+    assert (new.count, new.step) == (3, 10)  # Состояние старого экземпляра, код нового
+    assert new.camera_id == old.camera_id == 3
+    _run(proc, 3)
+    assert new.count == 13
+    assert proc.changed_plugin_modules() == []
+
+
+def test_broken_module_keeps_old_stage(plugin, proc):
+    plugin(step=1)
+    proc.reload_plugins()
+    old = proc._stage_map["counter"]
+
+    plugin(raw="def broken(:\n")
+    report = proc.reload_plugins([plugin.module_path])
+    assert plugin.module_path in report["failed"]
+    assert proc._stage_map["counter"] is old and proc.stages == [old]
+
+
+def test_added_and_removed_stages(plugin, proc):
+    plugin(step=1, extra=EXTRA_STAGE)
+    assert sorted(proc.reload_plugins()["added"]) == ["counter", "extra"]
+
+    plugin(step=1)
+    report = proc.reload_plugins([plugin.module_path])
+    assert report["removed"] == ["extra"]
+    assert [s.name for s in proc.stages] == ["counter"]
+    assert "extra" not in proc._health_map and "extra" not in proc._latency
+
+
+def test_swap_resets_health_and_survives_bad_state(plugin, proc):
+    plugin(step=1)
+    proc.reload_plugins()
+    old = proc._stage_map["counter"]
+    old.count = 5
+    proc._health_map["counter"].update(errors=20, active=False)
+
+    class Fresh(type(old)):
+        def set_state(self, state):
+            raise RuntimeError("incompatible state")
+
+    new = Fresh()
+    proc._swap_stage(old, new)
+    assert proc.stages == [new] and proc._stage_map["counter"] is new
+    assert new.count == 0  # Перенос не удался — новый экземпляр стартует с чистого листа
+    assert proc._health_map["counter"]["errors"] == 0 and proc._health_map["counter"]["active"]
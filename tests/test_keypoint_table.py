@@ -0,0 +1,104 @@
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from src.core import serialization
+from src.data.models import KeypointTable, Point2D
+from src.data.shared_memory import ResultsMemoryManager
+
+
+def _points():
+    return [
+        Point2D(x=10.0, y=20.0, id=3, label="ID 3", v_x=1.5, speed=2.0, age=4, is_stable=True,
+                ux=10.5, uy=19.5, wx=100.0, wy=200.0),
+        Point2D(x=30.0, y=40.0, confidence=0.5),  # Новая точка: без id и без координат ux/wx
+        Point2D(x=50.0, y=60.0, id=7, label="ID 7", age=1, ux=50.0, uy=60.0),
+    ]
+
+
+def test_from_points_matches_point2d_dump():
+    # Старый формат vision.keypoints: список Point2D -> [model_dump()]
+    points = _points()
+    table = KeypointTable.from_points(points)
+
+    assert len(table) == 3
+    assert table.to_records() == [p.model_dump() for p in points]
+    assert [row.model_dump() for row in table] == [p.model_dump() for p in points]
+
+
+def test_serialized_json_matches_old_output():
+    points, table = _points(), KeypointTable.from_points(_points())
+    assert json.loads(serialization.dumps({"keypoints": table})) == \
+        json.loads(serialization.dumps({"keypoints": points}))
+
+
+def test_from_xy_defaults():
+    table = KeypointTable.from_xy(np.array([1.0, 2.0]), np.array([3.0, 4.0]), np.array([0.9, 0.8]))
+    row = table[1]
+    assert (row.x, row.y, row.confidence) == (2.0, 4.0, 0.8)
+    assert row.id is None and row.ux is None and row.wx is None and row.label is None
+    assert row.age == 0 and row.is_stable is False and row.speed == 0.0
+
+
+def test_row_writes_go_to_columns():
+    table = KeypointTable.from_xy(np.array([1.0]), np.array([2.0]))
+    row = table[0]
+    row.id = 5
+    row.wx = 12.5
+    assert table.id[0] == 5 and table.wx[0] == 12.5
+    assert row.label == "ID 5"
+
+    row.id = None
+    row.wx = None
+    assert table.id[0] == -1 and math.isnan(table.wx[0])
+    assert row.id is None and row.wx is None
+
+
+def test_lookup_and_indexing():
+    table = KeypointTable.from_points(_points())
+    assert table.find(7).x == 50.0
+    assert table.find(42) is None
+    assert table[-1].id == 7
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_select_copy_concat_do_not_share_columns():
+    table = KeypointTable.from_points(_points())
+
+    stable = table.select(table.is_stable)
+    assert [p.id for p in stable] == [3]
+    stable.x[0] = -1.0
+    assert table.x[0] == 10.0
+
+    clone = table.copy()
+    clone.age[:] = 0
+    assert table.age.tolist() == [4, 0, 1]
+
+    joined = table.concat(KeypointTable.from_xy(np.array([9.0]), np.array([9.0])))
+    assert len(joined) == 4 and joined[3].id is None and joined[0].id == 3
+
+
+def test_from_points_passes_table_through():
+    table = KeypointTable.from_points(_points())
+    assert KeypointTable.from_points(table) is table
+    assert len(KeypointTable.from_points([])) == 0
+    assert KeypointTable().to_records() == []
+
+
+def test_results_ring_same_rows_from_table_and_points():
+    # Столбцы таблицы и старый путь по Point2D пишут в SHM результатов одно и то же
+    res = ResultsMemoryManager(f"bf_test_res_{os.getpid()}", create=True, capacity=4, max_points=8)
+    try:
+        res.write(1, 0.0, _points())
+        res.write(2, 0.0, KeypointTable.from_points(_points()))
+        _, _, _, from_points = res.read(1)
+        _, _, _, from_table = res.read(2)
+        assert len(from_table) == 3
+        assert from_table.tobytes() == from_points.tobytes()
+        assert from_table["id"].tolist() == [3, -1, 7]
+    finally:
+        res.close()
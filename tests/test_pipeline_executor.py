@@ -0,0 +1,149 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.core.pipeline import PipelineStage
+from src.core.processor import Processor, _conflicts
+from src.data.schemas import CameraConfig
+
+
+class _Bus:
+    def __init__(self):
+        self.packets = []
+
+    def publish_stream(self, data):
+        self.packets.append(data)
+
+    def __getattr__(self, name):
+        return lambda *a, **k: None
+
+
+class _Stage(PipelineStage):
+    """Стадия-заглушка: пишет журнал (start/end, frame_id) и может ждать на событии"""
+
+    def __init__(self, name, log, reads=(), writes=(), delay=None, gate=None):
+        super().__init__(name, reads=reads, writes=writes)
+        self.log = log
+        self.delay = delay or {}
+        self.gate = gate
+
+    def process(self, ctx):
+        self.log.append(("start", self.name, ctx.frame_id))
+        if self.gate is not None:
+            assert self.gate.wait(2.0)
+        time.sleep(self.delay.get(ctx.frame_id, 0.0))
+        self.log.append(("end", self.name, ctx.frame_id))
+
+
+@pytest.fixture
+def make_processor(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_WORKERS", 4)
+    monkeypatch.setattr(settings, "PIPELINE_DEPTH", 2)
+    monkeypatch.setattr(settings, "QOS_ENABLED", False)
+    monkeypatch.setattr(Processor, "_load_pipeline", lambda self: None)
+    made = []
+
+    def make(*stages):
+        proc = Processor(_Bus(), camera_id=0)
+        for stage in stages:
+            proc._register_stage(stage, is_core=False)
+        made.append(proc)
+        return proc
+
+    yield make
+    for proc in made:
+        proc.close()
+
+
+def _submit(proc, frame_id, done=None):
+    on_done = (lambda ctx, ms: done.append(ctx.frame_id)) if done is not None else None
+    return proc.submit_frame(np.zeros((4, 4), np.uint8), frame_id, CameraConfig(camera_id=0), on_done=on_done)
+
+
+def _pos(log, kind, name, frame_id):
+    return log.index((kind, name, frame_id))
+
+
+def test_conflict_rules():
+    def s(reads, writes):
+        return PipelineStage("s", reads=reads, writes=writes)
+
+    assert _conflicts(s((), ("vision.keypoints",)), s(("vision",), ()))  # Запись -> чтение (префикс)
+    assert _conflicts(s((), ("overlay.geometry",)), s((), ("overlay.geometry",)))  # Запись / запись
+    assert _conflicts(s(("vision.keypoints",), ()), s((), ("vision.keypoints",)))  # Чтение -> запись
+    assert not _conflicts(s(("vision.keypoints",), ("overlay.a",)), s(("vision.keypoints",), ("overlay.b",)))
+    assert not _conflicts(s((), ("vision.keypoints",)), s(("vision.keypoints_raw",), ()))
+    # Без объявлений — "*": барьер для всех, кто что-то читает или пишет
+    assert _conflicts(PipelineStage("barrier"), s(("sys_load",), ()))
+    assert _conflicts(s((), ("sys_load",)), PipelineStage("barrier"))
+
+
+def test_dag_orders_dependent_stages_and_runs_independent_in_parallel(make_processor):
+    log = []
+    both = threading.Barrier(2, timeout=2.0)
+
+    class _Meet(_Stage):
+        def process(self, ctx):
+            both.wait()  # Дождется, только если соседняя стадия идет одновременно
+            super().process(ctx)
+
+    proc = make_processor(
+        _Meet("detect", log, writes=("vision.keypoints",)),
+        _Meet("monitor", log, writes=("sys_load",)),
+        _Stage("geometry", log, reads=("vision.keypoints",), writes=("overlay.geometry",)),
+    )
+    assert proc._build_graph() == {"detect": [], "monitor": [], "geometry": ["detect"]}
+
+    _submit(proc, 1).done.wait(2.0)
+    assert _pos(log, "end", "detect", 1) < _pos(log, "start", "geometry", 1)
+
+
+def test_write_write_conflict_never_overlaps(make_processor):
+    log = []
+    proc = make_processor(
+        _Stage("a", log, writes=("overlay.geometry",), delay={1: 0.05}),
+        _Stage("b", log, writes=("overlay.geometry",)),
+    )
+    _submit(proc, 1).done.wait(2.0)
+    assert _pos(log, "end", "a", 1) < _pos(log, "start", "b", 1)
+
+
+def test_stage_sees_frames_in_order(make_processor):
+    # Кадр 2 у "b" готов раньше (a быстрее на кадре 2), но стадия с состоянием ждет свой кадр 1
+    log = []
+    proc = make_processor(
+        _Stage("a", log, writes=("x",), delay={1: 0.05}),
+        _Stage("b", log, reads=("x",), writes=("y",)),
+        _Stage("c", log, writes=("z",), delay={1: 0.08}),
+    )
+    _submit(proc, 1)
+    _submit(proc, 2)
+    assert proc.drain(2.0)
+    for name in ("a", "b", "c"):
+        assert _pos(log, "end", name, 1) < _pos(log, "start", name, 2)
+
+
+def test_frames_publish_in_order(make_processor):
+    log, done = [], []
+    proc = make_processor(_Stage("slow_first", log, writes=("x",), delay={1: 0.05}),
+                          _Stage("other", log, writes=("y",)))
+    for fid in (1, 2):
+        _submit(proc, fid, done)
+    assert proc.drain(2.0)
+
+    assert done == [1, 2]
+    assert [p.split(b'"frame_id":')[1].split(b",")[0] for p in proc.bus.packets] == [b"1", b"2"]
+
+
+def test_drain_waits_for_frames_in_work(make_processor):
+    log, gate = [], threading.Event()
+    proc = make_processor(_Stage("blocked", log, writes=("x",), gate=gate))
+    job = _submit(proc, 1)
+
+    assert proc.drain(timeout=0.05) is False
+    gate.set()
+    assert proc.drain(timeout=2.0) is True
+    assert job.done.is_set() and not proc._jobs
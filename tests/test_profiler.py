@@ -0,0 +1,121 @@
+import json
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.core.pipeline import PipelineStage
+from src.core.processor import Processor
+from src.core.profiler import FRAME_FILE, SamplingProfiler
+from src.data.schemas import CameraConfig
+
+
+class _Bus:
+    """Шина-заглушка: publish_stream зовется из _finish_frame, т.е. внутри Processor, но вне стадий"""
+
+    def __init__(self, on_publish=None):
+        self.on_publish = on_publish
+
+    def publish_stream(self, data):
+        if self.on_publish:
+            self.on_publish(sys._getframe())
+
+    def __getattr__(self, name):
+        return lambda *a, **k: None
+
+
+class _Stage(PipelineStage):
+    def __init__(self, name, on_process):
+        super().__init__(name)
+        self.on_process = on_process
+
+    def process(self, ctx):
+        self.on_process(sys._getframe())
+
+
+@pytest.fixture
+def make_processor(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_WORKERS", 0)
+    monkeypatch.setattr(settings, "QOS_ENABLED", False)
+    monkeypatch.setattr(Processor, "_load_pipeline", lambda self: None)
+    made = []
+
+    def make(bus, *stages):
+        proc = Processor(bus, camera_id=0)
+        for stage in stages:
+            proc._register_stage(stage, is_core=False)
+        made.append(proc)
+        return proc
+
+    yield make
+    for proc in made:
+        proc.close()
+
+
+def _run_frame(proc):
+    proc.process_frame(np.zeros((4, 4, 3), np.uint8), 1, CameraConfig(camera_id=0))
+
+
+def test_sample_is_attributed_to_running_stage(make_processor, tmp_path):
+    prof = SamplingProfiler(0, out_dir=tmp_path)
+    proc = make_processor(_Bus(), _Stage("alpha", prof._sample), _Stage("beta", prof._sample))
+    _run_frame(proc)
+
+    assert set(prof._stacks) == {"alpha", "beta"} and prof._samples == 2
+    (stack,) = prof._stacks["alpha"]
+    # Стек стадии обрезан под _execute_stage: общего префикса пайплайна в нем нет
+    assert stack.endswith("test_profiler.py:process")
+    assert "_execute_stage" not in stack and "process_frame" not in stack
+
+
+def test_processor_time_outside_stages_goes_to_frame_file(make_processor, tmp_path):
+    prof = SamplingProfiler(0, out_dir=tmp_path)
+    proc = make_processor(_Bus(on_publish=prof._sample))
+    _run_frame(proc)
+
+    (stack,) = prof._stacks[FRAME_FILE]
+    # Вне стадии стек полный: видно, из какой фазы кадра пришел сэмпл
+    assert "processor.py:_finish_frame" in stack and stack.endswith("test_profiler.py:publish_stream")
+
+
+def test_stacks_outside_processor_are_ignored(tmp_path):
+    prof = SamplingProfiler(0, out_dir=tmp_path)
+    prof._sample(sys._getframe())
+    assert prof._samples == 0 and not prof._stacks
+
+
+def test_frames_autostop_writes_folded_and_summary(make_processor, tmp_path):
+    prof = SamplingProfiler(3, out_dir=tmp_path)
+    proc = make_processor(_Bus(), _Stage("slow", lambda frame: time.sleep(0.02)))
+    prof.start(frames=3, interval_ms=1)
+    assert prof.running
+
+    reports = []
+    for _ in range(3):
+        _run_frame(proc)
+        reports.append(prof.on_frame())
+    assert reports[:2] == [None, None] and not prof.running
+
+    report = reports[2]
+    assert report is prof.stop() and report["frames"] == 3
+    assert report["samples"] > 0 and "slow" in report["stages"]
+
+    path = tmp_path / report["session"]
+    assert json.loads((path / "summary.json").read_text())["stages"].keys() == report["stages"].keys()
+    lines = (path / report["stages"]["slow"]["file"]).read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == report["stages"]["slow"]["samples"]
+
+
+def test_start_while_running_keeps_session(tmp_path):
+    prof = SamplingProfiler(0, out_dir=tmp_path)
+    prof.start(seconds=5, interval_ms=50)
+    try:
+        thread = prof._thread
+        assert prof.start(frames=1)["running"] and prof._thread is thread and prof._max_frames is None
+    finally:
+        report = prof.stop()
+    assert not prof.running and report["frames"] == 0
+    assert prof.stop() is report  # Без сессии — прошлый отчет
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+from src.core.config import settings
+from src.core.scheduler import StageScheduler, FrameBudgetGovernor, QOS_PAUSED
+from src.core.telemetry import RollingHistogram
+
+BUDGET_MS = 10.0
+
+
+def _stage(name, priority=0):
+    return SimpleNamespace(name=name, rate_hz=None, phase=None, priority=priority)
+
+
+class _Rig:
+    """Governor + стадии с заданной ценой (мс за кадр); шаг = QOS_INTERVAL_S, 20 кадров и одна оценка"""
+
+    def __init__(self, stages, costs, core=()):
+        self.sched = StageScheduler(fps=90)
+        self.gov = FrameBudgetGovernor(self.sched, BUDGET_MS)
+        self.stages = stages
+        self.costs = costs
+        self.health = {s.name: {"is_core": s.name in core, "active": True} for s in stages}
+        self.latency = {s.name: RollingHistogram(windows=(settings.QOS_WINDOW_S,)) for s in stages}
+        self.now = 0.0
+
+    def step(self, frame_ms):
+        for i in range(20):
+            t = self.now + (i + 1) * settings.QOS_INTERVAL_S / 20
+            self.gov.observe(frame_ms, t)
+            for s in self.stages:
+                self.latency[s.name].record(self.costs[s.name], t)
+        self.now += settings.QOS_INTERVAL_S
+        self.gov.evaluate(self.now, self.stages, self.health, self.latency)
+
+    def levels(self):
+        return {s.name: self.sched.level(s.name) for s in self.stages}
+
+
+def test_over_budget_degrades_lowest_priority_first():
+    rig = _Rig([_stage("heatmap", priority=0), _stage("overlay", priority=5), _stage("vision")],
+               {"heatmap": 1.0, "overlay": 9.0, "vision": 20.0}, core=("vision",))
+    rig.step(30.0)
+    assert rig.levels() == {"heatmap": 1, "overlay": 0, "vision": 0}
+
+
+def test_equal_priority_degrades_biggest_spender():
+    rig = _Rig([_stage("a"), _stage("b")], {"a": 1.0, "b": 6.0})
+    rig.step(30.0)
+    assert rig.levels() == {"a": 0, "b": 1}
+
+
+def test_steps_down_to_pause_and_never_touches_core():
+    rig = _Rig([_stage("plugin"), _stage("vision")], {"plugin": 5.0, "vision": 20.0}, core=("vision",))
+    for _ in range(QOS_PAUSED + 3):
+        rig.step(30.0)
+    assert rig.levels() == {"plugin": QOS_PAUSED, "vision": 0}
+
+
+def _calm_steps_until_restore(rig, limit=20):
+    """Сколько спокойных оценок прошло до ближайшего восстановления"""
+    before = rig.levels()
+    for n in range(1, limit + 1):
+        rig.step(BUDGET_MS * settings.QOS_RESTORE_RATIO / 2)
+        if rig.levels() != before:
+            return n
+    return None
+
+
+def test_restores_after_hold_in_reverse_order():
+    rig = _Rig([_stage("a"), _stage("b", priority=1)], {"a": 5.0, "b": 5.0})
+    rig.step(30.0)
+    rig.health["a"]["active"] = False  # a выключен — следующей ступенью замедляется b
+    rig.step(30.0)
+    rig.health["a"]["active"] = True
+    assert rig.levels() == {"a": 1, "b": 1}
+
+    # Первые спокойные оценки еще видят хвост перегрузки: считаем не меньше HOLD
+    assert _calm_steps_until_restore(rig) >= settings.QOS_RESTORE_HOLD
+    assert rig.levels() == {"a": 1, "b": 0}  # Последний замедленный возвращается первым
+    assert _calm_steps_until_restore(rig) == settings.QOS_RESTORE_HOLD
+    assert rig.levels() == {"a": 0, "b": 0}
+
+
+def test_within_budget_but_no_headroom_holds_levels():
+    rig = _Rig([_stage("a")], {"a": 5.0})
+    rig.step(30.0)
+    for _ in range(settings.QOS_RESTORE_HOLD * 2):
+        rig.step(BUDGET_MS * 0.9)  # В бюджете, но без запаса QOS_RESTORE_RATIO
+    assert rig.levels() == {"a": 1}
+
+
+def test_forget_drops_stage_state():
+    rig = _Rig([_stage("a")], {"a": 5.0})
+    rig.step(30.0)
+    rig.gov.forget("a")
+    assert rig.levels() == {"a": 0} and rig.gov._degraded == []
@@ -0,0 +1,22 @@
+import os
+
+from src.core.config import settings
+from src.core.recorder import SessionRecorder
+from src.data.models import PixelFormat, SharedMemoryConfig
+from src.data.shared_memory import SharedMemoryManager
+
+
+def test_legacy_shm_name_uses_slot_pixel_format(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CAMERA_HEIGHT", 6)
+    monkeypatch.setattr(settings, "CAMERA_WIDTH", 8)
+    monkeypatch.setattr(settings, "SHM_PIXEL_FORMAT", PixelFormat.GRAY8)
+    monkeypatch.setattr(settings, "SHM_REGISTRY_NAME", f"bf_test_no_reg_{os.getpid()}")
+    ring = SharedMemoryManager(SharedMemoryConfig(name=f"bf_test_rec_{os.getpid()}", size=0, shape=(6, 8),
+                                                  pixel_format=PixelFormat.GRAY8))
+    try:
+        rec = SessionRecorder(str(tmp_path / "s.bfm"), shm_name=ring.name)
+        rec.start()
+        assert rec.is_recording and rec.shm.shape == (6, 8)
+        rec.stop()
+    finally:
+        ring.close()
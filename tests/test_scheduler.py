@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+from src.core.scheduler import StageScheduler, QOS_PAUSED
+
+
+def _stage(name, rate_hz=None, phase=None, priority=0):
+    return SimpleNamespace(name=name, rate_hz=rate_hz, phase=phase, priority=priority)
+
+
+def _runs(scheduler, stage, frames):
+    """Кадры (от 0), в которые стадия запускается"""
+    due = []
+    for frame in range(frames):
+        scheduler._frame = frame
+        if scheduler.is_due(stage):
+            due.append(frame)
+    return due
+
+
+def test_period_from_rate():
+    sched = StageScheduler(fps=90)
+    assert sched.period_for(_stage("calib", rate_hz=15)) == 6
+    assert sched.period_for(_stage("monitor", rate_hz=2)) == 45
+    assert sched.period_for(_stage("vision")) == 1
+    assert sched.period_for(_stage("fast", rate_hz=500)) == 1  # Чаще кадров не бывает
+
+
+def test_rate_holds_over_a_second():
+    sched = StageScheduler(fps=90)
+    calib, vision = _stage("calib", rate_hz=15), _stage("vision")
+    sched.plan([calib, vision], {})
+    assert len(_runs(sched, calib, 90)) == 15
+    assert len(_runs(sched, vision, 90)) == 90
+
+
+def test_phases_spread_over_frames():
+    # Три стадии по 15 Hz при 90 FPS: каждая в свой кадр, а не все в кадр 0
+    sched = StageScheduler(fps=90)
+    stages = [_stage(f"p{i}", rate_hz=15) for i in range(3)]
+    sched.plan(stages, {"p0": 1.0, "p1": 5.0, "p2": 3.0})
+
+    phases = {name: phase for name, (_, phase) in sched._plan.items()}
+    assert len(set(phases.values())) == 3
+    assert phases["p1"] == 0  # Самая тяжелая выбирает первой
+    runs = [set(_runs(sched, s, 90)) for s in stages]
+    assert not (runs[0] & runs[1]) and not (runs[1] & runs[2]) and not (runs[0] & runs[2])
+
+
+def test_low_rate_stage_avoids_busy_frame():
+    sched = StageScheduler(fps=90)
+    calib, monitor = _stage("calib", rate_hz=15), _stage("monitor", rate_hz=2)
+    sched.plan([calib, monitor], {"calib": 8.0, "monitor": 4.0})
+    calib_phase, monitor_phase = sched._plan["calib"][1], sched._plan["monitor"][1]
+    assert monitor_phase % 6 != calib_phase
+
+
+def test_explicit_phase_kept_modulo_period():
+    sched = StageScheduler(fps=90)
+    sched.plan([_stage("calib", rate_hz=15, phase=8)], {})
+    assert sched._plan["calib"] == (6, 2)
+
+
+def test_priority_picks_before_cost():
+    sched = StageScheduler(fps=90)
+    sched.plan([_stage("heavy", rate_hz=15), _stage("important", rate_hz=15, priority=10)],
+               {"heavy": 50.0, "important": 1.0})
+    assert sched._plan["important"][1] == 0
+
+
+def test_replan_on_fps_drift():
+    sched = StageScheduler(fps=90)
+    calib = _stage("calib", rate_hz=15)
+    calls = []
+
+    def costs():
+        calls.append(sched.fps)
+        return {}
+
+    now = 0.0
+    for _ in range(StageScheduler.WARMUP_FRAMES + 200):
+        sched.begin_frame(now, [calib], costs)
+        now += 1 / 30  # Камера отдает 30 вместо 90
+    assert len(calls) >= 2
+    assert sched.period_for(calib) == 2  # 15 Hz при 30 FPS
+
+
+def test_qos_levels_slow_down_and_pause():
+    sched = StageScheduler(fps=90)
+    calib = _stage("calib", rate_hz=15)
+
+    sched.set_level("calib", 2)
+    assert sched.period_for(calib) == 24
+    assert sched.qos_state(calib) == {"level": 2, "paused": False, "rate_hz": 3.75}
+
+    sched.set_level("calib", QOS_PAUSED)
+    sched.plan([calib], {})
+    assert _runs(sched, calib, 90) == []
+    assert sched.qos_state(calib)["paused"] is True
+
+    sched.set_level("calib", 0)
+    assert sched.qos_state(calib) is None and sched.period_for(calib) == 6
@@ -0,0 +1,43 @@
+import json
+import time
+
+import numpy as np
+
+from src.core import serialization
+from src.core.event_bus import EventBus, TRANSPORT_NATIVE
+from src.data.models import Point2D
+
+
+class _Plain:
+    def __init__(self):
+        self.a = 1
+
+
+def test_dumps_handles_numpy_models_and_int_keys():
+    packet = {
+        0: {"fps": np.float32(30.5), "count": np.int64(3)},
+        "points": np.array([[1, 2], [3, 4]], dtype=np.int32),
+        "point": Point2D(x=1.0, y=2.0),
+        "plain": _Plain(),
+    }
+    data = json.loads(serialization.dumps(packet))
+    assert data["0"] == {"fps": 30.5, "count": 3}
+    assert data["points"] == [[1, 2], [3, 4]]
+    assert data["point"] == Point2D(x=1.0, y=2.0).model_dump()
+    assert data["plain"] == {"a": 1}
+
+
+def test_unknown_type_falls_back_to_str():
+    assert json.loads(serialization.dumps({"s": {1, 2}.__iter__()}))["s"].startswith("<set_iterator")
+
+
+def test_bus_passes_serialized_bytes_through():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    payload = serialization.dumps({"frame_id": 1, "results": {0: np.arange(3)}})
+    bus.publish_stream(payload)
+
+    items, deadline = [], time.time() + 2.0
+    while not items and time.time() < deadline:
+        items = bus.get_stream_batch(timeout=0.05)
+    assert items == [payload] and isinstance(items[0], bytes)
+    assert json.loads(items[0]) == {"frame_id": 1, "results": {"0": [0, 1, 2]}}
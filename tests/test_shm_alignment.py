@@ -0,0 +1,72 @@
+import os
+import resource
+
+import numpy as np
+import pytest
+
+import src.data.shared_memory as shm_module
+from src.core.config import settings
+from src.data.models import SharedMemoryConfig
+from src.data.shared_memory import (CACHE_LINE, PAGE_SIZE, RingBufferLayout, SharedMemoryManager,
+                                    VideoFrameLayout)
+
+
+@pytest.mark.parametrize("shape", [(8, 8, 3), (480, 640), (480, 640, 2), (1080, 1920, 3)])
+def test_slot_size_and_pixels_are_page_aligned(shape):
+    assert VideoFrameLayout.get_slot_size(shape) % PAGE_SIZE == 0
+    assert VideoFrameLayout.HEADER_SIZE % PAGE_SIZE == 0
+    assert VideoFrameLayout.get_slot_size(shape) >= VideoFrameLayout.HEADER_SIZE + np.prod(shape)
+
+
+def test_header_layout():
+    assert RingBufferLayout.GLOBAL_HEADER_SIZE == PAGE_SIZE
+    assert RingBufferLayout.LEASE_OFFSET % CACHE_LINE == 0
+    assert VideoFrameLayout.META_SIZE <= CACHE_LINE  # seq + заголовок кадра — одна cache line
+
+
+def test_every_slot_pixel_view_starts_on_a_page(shm):
+    for idx in range(shm.capacity):
+        slot = RingBufferLayout.get_slot_view(shm.shm.buf, idx, shm.slot_size)
+        pixels = VideoFrameLayout.get_pixel_view(slot, shm.shape, shm.dtype)
+        assert pixels.ctypes.data % PAGE_SIZE == 0
+        del pixels, slot
+
+
+def _ring(shape=(512, 512, 3)):
+    cfg = SharedMemoryConfig(name=f"bf_test_align_{os.getpid()}", size=0, shape=shape)
+    return SharedMemoryManager(cfg, create=True)
+
+
+def _faults_while_writing(mgr) -> int:
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    pages = np.frombuffer(mgr.shm.buf, dtype=np.uint8)
+    pages[::PAGE_SIZE] = 1
+    del pages
+    return resource.getrusage(resource.RUSAGE_SELF).ru_minflt - before
+
+
+@pytest.mark.parametrize("prefault", [True, False])
+def test_prefault_moves_page_faults_to_allocation(monkeypatch, prefault):
+    monkeypatch.setattr(settings, "SHM_HUGEPAGES", False)  # THP сократил бы число fault'ов
+    monkeypatch.setattr(settings, "SHM_PREFAULT", prefault)
+    mgr = _ring()
+    try:
+        n_pages = mgr.size // PAGE_SIZE
+        faults = _faults_while_writing(mgr)
+        if prefault:
+            assert faults < n_pages // 4
+        else:
+            assert faults >= n_pages // 2
+    finally:
+        mgr.close()
+
+
+def test_rejected_kernel_hints_are_not_fatal(monkeypatch):
+    # madvise с неизвестным advice -> EINVAL: кольцо все равно создается
+    monkeypatch.setattr(settings, "SHM_HUGEPAGES", True)
+    monkeypatch.setattr(shm_module.mmap, "MADV_HUGEPAGE", 0x7FFF, raising=False)
+    mgr = _ring((8, 8, 3))
+    try:
+        assert RingBufferLayout.get_capacity(mgr.shm.buf) == mgr.capacity
+    finally:
+        mgr.close()
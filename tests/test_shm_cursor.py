@@ -0,0 +1,81 @@
+import threading
+import time
+
+
+def _read_all(cursor):
+    ids = []
+    while True:
+        view = cursor.read_next()
+        if view is None:
+            return ids
+        ids.append((view.frame_id, view.overrun))
+        view.release()
+
+
+def test_read_next_returns_every_frame_in_order(shm, write_frame):
+    cursor = shm.cursor()
+    for fid in range(1, 5):
+        write_frame(shm, fid)
+    assert _read_all(cursor) == [(1, 0), (2, 0), (3, 0), (4, 0)]
+    assert cursor.read_next() is None
+
+    write_frame(shm, 5)
+    assert _read_all(cursor) == [(5, 0)]
+
+
+def test_read_latest_skips_to_newest(shm, write_frame):
+    cursor = shm.cursor()
+    for fid in range(1, 4):
+        write_frame(shm, fid)
+    view = cursor.read_latest()
+    assert view.frame_id == 3
+    view.release()
+    assert cursor.read_latest() is None  # Новее прочитанного ничего нет
+
+
+def test_overrun_counts_lost_frames(shm, write_frame):
+    cursor = shm.cursor()
+    write_frame(shm, 1)
+    assert _read_all(cursor) == [(1, 0)]
+
+    # Писатель обогнал читателя на кольцо: кадры 2..(lost+1) перезаписаны
+    lost = 3
+    for fid in range(2, shm.capacity + lost + 2):
+        write_frame(shm, fid)
+    frames = _read_all(cursor)
+    assert frames[0] == (lost + 2, lost)
+    assert [fid for fid, _ in frames] == list(range(lost + 2, shm.capacity + lost + 2))
+    assert cursor.overrun_total == lost
+
+
+def test_cursors_are_independent(shm, write_frame):
+    recorder, preview = shm.cursor(), shm.cursor()
+    for fid in range(1, 4):
+        write_frame(shm, fid)
+
+    view = preview.read_latest()
+    assert view.frame_id == 3
+    view.release()
+    assert [fid for fid, _ in _read_all(recorder)] == [1, 2, 3]
+
+
+def test_cursor_starts_after_given_frame(shm, write_frame):
+    for fid in range(1, 5):
+        write_frame(shm, fid)
+    assert [fid for fid, _ in _read_all(shm.cursor(after_frame_id=2))] == [3, 4]
+
+
+def test_timeout_waits_for_next_publish(shm, write_frame):
+    cursor = shm.cursor()
+    t0 = time.perf_counter()
+    assert cursor.read_next(timeout=0.05) is None
+    assert time.perf_counter() - t0 >= 0.04
+
+    timer = threading.Timer(0.05, write_frame, args=(shm, 10))
+    timer.start()
+    try:
+        view = cursor.read_next(timeout=2.0)
+        assert view is not None and view.frame_id == 10
+        view.release()
+    finally:
+        timer.join()
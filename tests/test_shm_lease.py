@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+from src.data.shared_memory import RingBufferLayout, VideoFrameLayout, LEASE_FOREVER
+
+
+def test_timed_lease_expires(shm):
+    head = RingBufferLayout.get_write_index(shm.shm.buf)
+    nxt = (head + 1) % shm.capacity
+    shm.pin_slot(nxt, timeout=0.01)
+    assert shm.next_write_slot() != nxt
+    time.sleep(0.02)
+    # Срок вышел — писатель снимает аренду и пишет в слот
+    assert shm.next_write_slot() == nxt
+    assert shm.lease_stats()["lease_expired"] == 1
+
+
+def test_forever_lease_survives_timeout(shm, monkeypatch):
+    monkeypatch.setattr("src.data.shared_memory.settings.SHM_LEASE_TIMEOUT", 0.01)
+    head = RingBufferLayout.get_write_index(shm.shm.buf)
+    nxt = (head + 1) % shm.capacity
+    lease = shm.pin_slot(nxt, timeout=LEASE_FOREVER)
+    assert lease == LEASE_FOREVER
+    time.sleep(0.02)
+    assert shm.next_write_slot() != nxt
+    assert shm.lease_stats()["lease_expired"] == 0
+
+    shm.unpin_slot(nxt, lease)
+    assert shm.next_write_slot() == nxt
+
+
+def test_shorter_pin_keeps_forever_lease(shm):
+    lease = shm.pin_slot(3, timeout=LEASE_FOREVER)
+    # Читатель с обычной арендой не укорачивает бессрочную и не снимает ее
+    other = shm.pin_slot(3, timeout=0.01)
+    shm.unpin_slot(3, other)
+    assert RingBufferLayout.get_lease(shm.shm.buf, 3) == lease
+
+
+def test_writer_never_takes_head_and_skips_pinned_view(shm, write_frame):
+    head = write_frame(shm, 1)
+    with shm.read_latest() as view:
+        assert view.pin()
+        written = [write_frame(shm, fid) for fid in range(2, shm.capacity + 3)]
+        assert head not in written  # Арендованный слот писатель обходит
+        assert view.is_valid() and view.frame_id == 1
+    # release() снял аренду: слот снова в обороте
+    assert RingBufferLayout.get_lease(shm.shm.buf, head) == 0
+    assert shm.lease_stats()["skipped"] > 0
+
+
+def test_pin_fails_if_slot_already_overwritten(shm, write_frame):
+    idx = write_frame(shm, 1)
+    view = shm.open_slot(idx)
+    slot = RingBufferLayout.get_slot_view(shm.shm.buf, idx, shm.slot_size)
+    VideoFrameLayout.write_to_buf(slot, np.zeros(shm.shape, np.uint8), 2, 2.0)
+    del slot
+
+    assert not view.pin()
+    assert RingBufferLayout.get_lease(shm.shm.buf, idx) == 0  # Аренда не осталась висеть
+    view.release()
+
+
+def test_all_leased_falls_back_to_next_slot(shm):
+    head = RingBufferLayout.get_write_index(shm.shm.buf)
+    for idx in range(shm.capacity):
+        if idx != head:
+            shm.pin_slot(idx, timeout=10.0)
+    assert shm.next_write_slot() == (head + 1) % shm.capacity
+    assert shm.lease_stats()["skipped"] == shm.capacity - 1
+
+
+def test_unpin_keeps_newer_foreign_lease(shm):
+    first = shm.pin_slot(4, timeout=0.05)
+    second = shm.pin_slot(4, timeout=10.0)  # Второй читатель продлил аренду
+    shm.unpin_slot(4, first)
+    assert RingBufferLayout.get_lease(shm.shm.buf, 4) == second
+    shm.unpin_slot(4, second)
+    assert RingBufferLayout.get_lease(shm.shm.buf, 4) == 0
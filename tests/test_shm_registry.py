@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from src.core.config import settings
+from src.data.models import SharedMemoryConfig
+from src.data.shared_memory import SharedMemoryManager, ShmRegistry
+
+
+@pytest.fixture
+def registry():
+    reg = ShmRegistry(name=f"bf_test_reg_{os.getpid()}", create=True, capacity=4)
+    yield reg
+    reg.close()
+
+
+@pytest.fixture
+def ring():
+    mgr = SharedMemoryManager(SharedMemoryConfig(name=f"bf_test_ring_{os.getpid()}", size=0, shape=(4, 4, 3)))
+    yield mgr
+    mgr.close()
+
+
+def test_entries_include_ids_beyond_capacity(registry, ring):
+    # 5 % 4 = слот 1, 2 — свой слот: обе камеры должны попасть в entries()
+    registry.publish(5, ring, session_id=1)
+    registry.publish(2, ring, session_id=1)
+
+    assert sorted(e.camera_id for e in registry.entries()) == [2, 5]
+    assert registry.lookup(5).name == ring.name
+    assert registry.lookup(1) is None  # Слот 1 занят камерой 5
+
+
+def test_entries_skip_withdrawn(registry, ring):
+    registry.publish(5, ring, session_id=1)
+    registry.publish(2, ring, session_id=1)
+    registry.withdraw(5)
+
+    assert [e.camera_id for e in registry.entries()] == [2]
+    assert registry.lookup(5).active is False
+
+
+def _attach(name, shape):
+    return SharedMemoryManager(SharedMemoryConfig(name=name, size=0, shape=shape), create=False)
+
+
+def test_attach_rejects_wrong_frame_size():
+    # Слоты выровнены по страницам: кадр берем крупнее страницы, чтобы размеры разошлись
+    ring = SharedMemoryManager(SharedMemoryConfig(name=f"bf_test_big_{os.getpid()}", size=0, shape=(64, 64, 3)))
+    try:
+        with pytest.raises(ValueError):
+            _attach(ring.name, (64, 64))  # GRAY8 вместо BGR: другой размер сегмента
+
+        reader = _attach(ring.name, (64, 64, 3))
+        assert reader.shm is not None
+        reader.close()
+    finally:
+        ring.close()
+
+
+def test_attach_rejects_shape_mismatch_with_registry(monkeypatch, registry, ring):
+    monkeypatch.setattr(settings, "SHM_REGISTRY_NAME", registry.name)
+    registry.publish(1, ring, session_id=1)
+
+    with pytest.raises(ValueError):
+        _attach(ring.name, (4, 12))  # Те же 48 байт, но другая форма — ловит только реестр
+
+    reader = _attach(ring.name, (4, 4, 3))
+    assert reader.shm is not None
+    reader.close()
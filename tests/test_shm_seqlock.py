@@ -0,0 +1,80 @@
+import numpy as np
+
+from src.data.models import SharedMemoryConfig
+from src.data.shared_memory import SharedMemoryManager, RingBufferLayout, VideoFrameLayout
+
+
+def _slot(mgr, idx):
+    return RingBufferLayout.get_slot_view(mgr.shm.buf, idx, mgr.slot_size)
+
+
+def test_seq_is_odd_inside_write_and_grows(shm):
+    view = _slot(shm, 1)
+    assert VideoFrameLayout.read_begin(view) == 0
+
+    seq = VideoFrameLayout.begin_write(view)
+    assert seq & 1 and VideoFrameLayout.read_begin(view) == -1
+    VideoFrameLayout.end_write(view, seq)
+    after = VideoFrameLayout.read_begin(view)
+    assert after > 0 and not after & 1
+
+    VideoFrameLayout.write_to_buf(view, np.zeros(shm.shape, np.uint8), 1, 0.0)
+    assert VideoFrameLayout.read_begin(view) == after + 2
+    del view
+
+
+def test_read_latest_zero_copy_and_valid(shm, write_frame):
+    assert shm.read_latest() is None  # Пустое кольцо
+    write_frame(shm, 7, value=42)
+
+    view = shm.read_latest()
+    assert (view.frame_id, view.timestamp) == (7, 7.0)
+    assert view.image.shape == shm.shape and int(view.image[0, 0, 0]) == 42
+    assert view.is_valid()
+    view.release()
+    assert not view.is_valid() and view.image is None
+
+
+def test_overwrite_invalidates_open_view(shm, write_frame):
+    idx = write_frame(shm, 1)
+    view = shm.open_slot(idx)
+
+    slot = _slot(shm, idx)
+    VideoFrameLayout.write_to_buf(slot, np.ones(shm.shape, np.uint8), 2, 2.0)
+    del slot
+    assert not view.is_valid()  # Рваный кадр: результат надо выбросить
+    view.release()
+
+
+def test_slot_under_write_is_not_opened(shm, write_frame):
+    idx = write_frame(shm, 1)
+    slot = _slot(shm, idx)
+    seq = VideoFrameLayout.begin_write(slot)
+    assert shm.open_slot(idx) is None
+    VideoFrameLayout.end_write(slot, seq)
+    del slot
+    view = shm.open_slot(idx)
+    assert view is not None and view.frame_id == 1
+    view.release()
+
+
+def test_failed_capture_slot_is_skipped(shm):
+    # frame_id < 0: захват в слот сорвался, данных нет
+    slot = _slot(shm, 2)
+    seq = VideoFrameLayout.begin_write(slot)
+    VideoFrameLayout.write_header(slot, -1, 0.0)
+    VideoFrameLayout.end_write(slot, seq)
+    del slot
+    assert shm.open_slot(2) is None
+
+
+def test_reader_attach_sees_writer_frames(shm, write_frame):
+    write_frame(shm, 3, value=9)
+    cfg = SharedMemoryConfig(name=shm.name, size=0, shape=shm.shape, pixel_format=shm.pixel_format)
+    reader = SharedMemoryManager(cfg, create=False)
+    try:
+        assert reader.capacity == shm.capacity
+        with reader.read_latest() as view:
+            assert view.frame_id == 3 and int(view.image.max()) == 9
+    finally:
+        reader.close()
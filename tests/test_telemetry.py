@@ -0,0 +1,176 @@
+import re
+
+import pytest
+
+from src.core.telemetry import (LatencyHistogram, RollingHistogram, StageMetrics, HopMetrics,
+                                FRAME_STAGE, METRICS_BUCKETS_MS, WORKER_HOPS)
+
+# Относительная точность бакета: SUB_BUCKETS на октаву
+PRECISION = 2 ** (1 / LatencyHistogram.SUB_BUCKETS)
+
+
+def _hist(values):
+    h = LatencyHistogram()
+    for v in values:
+        h.record(v)
+    return h
+
+
+def test_percentiles_within_bucket_precision():
+    h = _hist(range(1, 1001))
+    summary = h.summary()
+    assert summary["count"] == 1000 and summary["max"] == 1000
+    assert summary["mean"] == pytest.approx(500.5)
+    for q, exact in (("p50", 500), ("p95", 950), ("p99", 990)):
+        assert exact <= summary[q] <= exact * PRECISION
+
+
+def test_percentile_never_exceeds_max():
+    h = _hist([5.0] * 10)
+    assert h.percentile(50) == h.percentile(100) == 5.0
+    assert LatencyHistogram().percentile(99) == 0.0
+
+
+def test_tiny_and_huge_values_are_clamped_to_edge_buckets():
+    h = _hist([0.0, 0.0005, 10 ** 9])
+    assert h.counts[0] == 2 and h.counts[-1] == 1
+    assert h.max_ms == 10 ** 9
+
+
+def test_merge_and_dict_round_trip_equal_single_histogram():
+    a, b = _hist([1, 2, 3]), _hist([100, 200])
+    a.merge(LatencyHistogram.from_dict(b.to_dict()))
+    full = _hist([1, 2, 3, 100, 200])
+    assert a.counts == full.counts and a.summary() == full.summary()
+    assert LatencyHistogram.from_dict(None).count == 0
+
+
+def test_count_le_is_a_lower_bound():
+    values = [0.3, 0.9, 1.5, 3.0, 7.0, 10.0, 12.0, 40.0, 300.0]
+    h = _hist(values)
+    prev = 0
+    for le in METRICS_BUCKETS_MS:
+        n = h.count_le(le)
+        assert prev <= n <= sum(v <= le for v in values)
+        prev = n
+    assert h.count_le(1000) == len(values)
+
+
+def test_rolling_window_forgets_old_slices():
+    rh = RollingHistogram(windows=(1, 10), slice_s=0.5)
+    for t in range(20):
+        rh.record(float(t + 1), now=float(t))
+    assert rh.window(1, now=19.0).count == 1
+    assert rh.window(10, now=19.0).count == 10
+    assert rh.total.count == 20
+    assert rh.take_delta().count == 20 and rh.take_delta().count == 0
+
+
+def _metrics():
+    m = StageMetrics()
+    m.ingest(0, {
+        FRAME_STAGE: _hist([3.0] * 5 + [20.0] * 3).to_dict(),
+        "detection": _hist([0.7, 0.8]).to_dict(),
+    })
+    return m
+
+
+def _samples(text, metric):
+    """{labels: value} для строк метрики"""
+    out = {}
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{metric}\{{(.*)\}} (\S+)", line)
+        if match:
+            out[match.group(1)] = float(match.group(2))
+    return out
+
+
+def test_openmetrics_histogram_buckets():
+    text = _metrics().to_openmetrics()
+    assert text.endswith("# EOF\n") and text.count("# EOF") == 1
+
+    name = "bikefit_frame_latency_seconds"
+    assert f"# TYPE {name} histogram" in text and f"# UNIT {name} seconds" in text
+    buckets = _samples(text, f"{name}_bucket")
+    assert buckets['camera="0",le="0.004"'] == 5
+    assert buckets['camera="0",le="0.033"'] == 8
+    assert buckets['camera="0",le="+Inf"'] == 8
+    counts = [buckets[f'camera="0",le="{le / 1000:g}"'] for le in METRICS_BUCKETS_MS]
+    assert counts == sorted(counts)  # Накопительные
+
+    assert _samples(text, f"{name}_count") == {'camera="0"': 8}
+    assert _samples(text, f"{name}_sum")['camera="0"'] == pytest.approx(0.075)
+
+
+def test_openmetrics_stage_labels_and_window_gauges():
+    text = _metrics().to_openmetrics()
+    stage = _samples(text, "bikefit_stage_latency_seconds_count")
+    assert stage == {'camera="0",stage="detection"': 2}  # __frame__ — только в своем семействе
+
+    gauges = _samples(text, "bikefit_stage_latency_window_seconds")
+    key = 'camera="0",stage="detection",window="{}",stat="max"'
+    windows = RollingHistogram().windows
+    assert all(gauges[key.format(f"{w}s")] == pytest.approx(0.0008) for w in windows)
+
+
+def test_hop_metrics_from_trace():
+    hops = HopMetrics()
+    # [camera_id, capture, shm, begin, stages, publish] + получено API, отправлено
+    hops.record_trace([1, 10.000, 10.001, 10.003, 10.010, 10.011], 10.015, 10.016)
+    report = hops.report()["1"]
+    assert set(report) == set(WORKER_HOPS) | {"bus", "send", "total"}
+    window = f"{RollingHistogram().windows[0]}s"
+    assert report["stages"][window]["max"] == pytest.approx(7.0)
+    assert report["total"][window]["max"] == pytest.approx(16.0)
+    assert 'hop="total"' in hops.to_openmetrics()
+
+
+def test_hop_metrics_split_every_mark_and_clamp_clock_skew():
+    hops = HopMetrics()
+    window = f"{RollingHistogram().windows[0]}s"
+    # Отметки соседних участков: capture, shm, begin, stages, publish, получено, отправлено
+    marks = [20.000, 20.002, 20.002, 20.012, 20.013, 20.020, 20.021]
+    hops.record_trace([2] + marks, marks[-2], marks[-1])
+    hops.record_trace([3, 5.0, 5.001, 5.002, 5.003, 5.004], 4.999, 5.010)
+    report = hops.report()
+
+    cam = report["2"]
+    for i, hop in enumerate(WORKER_HOPS + ("bus", "send")):
+        assert cam[hop][window]["max"] == pytest.approx((marks[i + 1] - marks[i]) * 1000, abs=1e-6)
+    assert cam["total"][window]["count"] == 1
+    # Сумма участков == total: ни одной отметки не потеряно
+    assert cam["total"][window]["max"] == pytest.approx((marks[-1] - marks[0]) * 1000)
+
+    # Отметка API раньше publish воркера (разные ядра) — участок 0, а не отрицательный
+    assert report["3"]["bus"][window]["max"] == 0.0
+    assert report["3"]["send"][window]["max"] == pytest.approx(11.0)
+
+
+def test_take_delta_loses_nothing_under_concurrent_records():
+    import threading
+    rh = RollingHistogram(windows=(10,), slice_s=1.0)
+    per_thread, writers = 20000, 4
+    taken = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            taken.append(rh.take_delta().count)
+
+    def writer():
+        for i in range(per_thread):
+            rh.record(1.0 + i % 7, now=0.0)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    poll = threading.Thread(target=reader)
+    poll.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    poll.join()
+    taken.append(rh.take_delta().count)
+
+    assert sum(taken) == rh.total.count == per_thread * writers
+    assert rh.window(10, now=0.0).count == per_thread * writers
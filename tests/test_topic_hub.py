@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from src.core.event_bus import (EventBus, Subscription, POLICY_COALESCE, POLICY_DROP_OLDEST, POLICY_LATEST,
+                                TOPIC_BROADCAST, TOPIC_STREAM, TRANSPORT_NATIVE)
+
+
+def _sub(policy, maxsize=3, key=None):
+    return Subscription(None, TOPIC_STREAM, maxsize, policy, key)
+
+
+def test_drop_oldest_keeps_newest_window():
+    sub = _sub(POLICY_DROP_OLDEST)
+    for i in range(5):
+        sub._push(i)
+    assert sub.get_batch() == [2, 3, 4]
+    assert sub.dropped == 2
+
+
+def test_latest_keeps_only_last():
+    sub = _sub(POLICY_LATEST, maxsize=10)
+    for i in range(5):
+        sub._push(i)
+    assert sub.get_batch() == [4]
+    assert sub.dropped == 4
+
+
+def test_coalesce_replaces_by_key_and_keeps_keyless():
+    sub = _sub(POLICY_COALESCE, maxsize=10, key=lambda m: m.get("type") if m["type"] == "monitor" else None)
+    sub._push({"type": "monitor", "v": 1})
+    sub._push({"type": "log", "v": 1})
+    sub._push({"type": "monitor", "v": 2})
+    sub._push({"type": "log", "v": 2})
+
+    # Сообщения без ключа не сливаются; замененное встает в конец очереди
+    assert sub.get_batch() == [{"type": "log", "v": 1}, {"type": "monitor", "v": 2}, {"type": "log", "v": 2}]
+    assert sub.dropped == 1
+
+
+def test_coalesce_bounded_by_maxsize():
+    sub = _sub(POLICY_COALESCE, maxsize=2, key=lambda m: m)
+    for i in range(4):
+        sub._push(i)
+    assert sub.get_batch() == [2, 3]
+    assert sub.dropped == 2
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        _sub("fifo")
+    with pytest.raises(ValueError):
+        _sub(POLICY_COALESCE)  # Без key
+
+
+def test_get_waits_for_push():
+    sub = _sub(POLICY_DROP_OLDEST)
+    threading.Timer(0.05, sub._push, ("x",)).start()
+    t0 = time.perf_counter()
+    assert sub.get(timeout=2.0) == "x"
+    assert time.perf_counter() - t0 < 1.0
+
+
+def _collect(sub, n, timeout=2.0):
+    items, deadline = [], time.time() + timeout
+    while len(items) < n and time.time() < deadline:
+        items += sub.get_batch(timeout=0.05)
+    return items
+
+
+def test_hub_fans_out_to_every_subscriber():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    fast = bus.subscribe(TOPIC_STREAM, maxsize=10)
+    slow = bus.subscribe(TOPIC_STREAM, maxsize=10, policy=POLICY_LATEST)
+    for i in range(3):
+        bus.publish_stream({"frame_id": i})
+
+    assert [p["frame_id"] for p in _collect(fast, 3)] == [0, 1, 2]
+    time.sleep(0.05)
+    assert [p["frame_id"] for p in slow.get_batch()] == [2]  # Медленный видит только последний
+    fast.close()
+    slow.close()
+
+
+def test_unsubscribed_topic_leaves_bus_queue_alone():
+    bus = EventBus(transport=TRANSPORT_NATIVE)
+    sub = bus.subscribe(TOPIC_BROADCAST)
+    bus.publish_to_api("log", {"n": 1})
+    assert [m["payload"] for m in _collect(sub, 1)] == [{"n": 1}]
+
+    sub.close()
+    deadline = time.time() + 2.0
+    while bus._hub._thread is not None and time.time() < deadline:
+        time.sleep(0.01)
+    assert bus._hub._thread is None  # Насос остановился вместе с последним подписчиком
+
+    bus.publish_to_api("log", {"n": 2})
+    time.sleep(0.1)
+    assert bus.get_broadcast_data() == {"type": "log", "payload": {"n": 2}}
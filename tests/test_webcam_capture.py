@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from src.data.shared_memory import RingBufferLayout, VideoFrameLayout
+from src.hardware.webcam import Webcam
+
+
+class _FakeCap:
+    """VideoCapture: decode в переданный массив или (как OpenCV при смене формата) в новый"""
+
+    def __init__(self, frame: np.ndarray, in_place: bool = True):
+        self.frame = frame
+        self.in_place = in_place
+
+    def read(self, image=None):
+        if image is not None and self.in_place and image.shape == self.frame.shape:
+            image[:] = self.frame
+            return True, image
+        return True, self.frame.copy()
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.frame.shape[1], cv2.CAP_PROP_FRAME_HEIGHT: self.frame.shape[0]}[prop]
+
+
+def _webcam(cap) -> Webcam:
+    cam = Webcam(0, cap.frame.shape[1], cap.frame.shape[0], 30)
+    cam._cap, cam._is_connected = cap, True
+    return cam
+
+
+def _frame(h=8, w=8, value=7):
+    return np.full((h, w, 3), value, dtype=np.uint8)
+
+
+def test_read_frame_decodes_into_out():
+    out = np.zeros((8, 8, 3), dtype=np.uint8)
+    ret, frame = _webcam(_FakeCap(_frame())).read_frame(out=out)
+    assert ret and frame is out
+    assert (out == 7).all()
+
+
+def test_reallocated_frame_is_copied_into_out():
+    out = np.zeros((8, 8, 3), dtype=np.uint8)
+    ret, frame = _webcam(_FakeCap(_frame(), in_place=False)).read_frame(out=out)
+    assert ret and frame is out and (out == 7).all()
+
+
+def test_other_resolution_is_resized_into_out():
+    out = np.zeros((8, 8, 3), dtype=np.uint8)
+    ret, frame = _webcam(_FakeCap(_frame(16, 16))).read_frame(out=out)
+    assert ret and frame is out and (out == 7).all()
+
+
+def test_disconnected_camera_returns_nothing():
+    cam = _webcam(_FakeCap(_frame()))
+    cam._is_connected = False
+    assert cam.read_frame(out=np.zeros((8, 8, 3), dtype=np.uint8)) == (False, None)
+
+
+def test_capture_to_buffer_writes_slot_pixels(shm):
+    slot = RingBufferLayout.get_slot_view(shm.shm.buf, 0, shm.slot_size)
+    pixels = slot[VideoFrameLayout.HEADER_SIZE:]
+    assert _webcam(_FakeCap(_frame(value=42))).capture_to_buffer(pixels)
+
+    view = VideoFrameLayout.get_pixel_view(slot, shm.shape, shm.dtype)
+    assert (view == 42).all()
+    del view, pixels, slot
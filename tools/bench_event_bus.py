@@ -0,0 +1,116 @@
+# tools/bench_event_bus.py
+"""
+Бенчмарк транспортов EventBus: "manager" (прокси Manager) vs "native" (multiprocessing.Queue).
+
+Воркер (отдельный процесс, как CameraWorker) шлет сообщения, текущий процесс
+(как Оркестратор / API) их забирает:
+  1. Latency: publish_stream раз в 1 мс (темп кадров), задержка put -> get.
+  2. Throughput: publish_critical без пауз (блокирующий put), сообщений/сек.
+  3. Command poll: стоимость queue.empty() на стороне воркера (проверяется каждый кадр).
+
+Запуск:  python tools/bench_event_bus.py [--count 5000]
+"""
+import sys
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+
+# Добавляем корень в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from src.core.event_bus import EventBus
+
+PAYLOAD = {"camera_id": 0, "frame_id": 0, "points": [{"x": 1.0, "y": 2.0, "id": i} for i in range(8)]}
+
+
+def _producer(bus: EventBus, count: int, paced: bool, started, go):
+    started.set()
+    go.wait()
+    for i in range(count):
+        msg = dict(PAYLOAD, frame_id=i, t=time.perf_counter())
+        if paced:
+            bus.publish_stream(msg)
+            time.sleep(0.001)
+        else:
+            bus.publish_critical(msg)
+    bus.publish_critical({"type": "done"})
+
+
+def _run(bus: EventBus, count: int, paced: bool):
+    started, go = multiprocessing.Event(), multiprocessing.Event()
+    # Как оркестратор: воркер получает свои каналы шины (native)
+    bus.register_worker(0, _poll_cost.manager)
+    proc = multiprocessing.Process(target=_producer, args=(bus.for_worker(0), count, paced, started, go), daemon=True)
+    proc.start()
+    bus.detach_worker(0)
+    latencies = []
+    received = 0
+
+    # Старт процесса (spawn + импорты) в замер не входит
+    started.wait()
+    go.set()
+    t0 = time.perf_counter()
+    while True:
+        if paced:
+            msg = bus.get_stream_data()
+            if msg is not None:
+                latencies.append(time.perf_counter() - msg["t"])
+                received += 1
+                continue
+        msg = bus.get_critical_data()
+        if msg is None:
+            continue
+        if msg.get("type") == "done":
+            break
+        received += 1
+    elapsed = time.perf_counter() - t0
+    proc.join()
+    return received, elapsed, latencies
+
+
+def _poll_cost(bus: EventBus, n: int = 2000) -> float:
+    q = bus.register_worker(0, _poll_cost.manager)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        q.empty()
+    return (time.perf_counter() - t0) / n
+
+
+def bench(transport: str, count: int):
+    manager = multiprocessing.Manager() if transport == "manager" else None
+    _poll_cost.manager = manager
+    try:
+        bus = EventBus(manager, transport=transport)
+        received, _, lat = _run(bus, min(count, 2000), paced=True)
+        lat_us = np.array(lat) * 1e6 if lat else np.zeros(1)
+
+        bus = EventBus(manager, transport=transport)
+        sent, elapsed, _ = _run(bus, count, paced=False)
+
+        poll_us = _poll_cost(EventBus(manager, transport=transport)) * 1e6
+        print(f"{transport:>8} | latency p50 {np.percentile(lat_us, 50):8.1f} us"
+              f" | p99 {np.percentile(lat_us, 99):8.1f} us"
+              f" | {sent / elapsed:10.0f} msg/s"
+              f" | empty() {poll_us:6.1f} us | stream recv {received}")
+    finally:
+        if manager:
+            manager.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EventBus transport benchmark")
+    parser.add_argument("--count", type=int, default=5000, help="сообщений в тесте пропускной способности")
+    args = parser.parse_args()
+
+    print("=" * 90)
+    print("🚌 EventBus transports (worker process -> main process)")
+    print("=" * 90)
+    for transport in ("manager", "native"):
+        bench(transport, args.count)
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method('spawn', force=True)
+    main()
@@ -1,5 +1,6 @@
 import sys
 import time
+import argparse
 from pathlib import Path
 
 # Добавляем корень в путь
@@ -7,28 +8,34 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.core.recorder import SessionRecorder
 from src.core.config import settings
-from loguru import logger
+from src.data.shared_memory import ShmRegistry
 
 
 def main():
+    parser = argparse.ArgumentParser(description="BikeFit Motion Recorder")
+    parser.add_argument("--camera", type=int, default=None, help="camera_id (по умолчанию — первая активная)")
+    args = parser.parse_args()
+
     print("=" * 40)
     print("🎥 BikeFit Motion Recorder Tool")
     print("=" * 40)
-    print("NOTE: Этот инструмент пытается подключиться к памяти камеры.")
-    print("Убедитесь, что main.py запущен.")
 
-    # Пытаемся угадать имя памяти (пока хардкод для теста первой камеры)
-    # В будущем здесь будет список доступных SHM каналов
-    # Имя должно совпадать с тем, что генерирует воркер: "camera_side_buffer_TIMESTAMP"
-    # СЕЙЧАС ЭТО ПРОБЛЕМА: Имя динамическое.
-    # РЕШЕНИЕ: Для тестов записи временно отключите timestamp в camera_worker.py
-    # или скопируйте имя из логов main.py сюда.
+    # [FIX] Кольцо камеры ищем в реестре SHM по camera_id (имя кольца динамическое, вводить его не нужно)
+    registry = ShmRegistry.attach()
+    if registry is None:
+        print("❌ SHM Registry not found. Убедитесь, что main.py запущен.")
+        return
+    with registry:
+        cameras = [e for e in registry.entries() if e.active]
+    if not cameras:
+        print("❌ Нет активных камер в реестре SHM.")
+        return
 
-    shm_name = input(f"Enter SHM Name (default: {settings.SHM_CAMERA_BUFFER_NAME}): ").strip()
-    if not shm_name:
-        shm_name = settings.SHM_CAMERA_BUFFER_NAME
+    for e in cameras:
+        print(f"  Camera {e.camera_id}: {e.name} {tuple(e.shape)} {e.pixel_format.value}")
+    camera_id = args.camera if args.camera is not None else cameras[0].camera_id
 
-    print(f"Targeting SHM: {shm_name}")
+    print(f"Targeting Camera {camera_id}")
     print("Press ENTER to start recording...")
     input()
 
@@ -36,8 +43,10 @@ def main():
     timestamp = time.strftime("%Y%m%d-%H%M%S")
     filename = settings.DATA_DIR / "sessions" / f"session_{timestamp}.bfm"
 
-    recorder = SessionRecorder(str(filename), shm_name=shm_name)
+    recorder = SessionRecorder(str(filename), camera_id=camera_id)
     recorder.start()
+    if not recorder.is_recording:
+        return  # Причину уже залогировал SessionRecorder
 
     print(f"🔴 RECORDING... ({filename})")
     print("Press CTRL+C to stop.")